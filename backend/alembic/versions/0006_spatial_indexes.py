@@ -0,0 +1,90 @@
+"""spatial indexes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 05:31:12.402118
+
+Spatial lookups on recipients and donations, kept in sync with
+latitude/longitude by the database itself:
+
+- SQLite: an R*Tree virtual table `<table>_rtree(id, min_lat, max_lat,
+  min_lng, max_lng)` maintained by insert/update/delete triggers.
+- PostgreSQL with PostGIS available: a stored generated `geog`
+  geography(Point, 4326) column with a GiST index.
+
+Neither is part of the ORM models (env.py keeps autogenerate away from
+them). Without PostGIS the app falls back to plain bounding-box filters.
+
+SQLite batch migrations recreate the table and drop its triggers, so a
+later batch migration on recipients or donations must call
+`create_rtree_triggers` again.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+SPATIAL_TABLES = ("recipients", "donations")
+
+
+def create_rtree_triggers(table: str) -> None:
+    rtree = f"{table}_rtree"
+    has_point = "NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL"
+    op.execute(
+        f"CREATE TRIGGER {rtree}_insert AFTER INSERT ON {table} WHEN {has_point} BEGIN "
+        f"INSERT INTO {rtree} VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {rtree}_update AFTER UPDATE OF latitude, longitude ON {table} BEGIN "
+        f"DELETE FROM {rtree} WHERE id = OLD.id; "
+        f"INSERT INTO {rtree} SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude "
+        f"WHERE {has_point}; END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {rtree}_delete AFTER DELETE ON {table} BEGIN "
+        f"DELETE FROM {rtree} WHERE id = OLD.id; END"
+    )
+
+
+def _postgis_available(bind) -> bool:
+    return bind.execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'postgis'"
+    )).first() is not None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for table in SPATIAL_TABLES:
+            op.execute(f"CREATE VIRTUAL TABLE {table}_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+            op.execute(
+                f"INSERT INTO {table}_rtree SELECT id, latitude, latitude, longitude, longitude FROM {table} "
+                f"WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+            )
+            create_rtree_triggers(table)
+    elif bind.dialect.name == "postgresql" and _postgis_available(bind):
+        op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+        for table in SPATIAL_TABLES:
+            op.execute(
+                f"ALTER TABLE {table} ADD COLUMN geog geography(Point, 4326) "
+                f"GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography) STORED"
+            )
+            op.execute(f"CREATE INDEX ix_{table}_geog ON {table} USING gist (geog)")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for table in SPATIAL_TABLES:
+            for action in ("insert", "update", "delete"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_rtree_{action}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_rtree")
+    elif bind.dialect.name == "postgresql":
+        for table in SPATIAL_TABLES:
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_geog")
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS geog")
@@ -0,0 +1,113 @@
+"""
+Rows per second for bulk donation ingestion.
+
+Runs `BulkIngestService.ingest` (streaming parse, validation, chunked
+multi-row INSERT, enrichment job per chunk) over generated CSV and NDJSON
+bodies against a scratch database, next to the per-row path of
+`POST /donation` (one ORM add, counter update, job and commit per
+donation). Enrichment itself is not included: it depends on the AI and
+geocoding providers (see provider_stub.py) and runs on the job workers.
+
+    python benchmarks/bench_bulk_ingest.py
+    python benchmarks/bench_bulk_ingest.py --rows 20000 --chunk 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+FIELDS = ("donor_id", "food_type", "quantity_lbs", "pickup_window_start", "pickup_window_end", "address")
+
+
+def records(rows: int):
+    for i in range(rows):
+        yield {
+            "donor_id": 1, "food_type": ("apples", "bagels", "yogurt", "soup")[i % 4],
+            "quantity_lbs": 5 + i % 40, "pickup_window_start": "2026-10-19T17:00:00",
+            "pickup_window_end": "2026-10-19T21:00:00", "address": f"{i % 300} Atlantic Ave, Brooklyn, NY",
+        }
+
+
+def body(fmt: str, rows: int) -> bytes:
+    if fmt == "ndjson":
+        return "\n".join(json.dumps(r) for r in records(rows)).encode()
+    lines = [",".join(FIELDS)] + [",".join(f'"{r[f]}"' for f in FIELDS) for r in records(rows)]
+    return "\n".join(lines).encode()
+
+
+async def stream(data: bytes, size: int = 64 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def per_row(rows: int) -> float:
+    from database import AsyncSessionLocal
+    from models import Donation, DonationStatus
+    from schemas import DonationCreate
+    from services.donation_enrichment import ENRICH_DONATIONS
+    from services.impact_service import ImpactService
+    from services.job_queue import enqueue
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for record in records(rows):
+            donation = Donation(**DonationCreate.model_validate(record).model_dump())
+            db.add(donation)
+            await ImpactService(db).record_donation_status(None, DonationStatus.PENDING, donation.quantity_lbs)
+            await db.flush()
+            enqueue(db, ENRICH_DONATIONS, {"donation_ids": [donation.id]})
+            await db.commit()
+    return time.perf_counter() - started
+
+
+async def main_async(args) -> None:
+    from database import AsyncSessionLocal, async_engine, engine
+    from migrate import run_migrations
+    from models import Donor
+    from services.bulk_ingest import BulkIngestService
+
+    run_migrations()
+    async with AsyncSessionLocal() as db:
+        db.add(Donor(id=1, name="Bench Grocer", email="grocer@example.com", address="1 Atlantic Ave"))
+        await db.commit()
+
+    print(f"{args.rows} rows, chunks of {args.chunk}")
+    print(f"{'path':<28} {'seconds':>8} {'rows/s':>9}")
+    elapsed = await per_row(min(args.rows, args.per_row_rows))
+    print(f"{'per-row (POST /donation)':<28} {elapsed:>8.2f} {min(args.rows, args.per_row_rows) / elapsed:>9.0f}")
+    for fmt in ("csv", "ndjson"):
+        data = body(fmt, args.rows)
+        started = time.perf_counter()
+        job = await BulkIngestService(AsyncSessionLocal).ingest(stream(data), fmt)
+        elapsed = time.perf_counter() - started
+        assert job.inserted == args.rows, job.summary()
+        print(f"{'bulk ' + fmt:<28} {elapsed:>8.2f} {args.rows / elapsed:>9.0f}")
+
+    await async_engine.dispose()
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--chunk", type=int, default=500, help="BULK_INGEST_CHUNK_SIZE")
+    parser.add_argument("--per-row-rows", type=int, default=500, help="rows for the (slow) per-row baseline")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "bench_bulk_ingest.db")
+    if os.path.exists(path):
+        os.remove(path)
+    # database.py and bulk_ingest.py read their settings at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["BULK_INGEST_CHUNK_SIZE"] = str(args.chunk)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
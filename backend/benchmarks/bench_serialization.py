@@ -0,0 +1,186 @@
+"""
+JSON serialization time and response bytes for the list endpoints.
+
+Builds each endpoint's payload from a seeded scratch database exactly as
+the endpoint does, then times the two ways of turning it into bytes:
+"before" is FastAPI's default path (`jsonable_encoder` + `json.dumps`),
+"after" is the orjson path the endpoints now use (`serialization.dumps`).
+Sizes are reported raw, gzipped and (when the brotli package is installed)
+brotli-compressed at the middleware's settings.
+
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --rows 5000 --steps 40 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def seed(engine, rows: int, steps: int) -> None:
+    from sqlalchemy import insert
+    from sqlalchemy.orm import Session
+    from models import Donation, DonationStatus, Donor, Driver, FoodCategory, Recipient, Route, RouteStatus, RouteStop
+
+    now = datetime.now()
+    categories = list(FoodCategory)
+    statuses = list(DonationStatus)
+    with Session(engine) as db:
+        db.add(Donor(id=1, name="Bench Donor", email="bench@example.com", address="1 Bench St"))
+        db.execute(insert(Recipient), [
+            {
+                "name": f"Pantry {i}", "email": f"pantry{i}@example.com", "address": f"{i} Pantry Ave, Brooklyn, NY",
+                "latitude": 40.60 + (i % 20) * 0.01, "longitude": -74.00 + (i // 20) * 0.01,
+                "organization_type": "food_bank", "categories_needed": [c.value for c in categories[:3]],
+                "storage_capacity_lbs": 200.0 + i,
+            }
+            for i in range(200)
+        ])
+        db.execute(insert(Driver), [
+            {"name": f"Driver {i}", "email": f"driver{i}@example.com", "phone": f"555-{i:04d}",
+             "latitude": 40.65, "longitude": -73.95}
+            for i in range(20)
+        ])
+        db.execute(insert(Donation), [
+            {
+                "donor_id": 1, "food_type": f"bench {i % 7}", "food_category": categories[i % len(categories)],
+                "quantity_lbs": 10.0 + i % 40, "pickup_window_start": now - timedelta(minutes=i),
+                "pickup_window_end": now + timedelta(hours=2), "address": f"{i} Bench St, Brooklyn, NY",
+                "latitude": 40.60 + (i % 50) * 0.004, "longitude": -73.99 + (i % 30) * 0.004,
+                "status": statuses[i % len(statuses)], "posted_at": now - timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ])
+        # Google-style turn-by-turn steps: the bulk of a route payload
+        instructions = [
+            {
+                "instruction": f"Turn <b>left</b> onto <b>{n} Street</b><div style=\"font-size:0.9em\">Pass by the corner store</div>",
+                "distance": f"0.{n % 10} mi",
+                "duration": f"{n % 5 + 1} mins",
+            }
+            for n in range(steps)
+        ]
+        db.execute(insert(Route), [
+            {
+                "donation_id": i + 1, "driver_id": i % 20 + 1, "recipient_id": i % 200 + 1,
+                "status": RouteStatus.ASSIGNED, "estimated_duration_minutes": 12.5 + i % 30,
+                "estimated_distance_miles": 2.0 + i % 9, "route_instructions": instructions,
+                "created_at": now - timedelta(minutes=i),
+            }
+            for i in range(rows // 2)
+        ])
+        db.execute(insert(RouteStop), [
+            {
+                "route_id": i // 2 + 1, "stop_type": "pickup" if i % 2 == 0 else "delivery",
+                "address": f"{i} Stop St, Brooklyn, NY", "latitude": 40.65, "longitude": -73.95,
+                "sequence": i % 2, "estimated_arrival": now + timedelta(minutes=i % 60),
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+
+
+async def payloads(page: int):
+    """(endpoint, payload) built the way each endpoint builds it"""
+    from sqlalchemy import select
+    import main
+    from database import AsyncSessionLocal
+    from models import Donation, Route
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(*main.DONATION_COLUMNS.values()).order_by(Donation.posted_at.desc()).limit(page)
+        )).all()
+        yield f"/donations?limit={page}&fields=<all columns>", [dict(zip(main.DONATION_COLUMNS, row)) for row in rows]
+
+        rows = (await db.execute(
+            select(*main.ROUTE_COLUMNS.values()).order_by(Route.created_at.desc()).limit(page)
+        )).all()
+        yield f"/routes?limit={page}&fields=<all, with instructions>", [dict(zip(main.ROUTE_COLUMNS, row)) for row in rows]
+
+        routes = (await db.execute(
+            main._route_map_query().order_by(Route.created_at.desc()).limit(page)
+        )).scalars().unique().all()
+        yield f"/routes/map?limit={page}", [main._route_map_payload(r, include_instructions=False) for r in routes]
+        yield f"/routes/map?limit={page}&instructions=true", [main._route_map_payload(r) for r in routes]
+
+        yield f"/admin/snapshot?limit={page}", await main._build_admin_snapshot(db, page, None, page, True)
+
+
+def measure(content, repeat: int):
+    from fastapi.encoders import jsonable_encoder
+    from compression import CompressionMiddleware, _Compressor, brotli
+    from serialization import dumps
+
+    def before():
+        # What JSONResponse does after FastAPI's serialize_response
+        return json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+    timings = {}
+    for name, render in (("before", before), ("after", lambda: dumps(content))):
+        render()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            body = render()
+        timings[name] = (time.perf_counter() - started) / repeat * 1000
+
+    options = CompressionMiddleware(None)
+    sizes = {"raw": len(body)}
+    for encoding in ("gzip", "br") if brotli is not None else ("gzip",):
+        compressor = _Compressor(encoding, options.gzip_level, options.brotli_quality)
+        started = time.perf_counter()
+        sizes[encoding] = len(compressor.compress(body) + compressor.finish())
+        timings[encoding] = (time.perf_counter() - started) * 1000
+    return timings, sizes
+
+
+async def main_async(args) -> None:
+    from database import async_engine, engine
+    from migrate import run_migrations
+
+    run_migrations()
+    seed(engine, args.rows, args.steps)
+
+    print(f"{args.rows} donations, {args.rows // 2} routes with {args.steps} instruction steps, pages of {args.page}")
+    print(f"{'endpoint':<52} {'before ms':>9} {'after ms':>9} {'speedup':>8} {'raw KB':>8} {'gzip KB':>8} {'br KB':>8} {'gz ms':>6} {'br ms':>6}")
+    async for endpoint, content in payloads(args.page):
+        timings, sizes = measure(content, args.repeat)
+        br = f"{sizes['br'] / 1024:>8.1f}" if "br" in sizes else f"{'-':>8}"
+        br_ms = f"{timings['br']:>6.1f}" if "br" in timings else f"{'-':>6}"
+        print(
+            f"{endpoint:<52} {timings['before']:>9.2f} {timings['after']:>9.2f} "
+            f"{timings['before'] / timings['after']:>7.1f}x {sizes['raw'] / 1024:>8.1f} "
+            f"{sizes['gzip'] / 1024:>8.1f} {br} {timings['gzip']:>6.1f} {br_ms}"
+        )
+
+    await async_engine.dispose()
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=25, help="instruction steps per route")
+    parser.add_argument("--page", type=int, default=500, help="rows per endpoint payload")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "bench_serialization.db")
+    if os.path.exists(path):
+        os.remove(path)
+    # database.py reads DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
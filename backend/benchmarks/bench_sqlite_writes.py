@@ -0,0 +1,155 @@
+"""
+Sustained donation-post throughput on SQLite, before and after the
+performance profile.
+
+"before" is the old setup: rollback journal, default pragmas, and every
+session writing straight to the file, so concurrent commits fight over
+SQLite's lock. "after" is the default now: WAL and tuned pragmas on connect,
+with writes ordered through the single-writer queue. Each variant gets a fresh
+database file.
+
+The endpoint does the database work of POST /donation: read the donor,
+insert the donation with its impact counter update, commit, wait briefly
+(standing in for the AI perishability call), then write the score back. Clients
+post as fast as they can for `--seconds`.
+
+    python benchmarks/bench_sqlite_writes.py --concurrency 32 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from database import Base, SingleWriterSession, create_async_db_engine, create_db_engine
+from models import Donation, DonationStatus, Donor
+from services.impact_service import ImpactService
+
+VARIANTS = {
+    # name: (SQLITE_PROFILE, session class)
+    "before": ("default", AsyncSession),
+    "after": ("performance", SingleWriterSession),
+}
+
+
+def build_app(async_engine, session_class, think_seconds: float) -> FastAPI:
+    SessionLocal = async_sessionmaker(
+        async_engine, class_=session_class, autoflush=False, expire_on_commit=False
+    )
+    app = FastAPI()
+
+    async def get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    @app.post("/donation")
+    async def post_donation(db: AsyncSession = Depends(get_db)):
+        try:
+            donor = await db.get(Donor, 1)
+            now = datetime.now()
+            donation = Donation(
+                donor_id=donor.id, food_type="bench", quantity_lbs=25.0,
+                pickup_window_start=now, pickup_window_end=now + timedelta(hours=2),
+                address="1 Bench St", status=DonationStatus.PENDING
+            )
+            db.add(donation)
+            await ImpactService(db).record_donation_status(None, DonationStatus.PENDING, donation.quantity_lbs)
+            await db.commit()
+            await asyncio.sleep(think_seconds)
+            donation.perishability_score = 5.0
+            await db.commit()
+            return {"donation_id": donation.id}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return app
+
+
+async def drive(app: FastAPI, seconds: float, concurrency: int) -> dict:
+    latencies, errors = [], {}
+    deadline = time.perf_counter() + seconds
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120.0
+    ) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.post("/donation")
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    detail = response.json().get("detail", "")[:60]
+                    errors[detail] = errors.get(detail, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "ok": len(latencies),
+        "errors": errors,
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else float("nan"),
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float("nan"),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else float("nan"),
+    }
+
+
+async def run_variant(name: str, args) -> dict:
+    profile, session_class = VARIANTS[name]
+    path = os.path.join(tempfile.gettempdir(), f"bench_sqlite_writes_{name}.db")
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    url = f"sqlite:///{path}"
+
+    sync_engine = create_db_engine(url, sqlite_profile=profile)
+    Base.metadata.create_all(bind=sync_engine)
+    with Session(sync_engine) as db:
+        db.add(Donor(id=1, name="Bench Donor", email="bench@example.com", address="1 Bench St"))
+        db.commit()
+    sync_engine.dispose()
+
+    async_engine = create_async_db_engine(url, pool_mode="queue", sqlite_profile=profile)
+    app = build_app(async_engine, session_class, args.think_ms / 1000)
+    await drive(app, 1.0, args.concurrency)  # warm up the pool
+    result = await drive(app, args.seconds, args.concurrency)
+    await async_engine.dispose()
+    return result
+
+
+async def main_async(args) -> None:
+    # One connection per client, so only SQLite's locking limits the "before" run
+    os.environ["DB_POOL_SIZE"] = str(args.concurrency)
+    print(f"{args.seconds:.0f}s per variant, concurrency {args.concurrency}, think {args.think_ms} ms")
+    print(f"{'variant':<8} {'ok':>7} {'req/s':>8} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}  errors")
+    for name in VARIANTS:
+        r = await run_variant(name, args)
+        errors = ", ".join(f"{count}x {detail!r}" for detail, count in r["errors"].items()) or "-"
+        print(f"{name:<8} {r['ok']:>7} {r['requests_per_s']:>8.1f} {r['mean_ms']:>9.2f} "
+              f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}  {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--think-ms", type=float, default=5.0, help="pause between the two commits")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
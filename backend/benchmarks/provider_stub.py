@@ -0,0 +1,379 @@
+"""
+Local stand-in for Gemini, Nominatim, OpenRouteService and NYC Open Data used
+for load testing.
+
+Responses are deterministic (derived from a hash of the request) while latency
+and failures are drawn from configurable distributions, so the backend can be
+benchmarked offline at realistic provider latencies without spending API quota.
+
+Run:
+    python benchmarks/provider_stub.py --port 8100
+
+Point the backend at it:
+    GEMINI_API_KEY=stub GEMINI_API_BASE=http://127.0.0.1:8100
+    NOMINATIM_DOMAIN=127.0.0.1:8100 NOMINATIM_SCHEME=http
+    ORS_API_KEY=stub ORS_API_BASE=http://127.0.0.1:8100
+    NYC_OPEN_DATA_BASE=http://127.0.0.1:8100/resource
+
+Latency per provider is set with STUB_<PROVIDER>_LATENCY where PROVIDER is
+GEMINI, NOMINATIM, ORS or NYC and the value is one of
+    fixed:<ms>
+    uniform:<min_ms>:<max_ms>
+    lognormal:<median_ms>:<sigma>
+Error rates are set with STUB_<PROVIDER>_ERROR_RATE (0.0 - 1.0) and the random
+stream with STUB_SEED.
+
+NYC Open Data is synthesised for three datasets: Food Help NYC pantries
+(STUB_NYC_ROWS, default 20000), a grid of neighborhood tabulation areas over
+the city, and DOT traffic volume counts (STUB_NYC_TRAFFIC_ROWS, default 5000).
+Setting STUB_NYC_REVISION=<n> edits every tenth pantry and stamps it <n> days
+later, which lets repeated syncs exercise the incremental update path.
+Socrata's `$select=count(*)`, `$where=:updated_at > '...'`, `$limit` and
+`$offset` are honoured.
+"""
+import argparse
+import asyncio
+import hashlib
+import math
+import os
+import random
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+DEFAULT_LATENCY = {
+    "GEMINI": "lognormal:700:0.35",
+    "NOMINATIM": "lognormal:180:0.3",
+    "ORS": "lognormal:250:0.3",
+    "NYC": "lognormal:300:0.3",
+}
+
+ERROR_STATUS = {
+    "GEMINI": 503,
+    "NOMINATIM": 503,
+    "ORS": 502,
+    "NYC": 503,
+}
+
+# NYC bounding box used for synthetic geocodes
+NYC_LAT = (40.55, 40.90)
+NYC_LNG = (-74.05, -73.75)
+
+CATEGORY_KEYWORDS = [
+    ("produce", ["produce", "vegetable", "fruit", "fresh", "salad"]),
+    ("bakery", ["bread", "pastry", "bakery", "baked", "bagel"]),
+    ("prepared", ["prepared", "meal", "cooked", "hot", "pasta"]),
+    ("frozen", ["frozen", "ice"]),
+    ("dairy", ["milk", "cheese", "dairy", "yogurt"]),
+]
+
+BOROUGHS = ["Manhattan", "Brooklyn", "Queens", "Bronx", "Staten Island"]
+STREETS = ["Broadway", "Atlantic Ave", "Grand Concourse", "Queens Blvd", "Victory Blvd", "Fulton St"]
+
+AVERAGE_SPEED_MPS = 25 * 1609.34 / 3600  # 25 mph
+DETOUR_FACTOR = 1.3
+
+
+class LatencyModel:
+    def __init__(self, spec: str, error_rate: float, rng: random.Random):
+        kind, *args = spec.split(":")
+        self.kind = kind
+        self.args = [float(a) for a in args]
+        self.error_rate = error_rate
+        self.rng = rng
+
+    def sample_seconds(self) -> float:
+        if self.kind == "fixed":
+            ms = self.args[0]
+        elif self.kind == "uniform":
+            ms = self.rng.uniform(self.args[0], self.args[1])
+        elif self.kind == "lognormal":
+            ms = self.args[0] * math.exp(self.rng.gauss(0.0, self.args[1]))
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.kind}")
+        return max(0.0, ms) / 1000
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+
+def _load_models() -> Dict[str, LatencyModel]:
+    rng = random.Random(int(os.getenv("STUB_SEED", "0")))
+    return {
+        provider: LatencyModel(
+            os.getenv(f"STUB_{provider}_LATENCY", default),
+            float(os.getenv(f"STUB_{provider}_ERROR_RATE", "0")),
+            rng,
+        )
+        for provider, default in DEFAULT_LATENCY.items()
+    }
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _synthetic_point(query: str) -> Tuple[float, float]:
+    h = _digest(query.strip().lower())
+    lat = NYC_LAT[0] + (h & 0xFFFFFFFF) / 0xFFFFFFFF * (NYC_LAT[1] - NYC_LAT[0])
+    lng = NYC_LNG[0] + (h >> 32) / 0xFFFFFFFF * (NYC_LNG[1] - NYC_LNG[0])
+    return lat, lng
+
+
+def _haversine_m(a: List[float], b: List[float]) -> float:
+    """Distance in meters between two [lng, lat] pairs"""
+    lng1, lat1, lng2, lat2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+def _gemini_answer(prompt: str) -> str:
+    lower = prompt.lower()
+    if "classify this food" in lower:
+        food = lower.split("food:", 1)[-1].split("\n\n", 1)[0]
+        for category, words in CATEGORY_KEYWORDS:
+            if any(word in food for word in words):
+                return category
+        return "packaged"
+    if "perishability" in lower:
+        return str(_digest(prompt) % 11)
+    if "driver assignment" in lower:
+        kind = "courier" if _digest(prompt) % 4 == 0 else "volunteer"
+        return f'{{"assignment_type": "{kind}", "reason": "stub decision"}}'
+    return "OK"
+
+
+NYC_EPOCH = datetime(2024, 1, 1)
+NTA_GRID = (13, 15)  # rows x columns of synthetic neighborhoods
+
+
+def _stamp(days: int = 0) -> str:
+    return (NYC_EPOCH + timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S.000")
+
+
+def _pantry_record(i: int, revision: int) -> Dict[str, Any]:
+    borough = BOROUGHS[i % len(BOROUGHS)]
+    address = f"{i + 1} {STREETS[i % len(STREETS)]}, {borough}, NY"
+    lat, lng = _synthetic_point(address)
+    phone = f"212-555-{i % 10000:04d}"
+    updated_at = _stamp()
+    if i % 10 == 0 and revision:
+        phone = f"718-{revision % 1000:03d}-{i % 10000:04d}"
+        updated_at = _stamp(revision)
+    return {
+        ":id": f"row-{i:08d}",
+        ":updated_at": updated_at,
+        "name": f"Community Pantry {i:05d}",
+        "address": address,
+        "borough": borough,
+        "latitude": f"{lat:.6f}",
+        "longitude": f"{lng:.6f}",
+        "phone": phone,
+        "hours": "Mon-Fri 9am-5pm",
+        "status": "Open",
+    }
+
+
+def _neighborhood_record(i: int) -> Dict[str, Any]:
+    rows, cols = NTA_GRID
+    r, c = divmod(i, cols)
+    lat0 = NYC_LAT[0] + (NYC_LAT[1] - NYC_LAT[0]) * r / rows
+    lat1 = NYC_LAT[0] + (NYC_LAT[1] - NYC_LAT[0]) * (r + 1) / rows
+    lng0 = NYC_LNG[0] + (NYC_LNG[1] - NYC_LNG[0]) * c / cols
+    lng1 = NYC_LNG[0] + (NYC_LNG[1] - NYC_LNG[0]) * (c + 1) / cols
+    ring = [[lng0, lat0], [lng1, lat0], [lng1, lat1], [lng0, lat1], [lng0, lat0]]
+    borough = BOROUGHS[c * len(BOROUGHS) // cols]
+    return {
+        ":id": f"row-nta-{i:04d}",
+        ":updated_at": _stamp(),
+        "nta2020": f"{borough[:2].upper()}{i:04d}",
+        "ntaname": f"{borough} Grid {r:02d}-{c:02d}",
+        "boroname": borough,
+        "shape_area": f"{(lat1 - lat0) * (lng1 - lng0) * 364000 * 276000:.1f}",
+        "shape_leng": f"{2 * ((lat1 - lat0) * 364000 + (lng1 - lng0) * 276000):.1f}",
+        "the_geom": {"type": "MultiPolygon", "coordinates": [[ring]]},
+    }
+
+
+def _traffic_record(i: int) -> Dict[str, Any]:
+    lat, lng = _synthetic_point(f"segment-{i % 500}")
+    # Rough EPSG:2263 (NY Long Island State Plane, US feet) around the city
+    x = 984000 + (lng + 74.0) * 276000
+    y = 195000 + (lat - 40.7) * 364000
+    hour = i % 24
+    day = (i // 24) % 28 + 1
+    rush = hour in (7, 8, 9, 16, 17, 18)
+    return {
+        ":id": f"row-atvc-{i:08d}",
+        ":updated_at": _stamp(),
+        "requestid": str(1000 + i // 96),
+        "boro": BOROUGHS[i % len(BOROUGHS)],
+        "yr": "2024",
+        "m": "2",
+        "d": str(day),
+        "hh": str(hour),
+        "mm": str((i // 24) % 4 * 15),
+        "vol": str(40 + _digest(f"vol-{i}") % (400 if rush else 150)),
+        "segmentid": str(100000 + i % 500),
+        "wktgeom": f"POINT ({x:.4f} {y:.4f})",
+        "street": STREETS[i % len(STREETS)],
+        "fromst": STREETS[(i + 1) % len(STREETS)],
+        "tost": STREETS[(i + 2) % len(STREETS)],
+        "direction": "NB" if i % 2 else "SB",
+    }
+
+
+def _nyc_rows(dataset: str) -> List[Dict[str, Any]]:
+    revision = int(os.getenv("STUB_NYC_REVISION", "0") or 0)
+    if dataset == "fn6f-htvy":
+        return [_neighborhood_record(i) for i in range(NTA_GRID[0] * NTA_GRID[1])]
+    if dataset == "7ym2-wayt":
+        return [_traffic_record(i) for i in range(int(os.getenv("STUB_NYC_TRAFFIC_ROWS", "5000")))]
+    return [_pantry_record(i, revision) for i in range(int(os.getenv("STUB_NYC_ROWS", "20000")))]
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Provider stub")
+    models = _load_models()
+
+    async def simulate(provider: str):
+        model = models[provider]
+        await asyncio.sleep(model.sample_seconds())
+        if model.should_fail():
+            return JSONResponse(
+                status_code=ERROR_STATUS[provider],
+                content={"error": f"stubbed {provider.lower()} failure"},
+            )
+        return None
+
+    @app.post("/v1beta/models/{model_action}")
+    async def gemini_generate_content(model_action: str, request: Request):
+        failure = await simulate("GEMINI")
+        if failure:
+            return failure
+        body = await request.json()
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": _gemini_answer(prompt)}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }]
+        }
+
+    @app.get("/resource/{dataset}.json")
+    async def nyc_open_data(dataset: str, request: Request):
+        failure = await simulate("NYC")
+        if failure:
+            return failure
+        params = request.query_params
+        rows = _nyc_rows(dataset)
+        since = re.search(r":updated_at\s*>\s*'([^']+)'", params.get("$where", ""))
+        if since:
+            rows = [row for row in rows if row[":updated_at"] > since.group(1)]
+        if "count(" in params.get("$select", ""):
+            return [{"count": str(len(rows))}]
+        offset = int(params.get("$offset", 0))
+        limit = int(params.get("$limit", 1000))
+        return rows[offset:offset + limit]
+
+    @app.get("/search")
+    async def nominatim_search(q: str, limit: int = 1):
+        failure = await simulate("NOMINATIM")
+        if failure:
+            return failure
+        results = []
+        for rank in range(max(1, min(limit, 10))):
+            lat, lng = _synthetic_point(q if rank == 0 else f"{q}#{rank}")
+            results.append({
+                "place_id": _digest(f"{q}#{rank}") % 10**9,
+                "lat": f"{lat:.7f}",
+                "lon": f"{lng:.7f}",
+                "display_name": q if rank == 0 else f"{q} ({rank})",
+                "class": "place",
+                "type": "house",
+                "importance": round(1.0 - rank * 0.1, 2),
+                "boundingbox": [f"{lat - 0.0005:.7f}", f"{lat + 0.0005:.7f}",
+                                f"{lng - 0.0005:.7f}", f"{lng + 0.0005:.7f}"],
+            })
+        return results
+
+    async def _directions(request: Request) -> Dict[str, Any]:
+        body = await request.json()
+        coords = body.get("coordinates", [])
+        segments = []
+        total_distance = 0.0
+        for start, end in zip(coords, coords[1:]):
+            distance = _haversine_m(start, end) * DETOUR_FACTOR
+            duration = distance / AVERAGE_SPEED_MPS
+            total_distance += distance
+            segments.append({
+                "distance": round(distance, 1),
+                "duration": round(duration, 1),
+                "steps": [
+                    {"distance": round(distance * 0.3, 1), "duration": round(duration * 0.3, 1),
+                     "instruction": "Head north", "name": "-"},
+                    {"distance": round(distance * 0.7, 1), "duration": round(duration * 0.7, 1),
+                     "instruction": "Continue to destination", "name": "-"},
+                ],
+            })
+        return {
+            "routes": [{
+                "summary": {
+                    "distance": round(total_distance, 1),
+                    "duration": round(total_distance / AVERAGE_SPEED_MPS, 1),
+                },
+                "segments": segments,
+            }]
+        }
+
+    @app.post("/v2/directions/{profile}")
+    @app.post("/v2/directions/{profile}/json")
+    async def ors_directions(profile: str, request: Request):
+        failure = await simulate("ORS")
+        if failure:
+            return failure
+        return await _directions(request)
+
+    @app.post("/v2/matrix/{profile}")
+    async def ors_matrix(profile: str, request: Request):
+        failure = await simulate("ORS")
+        if failure:
+            return failure
+        body = await request.json()
+        locations = body.get("locations", [])
+        sources = body.get("sources") or list(range(len(locations)))
+        destinations = body.get("destinations") or list(range(len(locations)))
+        metrics = body.get("metrics") or ["duration"]
+        distances = [
+            [_haversine_m(locations[s], locations[d]) * DETOUR_FACTOR for d in destinations]
+            for s in sources
+        ]
+        result: Dict[str, Any] = {}
+        if "distance" in metrics:
+            result["distances"] = [[round(v, 1) for v in row] for row in distances]
+        if "duration" in metrics:
+            result["durations"] = [[round(v / AVERAGE_SPEED_MPS, 1) for v in row] for row in distances]
+        return result
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local Gemini/Nominatim/ORS stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,143 @@
+"""
+Response compression: brotli when the client accepts it and the optional
+`brotli` package is installed, otherwise gzip.
+
+Bodies under COMPRESSION_MIN_BYTES are sent as they are (the headers would
+cost more than the saving). Server-Sent Events are never compressed, since
+a compressor holds back bytes that the client should see immediately.
+Other streamed bodies (CSV, NDJSON) are compressed as they go.
+"""
+import os
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+# Already compressed, or must reach the client unbuffered
+SKIP_CONTENT_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip")
+
+
+def choose_encoding(accept_encoding: str, brotli_available: bool = brotli is not None) -> Optional[str]:
+    """Best of br/gzip allowed by an Accept-Encoding header, or None"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for encoding in (("br", "gzip") if brotli_available else ("gzip",)):
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._finish = self._compressor.finish
+            self.compress = self._compressor.process
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+            self._finish = self._compressor.flush
+            self.compress = self._compressor.compress
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024")),
+        gzip_level: int = int(os.getenv("GZIP_LEVEL", "6")),
+        brotli_quality: int = int(os.getenv("BROTLI_QUALITY", "5")),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self))
+
+
+class _CompressingSend:
+    """Wraps ASGI `send`: holds the response start until the first body chunk decides the encoding"""
+
+    def __init__(self, send, encoding: str, options: CompressionMiddleware):
+        self.send = send
+        self.encoding = encoding
+        self.options = options
+        self.start = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = {name.lower(): value for name, value in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            self.passthrough = (
+                b"content-encoding" in headers
+                or message["status"] in (204, 304)
+                or any(content_type.startswith(skip) for skip in SKIP_CONTENT_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not more_body and len(body) < self.options.minimum_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.compressor = _Compressor(self.encoding, self.options.gzip_level, self.options.brotli_quality)
+            headers, vary = [], [b"Accept-Encoding"]
+            for name, value in self.start.get("headers", []):
+                if name.lower() == b"vary":
+                    vary.insert(0, value)
+                elif name.lower() != b"content-length":
+                    headers.append((name, value))
+            headers.append((b"content-encoding", self.encoding.encode()))
+            headers.append((b"vary", b", ".join(vary)))
+            if not more_body:
+                # Whole body at once (the usual JSON case): exact length
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                headers.append((b"content-length", str(len(compressed)).encode()))
+                await self.send({**self.start, "headers": headers})
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            await self.send({**self.start, "headers": headers})
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.finish()
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
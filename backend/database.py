@@ -1,7 +1,17 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+import asyncio
 import os
+import threading
+import time
+import weakref
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,26 +23,501 @@ if not DATABASE_URL:
     DATABASE_URL = "sqlite:///./food_rescue.db"
     print("Using SQLite database (food_rescue.db). For production, use PostgreSQL or Neon.")
 
-# SQLite needs special configuration
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-elif DATABASE_URL.startswith("postgresql"):
-    # Neon and other PostgreSQL databases
-    # Ensure SSL mode is set for Neon
-    if "sslmode" not in DATABASE_URL:
-        separator = "&" if "?" in DATABASE_URL else "?"
-        DATABASE_URL = f"{DATABASE_URL}{separator}sslmode=require"
-    
-    from sqlalchemy.pool import NullPool
-    engine = create_engine(
-        DATABASE_URL,
-        poolclass=NullPool,  # Neon handles connection pooling
-        pool_pre_ping=True,  # Verify connections before using
-    )
-else:
-    engine = create_engine(DATABASE_URL)
+# Connection pooling
+#   queue   - local QueuePool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW, recycled
+#             after DB_POOL_RECYCLE seconds (default)
+#   bouncer - no local pooling; every checkout opens a connection to an external
+#             pooler such as PgBouncer or Neon's "-pooler" endpoint
+POOL_MODES = ("queue", "bouncer")
+
+
+class PoolMetrics:
+    """Checkout latency and saturation for one engine's connection pool"""
+
+    def __init__(self, mode: str, capacity: Optional[int], window: int = 1000):
+        self.mode = mode
+        self.capacity = capacity
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def record_checkout(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self._latencies.append(seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def on_connect(self, *args) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, *args) -> None:
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def on_checkin(self, *args) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            in_use, peak = self.in_use, self.peak_in_use
+            counters = {"checkouts": self.checkouts, "connects": self.connects, "timeouts": self.timeouts}
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+
+        return {
+            "mode": self.mode,
+            **counters,
+            "checkout_ms": {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(latencies[-1] * 1000, 3) if latencies else None,
+            },
+            "in_use": in_use,
+            "peak_in_use": peak,
+            "capacity": self.capacity,
+            "saturation": round(in_use / self.capacity, 3) if self.capacity else None,
+        }
+
+
+class _TimedPoolMixin:
+    """Times `connect()` (the checkout path) and counts pool timeouts"""
+
+    metrics: PoolMetrics = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+
+def _timed_pool_class(base, metrics: PoolMetrics):
+    # A class attribute survives pool.recreate(), which instantiates self.__class__
+    return type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"metrics": metrics})
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _prepare_url(url: str) -> str:
+    if url.startswith("postgresql") and "sslmode" not in url:
+        # Neon and other hosted PostgreSQL databases require SSL
+        separator = "&" if "?" in url else "?"
+        url = f"{url}{separator}sslmode=require"
+    return url
+
+
+def async_url(url: str) -> str:
+    """
+    Async-driver form of a database URL: aiosqlite for SQLite, asyncpg for
+    PostgreSQL (libpq's `sslmode` becomes asyncpg's `ssl`).
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite" and parsed.drivername != "sqlite+aiosqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    elif backend == "postgresql" and parsed.drivername != "postgresql+asyncpg":
+        query = dict(parsed.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(drivername="postgresql+asyncpg", query=query)
+    return parsed.render_as_string(hide_password=False)
+
+
+def pool_options(
+    url: str,
+    pool_mode: Optional[str] = None,
+    queue_pool=QueuePool
+) -> Tuple[str, Optional[int], Dict[str, Any]]:
+    """
+    Resolve the pool mode for `url`.
+
+    Returns (mode, capacity, create_engine() keyword arguments).
+    """
+    mode = pool_mode or os.getenv("DB_POOL_MODE")
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite must keep the dialect's single-connection pool
+        return "default", None, {"poolclass": parsed.get_dialect().get_pool_class(parsed)}
+    mode = mode or "queue"
+    if mode not in POOL_MODES:
+        raise ValueError(f"DB_POOL_MODE must be one of {', '.join(POOL_MODES)}, got {mode!r}")
+
+    if mode == "bouncer":
+        return mode, None, {"poolclass": NullPool}
+
+    pool_size = _env_int("DB_POOL_SIZE", 5)
+    max_overflow = _env_int("DB_MAX_OVERFLOW", 10)
+    return mode, pool_size + max_overflow, {
+        "poolclass": queue_pool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+
+
+# SQLite profiles, applied on every new connection
+#   performance - WAL journal (readers don't block the writer), synchronous=NORMAL
+#                 (durable at checkpoints, safe against corruption in WAL mode),
+#                 memory-mapped reads, a larger page cache and a busy timeout so
+#                 writers from other processes wait instead of failing
+#   default     - leave SQLite's own settings untouched
+SQLITE_PROFILES = ("performance", "default")
+
+
+def sqlite_pragmas(profile: Optional[str] = None) -> Dict[str, Any]:
+    profile = profile or os.getenv("SQLITE_PROFILE", "performance")
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"SQLITE_PROFILE must be one of {', '.join(SQLITE_PROFILES)}, got {profile!r}")
+    if profile == "default":
+        return {}
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        "cache_size": -_env_int("SQLITE_CACHE_KB", 64 * 1024),  # negative = KiB
+        "temp_store": "MEMORY",
+        "busy_timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+    }
+
+
+def _is_file_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _apply_sqlite_profile(engine, profile: Optional[str] = None) -> None:
+    pragmas = sqlite_pragmas(profile)
+    engine.sqlite_pragmas = pragmas
+    if not pragmas:
+        return
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    event.listen(engine, "connect", set_pragmas)
+
+
+class WriterQueue:
+    """
+    Process-wide FIFO lock that lets one write transaction at a time reach
+    SQLite. Waiting here is cheap and ordered; waiting on SQLite's file lock
+    is a sleep/retry loop that gives up with "database is locked".
+    """
+
+    def __init__(self):
+        self._locks = weakref.WeakKeyDictionary()  # one asyncio.Lock per event loop
+        self._stats_lock = threading.Lock()
+        self._waits = deque(maxlen=1000)
+        self.acquisitions = 0
+        self.waiting = 0
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    async def acquire(self) -> None:
+        started = time.perf_counter()
+        with self._stats_lock:
+            self.waiting += 1
+        try:
+            await self._lock().acquire()
+        finally:
+            with self._stats_lock:
+                self.waiting -= 1
+        with self._stats_lock:
+            self.acquisitions += 1
+            self._waits.append(time.perf_counter() - started)
 
+    def release(self) -> None:
+        self._lock().release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            waits = sorted(self._waits)
+            acquisitions, waiting = self.acquisitions, self.waiting
+        return {
+            "acquisitions": acquisitions,
+            "waiting": waiting,
+            "wait_ms": {
+                "p50": round(waits[len(waits) // 2] * 1000, 3) if waits else None,
+                "p95": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 3) if waits else None,
+                "max": round(waits[-1] * 1000, 3) if waits else None,
+            },
+        }
+
+
+writer_queue = WriterQueue()
+
+
+class SingleWriterSession(AsyncSession):
+    """
+    AsyncSession that joins the writer queue at its first write (a DML
+    statement or a flush with pending changes) and leaves it on commit,
+    rollback or close. Reads never queue, and nothing is held while a
+    handler waits on geocoding or the AI model before it starts writing.
+    """
+
+    writer_queue = writer_queue
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._holds_writer = False
+
+    def _has_pending(self) -> bool:
+        session = self.sync_session
+        return bool(session.new or session.dirty or session.deleted)
+
+    async def _begin_write(self) -> None:
+        if not self._holds_writer:
+            await self.writer_queue.acquire()
+            self._holds_writer = True
+
+    def _end_write(self) -> None:
+        if self._holds_writer:
+            self._holds_writer = False
+            self.writer_queue.release()
+
+    async def execute(self, statement, *args, **kwargs):
+        if getattr(statement, "is_dml", False):
+            await self._begin_write()
+        return await super().execute(statement, *args, **kwargs)
+
+    async def flush(self, objects=None):
+        if self._has_pending():
+            await self._begin_write()
+        await super().flush(objects)
+
+    async def commit(self):
+        if self._has_pending():
+            await self._begin_write()
+        try:
+            await super().commit()
+        finally:
+            self._end_write()
+
+    async def rollback(self):
+        try:
+            await super().rollback()
+        finally:
+            self._end_write()
+
+    async def close(self):
+        try:
+            await super().close()
+        finally:
+            self._end_write()
+
+
+def _instrument(engine, metrics: PoolMetrics):
+    event.listen(engine.pool, "connect", metrics.on_connect)
+    event.listen(engine.pool, "checkout", metrics.on_checkout)
+    event.listen(engine.pool, "checkin", metrics.on_checkin)
+    engine.pool_metrics = metrics
+    return engine
+
+
+def create_db_engine(url: str, pool_mode: Optional[str] = None, sqlite_profile: Optional[str] = None, **kwargs):
+    """Build an engine for `url` with the configured pool and metrics attached"""
+    url = _prepare_url(url)
+    mode, capacity, options = pool_options(url, pool_mode)
+    metrics = PoolMetrics(mode, capacity)
+    options["poolclass"] = _timed_pool_class(options["poolclass"], metrics)
+    if url.startswith("sqlite"):
+        # SQLite needs special configuration
+        kwargs.setdefault("connect_args", {"check_same_thread": False})
+    engine = create_engine(url, **options, **kwargs)
+    if _is_file_sqlite(url):
+        _apply_sqlite_profile(engine, sqlite_profile)
+    return _instrument(engine, metrics)
+
+
+def create_async_db_engine(url: str, pool_mode: Optional[str] = None, sqlite_profile: Optional[str] = None, **kwargs):
+    """Async counterpart of `create_db_engine`, sharing the same pool settings"""
+    url = async_url(_prepare_url(url))
+    mode, capacity, options = pool_options(url, pool_mode, queue_pool=AsyncAdaptedQueuePool)
+    metrics = PoolMetrics(mode, capacity)
+    options["poolclass"] = _timed_pool_class(options["poolclass"], metrics)
+    if mode == "bouncer" and url.startswith("postgresql+asyncpg"):
+        # Transaction-mode poolers can't keep server-side prepared statements
+        kwargs.setdefault("connect_args", {"statement_cache_size": 0, "prepared_statement_cache_size": 0})
+    async_engine = create_async_engine(url, **options, **kwargs)
+    if _is_file_sqlite(url):
+        _apply_sqlite_profile(async_engine.sync_engine, sqlite_profile)
+    # Metrics live on the underlying sync engine (AsyncEngine uses __slots__)
+    _instrument(async_engine.sync_engine, metrics)
+    return async_engine
+
+
+def session_class(url: str):
+    """
+    AsyncSession class for `url`: SQLite allows one writer at a time, so its
+    sessions queue their writes (SQLITE_SINGLE_WRITER=false to opt out)
+    """
+    if make_url(url).get_backend_name() == "sqlite" and \
+            os.getenv("SQLITE_SINGLE_WRITER", "true").lower() == "true":
+        return SingleWriterSession
+    return AsyncSession
+
+
+DATABASE_URL = _prepare_url(DATABASE_URL)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+
+# Sync engine for scripts (seed_data.py, init_db.py) and Alembic
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API
+async_engine = create_async_db_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=session_class(ASYNC_DATABASE_URL), autoflush=False, expire_on_commit=False
+)
+
+# Optional read replica for read-only endpoints (DATABASE_READ_URL). Without
+# it, reads go to the primary like everything else.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+read_engine = None
+ReadSessionLocal = None
+if DATABASE_READ_URL:
+    DATABASE_READ_URL = _prepare_url(DATABASE_READ_URL)
+    read_engine = create_async_db_engine(async_url(DATABASE_READ_URL))
+    ReadSessionLocal = async_sessionmaker(
+        read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
 Base = declarative_base()
 
+
+class ReplicaLagMonitor:
+    """
+    Whether the read replica is fit to serve reads: reachable, and (on
+    PostgreSQL) no more than DB_READ_MAX_LAG_SECONDS behind the primary.
+    Checked at most every DB_READ_LAG_CHECK_SECONDS, on the request path;
+    requests arriving while a check runs use the previous result.
+    """
+
+    # Zero when the replica has replayed everything it received (an idle
+    # primary would otherwise look like growing lag)
+    POSTGRES_LAG_SQL = (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    )
+
+    def __init__(self, engine, max_lag_seconds: float, check_seconds: float):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.lag_seconds: Optional[float] = None  # None: not measurable (e.g. SQLite)
+        self.error: Optional[str] = None
+        self.checks = 0
+        self._checked_at: Optional[float] = None
+        self._checking = False
+        self.routed = {"replica": 0, "primary": 0}
+
+    async def check(self) -> None:
+        self._checking = True
+        try:
+            async with self.engine.connect() as connection:
+                if connection.dialect.name == "postgresql":
+                    lag = (await connection.execute(text(self.POSTGRES_LAG_SQL))).scalar()
+                    self.lag_seconds = float(lag or 0.0)
+                else:
+                    await connection.execute(text("SELECT 1"))
+                    self.lag_seconds = None
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.checks += 1
+            self._checked_at = time.monotonic()
+            self._checking = False
+
+    async def usable(self) -> bool:
+        stale = self._checked_at is None or time.monotonic() - self._checked_at >= self.check_seconds
+        if stale and not self._checking:
+            await self.check()
+        if self.error or self._checked_at is None:
+            return False
+        return self.lag_seconds is None or self.lag_seconds <= self.max_lag_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "error": self.error,
+            "checks": self.checks,
+            "checked_ago_s": round(time.monotonic() - self._checked_at, 3) if self._checked_at else None,
+            "routed": dict(self.routed),
+        }
+
+
+replica_monitor = ReplicaLagMonitor(
+    read_engine,
+    max_lag_seconds=float(os.getenv("DB_READ_MAX_LAG_SECONDS", "5")),
+    check_seconds=float(os.getenv("DB_READ_LAG_CHECK_SECONDS", "2")),
+) if read_engine is not None else None
+
+# After a client writes, its reads stay on the primary this long. Longer than
+# the lag the replica is allowed, so a client always sees its own writes.
+READ_PIN_SECONDS = float(os.getenv("DB_READ_PIN_SECONDS", "10"))
+
+
+async def read_session_factory(pinned: bool = False) -> Tuple[async_sessionmaker, str]:
+    """
+    (session factory, "replica" | "primary") for a read-only request. The
+    primary serves it when there is no replica, the client is pinned after a
+    write, or the replica is unreachable or lagging.
+    """
+    if replica_monitor is None:
+        return AsyncSessionLocal, "primary"
+    role = "replica" if not pinned and await replica_monitor.usable() else "primary"
+    replica_monitor.routed[role] += 1
+    return (ReadSessionLocal if role == "replica" else AsyncSessionLocal), role
+
+
+def pool_status() -> Dict[str, Any]:
+    """Pool metrics plus SQLAlchemy's own pool status line, per engine"""
+    status = {
+        "async": {**async_engine.sync_engine.pool_metrics.snapshot(), "status": async_engine.pool.status()},
+        "sync": {**engine.pool_metrics.snapshot(), "status": engine.pool.status()},
+    }
+    if read_engine is not None:
+        status["read"] = {**read_engine.sync_engine.pool_metrics.snapshot(), "status": read_engine.pool.status()}
+        status["replica"] = replica_monitor.snapshot()
+    if getattr(async_engine.sync_engine, "sqlite_pragmas", None) is not None:
+        status["sqlite"] = {"pragmas": async_engine.sync_engine.sqlite_pragmas}
+        if AsyncSessionLocal.class_ is SingleWriterSession:
+            status["sqlite"]["writer_queue"] = writer_queue.snapshot()
+    return status
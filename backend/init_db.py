@@ -5,14 +5,15 @@ import os
 from sqlalchemy import create_engine, text
 from database import Base, engine, SessionLocal
 from models import *
+from migrate import run_migrations
 from dotenv import load_dotenv
 
 load_dotenv()
 
 def init_database():
-    """Create all database tables"""
+    """Create all database tables by applying the Alembic migrations"""
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    run_migrations()
     print("✅ Database tables created successfully!")
 
 def check_database_connection():
@@ -1,33 +1,61 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from typing import List, Optional
+from datetime import datetime, timedelta
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
 
-from database import SessionLocal, engine, Base
-from models import Donor, Recipient, Donation, Driver, Route, RouteStop
+from database import (
+    AsyncSessionLocal, READ_PIN_SECONDS, async_engine, pool_status, read_engine, read_session_factory,
+    replica_monitor
+)
+from migrate import run_migrations
+from serialization import FastJSONResponse, json_response
+from compression import CompressionMiddleware
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, cursor_key, paginate, parse_fields, project, split_page
+from models import Donor, Recipient, Donation, Driver, Route, RouteStop, DonationStatus, RouteStatus, Job
 from schemas import (
     DonationCreate, DonationResponse,
     RouteCreate, RouteResponse,
-    ImpactResponse,
+    ImpactResponse, ImpactBatchRequest, ImpactScenarioRequest,
     DonorCreate, RecipientCreate, DriverCreate
 )
 from services.matching_service import MatchingService
 from services.routing_service import RoutingService
 from services.impact_service import ImpactService
-from services.ai_agent import AIAgent
+from services.rollup_service import RollupService
+from services.ai_agent import AIAgent, get_ai_agent
 from services.nyc_data_service import NYCDataService
+from services.nyc_snapshot import get_nyc_snapshot
+from services.traffic_index import HOURS_PER_WEEK, get_traffic_index
+from services.neighborhood_index import neighborhood_for
+from services.neighborhood_service import NeighborhoodService
+from services.providers import make_geocoder
+from services.spatial_repository import SpatialRepository
+from services.archive_service import ArchiveService, with_archive
+from services.event_bus import get_event_bus
+from services.live_updates import TOPICS as LIVE_TOPICS, event_stream
+from services.change_versions import change_versions
+from services.snapshot_cache import SnapshotCache
+from services.bulk_ingest import FORMATS as BULK_FORMATS, BulkIngestService
+from services.donation_enrichment import ENRICH_DONATIONS
+from services.job_queue import JobWorkerPool, enqueue, get_job_pool, job_payload
+from services.idempotency import IdempotencyError, IdempotentRequest, idempotent, purge_expired as purge_idempotency_keys
 
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title="Food Rescue Route AI API",
     description="Intelligent Food Recovery & Route Optimization Platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -43,15 +71,239 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Read-Pin", "X-DB-Role", "ETag", "X-Cache", "Idempotent-Replayed"],
 )
+# gzip, or brotli when installed and accepted, for bodies over COMPRESSION_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Read-your-writes: a successful write pins the client's reads to the primary
+# for READ_PIN_SECONDS. Browsers carry the cookie; other clients can echo the
+# X-Read-Pin response header back as a request header.
+READ_PIN_COOKIE = "read_pin"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@app.middleware("http")
+async def pin_reads_after_writes(request: Request, call_next):
+    response = await call_next(request)
+    if read_engine is not None and request.method not in SAFE_METHODS and response.status_code < 400:
+        pinned_until = f"{time.time() + READ_PIN_SECONDS:.3f}"
+        response.set_cookie(
+            READ_PIN_COOKIE, pinned_until, max_age=int(READ_PIN_SECONDS) + 1, httponly=True, samesite="lax"
+        )
+        response.headers["X-Read-Pin"] = pinned_until
+    return response
+
+
+@app.on_event("startup")
+async def warm_up_ai_agent():
+    """Build the shared AI agent off the request path so the first donation doesn't pay for it"""
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, get_ai_agent().warm_up)
+
+
+@app.on_event("startup")
+async def start_event_bus():
+    """Connect the live-update bus (Redis when EVENT_BUS_URL is set)"""
+    await get_event_bus().start()
+
+
+@app.on_event("startup")
+async def apply_migrations():
+    """Bring the schema to the latest Alembic revision (DB_AUTO_MIGRATE=false to skip)"""
+    if os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true":
+        await run_in_threadpool(run_migrations, False)
+
+
+async def _reconcile_impact_totals() -> dict:
+    async with AsyncSessionLocal() as db:
+        return await ImpactService(db).reconcile_totals()
+
+
+async def _backfill_impact_rollups() -> None:
+    async with AsyncSessionLocal() as db:
+        rollup_service = RollupService(db)
+        if await rollup_service.is_empty():
+            await rollup_service.rebuild()
+
+
+async def _reconcile_impact_periodically(interval_seconds: float):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            corrections = await _reconcile_impact_totals()
+            if corrections:
+                print(f"Impact totals reconciled: {corrections}")
+        except Exception as e:
+            print(f"Impact reconciliation error: {e}")
+
+
+@app.on_event("startup")
+async def start_impact_reconciliation():
+    """Seed/repair impact counters at boot, then re-check them on an interval"""
+    await _reconcile_impact_totals()
+    await _backfill_impact_rollups()
+    interval = float(os.getenv("IMPACT_RECONCILE_INTERVAL_SECONDS", "3600"))
+    if interval > 0:
+        app.state.impact_reconciler = asyncio.create_task(_reconcile_impact_periodically(interval))
+
+
+async def _archive_periodically(interval_seconds: float):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            async with AsyncSessionLocal() as db:
+                moved = await ArchiveService(db).archive()
+            if moved["donations"]:
+                print(f"Archived {moved}")
+        except Exception as e:
+            print(f"Archival error: {e}")
+
+
+@app.on_event("startup")
+async def start_archival():
+    """Move old completed/expired donations to the archive tables on an interval"""
+    interval = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "86400"))
+    if interval > 0:
+        app.state.archiver = asyncio.create_task(_archive_periodically(interval))
+
+
+async def _purge_idempotency_keys_periodically(interval_seconds: float):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            async with AsyncSessionLocal() as db:
+                purged = await purge_idempotency_keys(db)
+            if purged:
+                print(f"Purged {purged} expired idempotency keys")
+        except Exception as e:
+            print(f"Idempotency key purge error: {e}")
+
+
+@app.on_event("startup")
+async def start_idempotency_purge():
+    """Delete stored Idempotency-Key responses past their TTL on an interval"""
+    interval = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+    if interval > 0:
+        app.state.idempotency_purger = asyncio.create_task(_purge_idempotency_keys_periodically(interval))
+
+
+async def _tag_neighborhoods(retag: bool = False) -> dict:
+    async with AsyncSessionLocal() as db:
+        return await NeighborhoodService(db).tag(retag=retag)
+
+
+async def _sync_nyc_data(datasets=None, full: bool = False) -> dict:
+    """Sync the snapshot; re-tag every row when the NTA boundaries changed"""
+    results = await NYCDataService().sync(datasets, full=full)
+    neighborhoods = results.get("neighborhoods")
+    if neighborhoods and (neighborhoods["fetched"] or neighborhoods["mode"] == "full"):
+        await _tag_neighborhoods(retag=True)
+    return results
+
+
+async def _sync_nyc_data_periodically(interval: float):
+    while True:
+        try:
+            await _sync_nyc_data()
+        except Exception as e:
+            print(f"NYC Open Data sync failed: {e}")
+        await asyncio.sleep(interval)
+
+
+@app.on_event("startup")
+async def load_nyc_snapshot():
+    """Memory-map the local NYC Open Data snapshot; optionally keep it fresh in the background"""
+    snapshot = get_nyc_snapshot()
+    await run_in_threadpool(snapshot.load)
+    await run_in_threadpool(get_traffic_index().refresh, snapshot.get("traffic"))
+    await _tag_neighborhoods()
+    interval = float(os.getenv("NYC_SYNC_INTERVAL_SECONDS", "0"))
+    if interval > 0:
+        app.state.nyc_sync = asyncio.create_task(_sync_nyc_data_periodically(interval))
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Run queued background jobs (donation enrichment); JOB_WORKERS=0 leaves them to other processes"""
+    pool = JobWorkerPool(AsyncSessionLocal)
+    if pool.workers > 0:
+        await pool.start()
+        app.state.job_workers = pool
+
+
+@app.on_event("shutdown")
+async def close_database():
+    """Stop background tasks and close pooled connections"""
+    for task_name in ("impact_reconciler", "nyc_sync", "archiver", "idempotency_purger"):
+        task = getattr(app.state, task_name, None)
+        if task:
+            task.cancel()
+    job_workers = getattr(app.state, "job_workers", None)
+    if job_workers:
+        await job_workers.stop()
+    await get_event_bus().stop()
+    await async_engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
+
 
 # Dependency
-def get_db():
-    db = SessionLocal()
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _read_pinned(request: Request) -> bool:
+    value = request.headers.get("X-Read-Pin") or request.cookies.get(READ_PIN_COOKIE)
     try:
+        return value is not None and float(value) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_db(request: Request, response: Response):
+    """
+    Session for read-only endpoints: the read replica (DATABASE_READ_URL)
+    unless the client wrote recently or the replica is lagging, in which case
+    the primary. `X-DB-Role` tells which one answered.
+    """
+    session_factory, role = await read_session_factory(_read_pinned(request))
+    response.headers["X-DB-Role"] = role
+    if role == "replica" and "etag" in response.headers and change_versions.changed_within(
+        replica_monitor.max_lag_seconds
+    ):
+        # The replica may not have the latest change yet; don't let clients cache this
+        del response.headers["etag"]
+    async with session_factory() as db:
         yield db
-    finally:
-        db.close()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    return any(tag.strip().removeprefix("W/") == etag.removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def conditional_get(*tables: str, period_seconds: Optional[float] = None):
+    """
+    Route dependency for read endpoints: sets an ETag built from the change
+    versions of `tables` and answers 304 when If-None-Match already holds
+    it, before any database work. `period_seconds` also rolls the tag over
+    on a clock, for payloads that change with the time of day.
+    """
+    async def check(request: Request, response: Response):
+        clock = str(int(time.time() // period_seconds)) if period_seconds else None
+        etag = change_versions.etag(tables, clock)
+        if _etag_matches(request.headers.get("If-None-Match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        response.headers["ETag"] = etag
+        # Cache, but revalidate every time
+        response.headers["Cache-Control"] = "no-cache"
+    return Depends(check)
 
 
 @app.get("/")
@@ -65,13 +317,28 @@ async def health_check():
     return {"status": "healthy", "database": "connected"}
 
 
+@app.get("/health/db")
+async def db_health_check():
+    """Connection pool checkout latency and saturation"""
+    return pool_status()
+
+
+@app.get("/health/ai")
+async def ai_health_check(probe: bool = False, ai_agent: AIAgent = Depends(get_ai_agent)):
+    """AI agent readiness; `probe=true` measures a live model round trip"""
+    if probe:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, ai_agent.health, True)
+    return ai_agent.health()
+
+
 @app.post("/donor", response_model=dict)
-async def create_donor(donor: DonorCreate, db: Session = Depends(get_db)):
+async def create_donor(donor: DonorCreate, db: AsyncSession = Depends(get_db)):
     """Create a new donor"""
     try:
         # Geocode address
         routing_service = RoutingService()
-        coords = routing_service._geocode_address(donor.address)
+        coords = await routing_service.geocode(donor.address)
         
         donor_data = donor.model_dump()
         if coords:
@@ -80,145 +347,116 @@ async def create_donor(donor: DonorCreate, db: Session = Depends(get_db)):
         
         db_donor = Donor(**donor_data)
         db.add(db_donor)
-        db.commit()
-        db.refresh(db_donor)
+        await db.commit()
+        await db.refresh(db_donor)
         return {"id": db_donor.id, "message": "Donor created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create donor: {str(e)}")
 
 
 @app.post("/recipient", response_model=dict)
-async def create_recipient(recipient: RecipientCreate, db: Session = Depends(get_db)):
+async def create_recipient(recipient: RecipientCreate, db: AsyncSession = Depends(get_db)):
     """Create a new recipient"""
     try:
         # Geocode address
         routing_service = RoutingService()
-        coords = routing_service._geocode_address(recipient.address)
+        coords = await routing_service.geocode(recipient.address)
         
         recipient_data = recipient.model_dump()
         if coords:
             recipient_data["latitude"] = coords[0]
             recipient_data["longitude"] = coords[1]
+            recipient_data["neighborhood_code"] = neighborhood_for(*coords)
         
         db_recipient = Recipient(**recipient_data)
         db.add(db_recipient)
-        db.commit()
-        db.refresh(db_recipient)
+        await db.commit()
+        await db.refresh(db_recipient)
         return {"id": db_recipient.id, "message": "Recipient created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create recipient: {str(e)}")
 
 
 @app.post("/driver", response_model=dict)
-async def create_driver(driver: DriverCreate, db: Session = Depends(get_db)):
+async def create_driver(driver: DriverCreate, db: AsyncSession = Depends(get_db)):
     """Create a new driver"""
     try:
         driver_data = driver.model_dump()
         if driver.current_location:
             routing_service = RoutingService()
-            coords = routing_service._geocode_address(driver.current_location)
+            coords = await routing_service.geocode(driver.current_location)
             if coords:
                 driver_data["latitude"] = coords[0]
                 driver_data["longitude"] = coords[1]
         
         db_driver = Driver(**driver_data)
         db.add(db_driver)
-        db.commit()
-        db.refresh(db_driver)
+        await db.commit()
+        await db.refresh(db_driver)
         return {"id": db_driver.id, "message": "Driver created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create driver: {str(e)}")
 
 
-@app.post("/donation", response_model=DonationResponse)
-async def create_donation(donation: DonationCreate, db: Session = Depends(get_db)):
-    """Create a new food donation and trigger matching"""
+def _replay(request: IdempotentRequest) -> Response:
+    """The stored response of an Idempotency-Key's first request"""
+    status_code, body = request.replay
+    replayed = json_response(body, status_code=status_code)
+    replayed.headers["Idempotent-Replayed"] = "true"
+    return replayed
+
+
+@app.post("/donation", response_model=DonationResponse, status_code=202)
+async def create_donation(
+    donation: DonationCreate,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Create a new food donation. Classification, geocoding, perishability and
+    matching run as a background job; poll status_url for the match results.
+    A retry with the same Idempotency-Key returns the first response.
+    """
     try:
-        matching_service = MatchingService(db)
-        ai_agent = AIAgent()
-        
-        # Check if donor exists, if not create a default one
-        donor = db.query(Donor).filter(Donor.id == donation.donor_id).first()
-        if not donor:
-            # Create a default donor for testing
-            donor = Donor(
-                id=donation.donor_id,
-                name="Default Donor",
-                email="donor@example.com",
-                address=donation.address,
-                business_type="restaurant"
-            )
-            db.add(donor)
-            db.commit()
-        
-        # Use AI to classify food category if not provided
-        if not donation.food_category:
-            from datetime import datetime
-            category_str = await ai_agent.classify_food_category(donation.food_type)
-            # Map string to enum
-            from models import FoodCategory
-            category_map = {
-                "produce": FoodCategory.PRODUCE,
-                "bakery": FoodCategory.BAKERY,
-                "prepared": FoodCategory.PREPARED,
-                "packaged": FoodCategory.PACKAGED,
-                "frozen": FoodCategory.FROZEN,
-                "dairy": FoodCategory.DAIRY
-            }
-            donation.food_category = category_map.get(category_str, FoodCategory.PACKAGED)
-        
-        # Geocode address
-        routing_service = RoutingService()
-        coords = routing_service._geocode_address(donation.address)
-        
-        # Create donation record
-        donation_data = donation.model_dump()
-        if coords:
-            donation_data["latitude"] = coords[0]
-            donation_data["longitude"] = coords[1]
-        
-        db_donation = Donation(**donation_data)
-        db.add(db_donation)
-        db.commit()
-        db.refresh(db_donation)
-        
-        # Calculate perishability score using AI
-        from datetime import datetime
-        perishability_score = matching_service.calculate_perishability_score(db_donation)
-        # Also use AI to refine it
-        ai_perishability = await ai_agent.estimate_perishability(
-            db_donation.food_type,
-            db_donation.food_category.value if db_donation.food_category else "packaged",
-            str(db_donation.posted_at)
-        )
-        # Average of both
-        db_donation.perishability_score = (perishability_score + ai_perishability) / 2
-        db.commit()
-        
-        # Run matching to find recipients
-        recipient_options = matching_service.find_matching_recipients(db_donation)
-        
-        # Calculate match scores
-        match_scores = []
-        for recipient in recipient_options:
-            score = matching_service.calculate_match_score(db_donation, recipient)
-            match_scores.append({
-                "recipient_id": recipient.id,
-                "recipient_name": recipient.name,
-                "score": score,
-                "distance_miles": matching_service.calculate_distance(
-                    db_donation.address, recipient.address
+        async with idempotent(db, "POST /donation", idempotency_key, donation) as request:
+            if request.replay:
+                return _replay(request)
+            
+            # Check if donor exists, if not create a default one
+            donor = await db.get(Donor, donation.donor_id)
+            if not donor:
+                # Create a default donor for testing
+                donor = Donor(
+                    id=donation.donor_id,
+                    name="Default Donor",
+                    email="donor@example.com",
+                    address=donation.address,
+                    business_type="restaurant"
                 )
-            })
-        
-        # Sort by score
-        match_scores.sort(key=lambda x: x["score"], reverse=True)
-        
-        return DonationResponse(
-            donation_id=db_donation.id,
-            recipient_options=[r.id for r in recipient_options],
-            match_scores=match_scores
-        )
+                db.add(donor)
+                await db.commit()
+            
+            db_donation = Donation(**donation.model_dump())
+            db.add(db_donation)
+            await ImpactService(db).record_donation_status(None, DonationStatus.PENDING, db_donation.quantity_lbs)
+            await db.flush()
+            # Same transaction: a committed donation always has its enrichment job
+            job = enqueue(db, ENRICH_DONATIONS, {"donation_ids": [db_donation.id]})
+            await db.flush()
+            
+            result = DonationResponse(
+                donation_id=db_donation.id,
+                recipient_options=[],
+                match_scores=[],
+                job_id=job.id,
+                status_url=f"/jobs/{job.id}"
+            )
+            # Stored with the donation, so a retry can never create a second one
+            await request.complete(result, status_code=202)
+            await db.commit()
+            return result
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -226,75 +464,173 @@ async def create_donation(donation: DonationCreate, db: Session = Depends(get_db
         raise HTTPException(status_code=500, detail=f"Failed to create donation: {str(e)}")
 
 
+BULK_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+@app.post("/donations/bulk", status_code=202)
+async def bulk_create_donations(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson; defaults from Content-Type")
+):
+    """
+    Create many donations from a CSV (header row) or NDJSON body, streamed.
+    Rows are validated and inserted in chunks before this returns; each
+    chunk's enrichment (classification, geocoding, perishability, matching)
+    is queued as one background job, tracked at the returned status_url.
+    If a chunk fails, the chunks before it stay inserted and the response is
+    a 500 with the same job body, listing the rows that didn't land.
+    """
+    fmt = format or BULK_CONTENT_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip().lower())
+    if fmt not in BULK_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format; pass ?format= one of {', '.join(BULK_FORMATS)} or a CSV/NDJSON Content-Type",
+        )
+    try:
+        job = await BulkIngestService(AsyncSessionLocal).ingest(request.stream(), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to ingest donations: {str(e)}")
+    # Per-row results are paged at status_url; the first invalid (and, after a
+    # failure part-way, not inserted) rows come back here
+    invalid_rows = [row for row in job.rows if row["status"] == "invalid"][:MAX_PAGE_SIZE]
+    failed_rows = [row for row in job.rows if row["status"] == "failed"][:MAX_PAGE_SIZE]
+    return json_response(
+        {
+            **job.summary(), "status_url": f"/donations/bulk/{job.id}",
+            "invalid_rows": invalid_rows, "failed_rows": failed_rows,
+        },
+        status_code=500 if job.status == "failed" else 202,
+    )
+
+
+@app.get("/donations/bulk/{job_id}")
+async def get_bulk_ingest_job(
+    job_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """Progress of a bulk ingest job and its per-row results (paged by offset/limit)"""
+    job = await BulkIngestService.get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Bulk ingest job not found")
+    return json_response(await job.progress(db, offset, limit))
+
+
+@app.get("/jobs/stats")
+async def job_stats():
+    """Job counts by status and this process's worker pool activity"""
+    pool = get_job_pool()
+    if pool is None:
+        return {"workers": 0}
+    return json_response(await pool.stats())
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Status of a background job: attempts, stage timings per attempt, and its result once completed"""
+    job = await db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return json_response(job_payload(job))
+
+
 @app.post("/assign_route", response_model=RouteResponse)
-async def assign_route(route_data: RouteCreate, db: Session = Depends(get_db)):
-    """Assign a route to a driver and optimize it"""
+async def assign_route(
+    route_data: RouteCreate,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """Assign a route to a driver and optimize it (at most once per Idempotency-Key)"""
     try:
-        routing_service = RoutingService()
-        
-        # Get donation
-        donation = db.query(Donation).filter(Donation.id == route_data.donation_id).first()
-        if not donation:
-            raise HTTPException(status_code=404, detail="Donation not found")
-        
-        # Get driver
-        driver = db.query(Driver).filter(Driver.id == route_data.driver_id).first()
-        if not driver:
-            raise HTTPException(status_code=404, detail="Driver not found")
-        
-        # Get recipient
-        recipient = db.query(Recipient).filter(Recipient.id == route_data.recipient_id).first()
-        if not recipient:
-            raise HTTPException(status_code=404, detail="Recipient not found")
-        
-        # Optimize route using routing service
-        route_result = await routing_service.optimize_route(
-            start_address=donation.address,
-            end_address=recipient.address,
-            driver_address=driver.current_location
-        )
-        
-        # Create route record
-        db_route = Route(
-            donation_id=donation.id,
-            driver_id=driver.id,
-            recipient_id=recipient.id,
-            status="assigned",
-            estimated_duration_minutes=route_result["duration_minutes"],
-            estimated_distance_miles=route_result["distance_miles"],
-            route_instructions=route_result["instructions"]
-        )
-        db.add(db_route)
-        
-        # Update donation status
-        donation.status = "assigned"
-        
-        db.commit()
-        db.refresh(db_route)
-        
-        return RouteResponse(
-            route_id=db_route.id,
-            status=db_route.status,
-            estimated_duration_minutes=db_route.estimated_duration_minutes,
-            estimated_distance_miles=db_route.estimated_distance_miles,
-            instructions=db_route.route_instructions
-        )
+        async with idempotent(db, "POST /assign_route", idempotency_key, route_data) as request:
+            if request.replay:
+                return _replay(request)
+            
+            routing_service = RoutingService()
+            
+            # Get donation
+            donation = await db.get(Donation, route_data.donation_id)
+            if not donation:
+                raise HTTPException(status_code=404, detail="Donation not found")
+            
+            # Get driver
+            driver = await db.get(Driver, route_data.driver_id)
+            if not driver:
+                raise HTTPException(status_code=404, detail="Driver not found")
+            
+            # Get recipient
+            recipient = await db.get(Recipient, route_data.recipient_id)
+            if not recipient:
+                raise HTTPException(status_code=404, detail="Recipient not found")
+            
+            # Optimize route using routing service
+            route_result = await routing_service.optimize_route(
+                start_address=donation.address,
+                end_address=recipient.address,
+                driver_address=driver.current_location,
+                depart_at=donation.pickup_window_start
+            )
+            
+            # Create route record
+            db_route = Route(
+                donation_id=donation.id,
+                driver_id=driver.id,
+                recipient_id=recipient.id,
+                status="assigned",
+                estimated_duration_minutes=route_result["duration_minutes"],
+                estimated_distance_miles=route_result["distance_miles"],
+                route_instructions=route_result["instructions"],
+                neighborhood_code=recipient.neighborhood_code
+            )
+            db.add(db_route)
+            
+            # Update donation status
+            impact_service = ImpactService(db)
+            await impact_service.record_route_status(None, RouteStatus.ASSIGNED)
+            await impact_service.record_donation_status(donation.status, DonationStatus.ASSIGNED, donation.quantity_lbs)
+            donation.status = "assigned"
+            
+            await db.flush()
+            await db.refresh(db_route)
+            
+            result = RouteResponse(
+                route_id=db_route.id,
+                status=db_route.status,
+                estimated_duration_minutes=db_route.estimated_duration_minutes,
+                estimated_distance_miles=db_route.estimated_distance_miles,
+                instructions=db_route.route_instructions
+            )
+            await request.complete(result)
+            await db.commit()
+            return result
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print(f"Route assignment error: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Failed to assign route: {str(e)}")
 
 
-@app.get("/impact", response_model=ImpactResponse)
-async def get_impact(db: Session = Depends(get_db)):
+@app.get("/impact", response_model=ImpactResponse, dependencies=[conditional_get("impact_totals")])
+async def get_impact(db: AsyncSession = Depends(get_read_db)):
     """Get cumulative impact metrics"""
     try:
         impact_service = ImpactService(db)
         
-        # Get all completed donations
-        completed_donations = db.query(Donation).filter(Donation.status == "completed").all()
-        
-        total_lbs = sum(d.quantity_lbs for d in completed_donations)
+        # Completed pounds come from the maintained counters, not a table scan
+        totals = await impact_service.get_totals()
+        total_lbs = totals.get(("donation", DonationStatus.COMPLETED.value), (0, 0.0))[1]
         
         impact = impact_service.calculate_impact(total_lbs)
         
@@ -303,21 +639,24 @@ async def get_impact(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to get impact: {str(e)}")
 
 
-@app.get("/impact/realtime")
-async def get_realtime_impact(db: Session = Depends(get_db)):
+@app.get("/impact/realtime", dependencies=[conditional_get("impact_totals")])
+async def get_realtime_impact(
+    db: AsyncSession = Depends(get_read_db),
+    ai_agent: AIAgent = Depends(get_ai_agent)
+):
     """Get real-time impact metrics with AI insights"""
     try:
         impact_service = ImpactService(db)
-        ai_agent = AIAgent()
         
-        # Get all donations (pending, assigned, completed)
-        all_donations = db.query(Donation).all()
-        completed_donations = db.query(Donation).filter(Donation.status == "completed").all()
-        pending_donations = db.query(Donation).filter(Donation.status == "pending").all()
-        active_routes = db.query(Route).filter(Route.status.in_(["assigned", "in_progress"])).all()
-        
-        total_lbs = sum(d.quantity_lbs for d in completed_donations)
-        pending_lbs = sum(d.quantity_lbs for d in pending_donations)
+        # Counts and pounds per status from the maintained counters
+        totals = await impact_service.get_totals()
+        total_lbs = totals.get(("donation", DonationStatus.COMPLETED.value), (0, 0.0))[1]
+        pending_count, pending_lbs = totals.get(("donation", DonationStatus.PENDING.value), (0, 0.0))
+        total_donations = sum(count for (scope, _), (count, _) in totals.items() if scope == "donation")
+        active_routes = sum(
+            totals.get(("route", status.value), (0, 0.0))[0]
+            for status in (RouteStatus.ASSIGNED, RouteStatus.IN_PROGRESS)
+        )
         
         impact = impact_service.calculate_impact(total_lbs)
         
@@ -327,16 +666,16 @@ async def get_realtime_impact(db: Session = Depends(get_db)):
         # AI-generated insights
         ai_insight = await ai_agent.decide_driver_assignment(
             perishability_score=7.0,
-            volunteer_available=len(active_routes) < 10,
+            volunteer_available=active_routes < 10,
             time_since_posted_minutes=30
         )
         
         return {
             **impact,
             "potential_impact": potential_impact,
-            "pending_donations": len(pending_donations),
-            "active_routes": len(active_routes),
-            "total_donations": len(all_donations),
+            "pending_donations": pending_count,
+            "active_routes": active_routes,
+            "total_donations": total_donations,
             "ai_insight": ai_insight.get("reason", "System operating normally"),
             "sustainability_score": min(100, (total_lbs / 1000) * 10)  # Score out of 100
         }
@@ -344,154 +683,709 @@ async def get_realtime_impact(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to get realtime impact: {str(e)}")
 
 
-@app.get("/donations")
-async def list_donations(status: Optional[str] = None, db: Session = Depends(get_db)):
-    """List all donations, optionally filtered by status"""
+@app.post("/impact/reconcile")
+async def reconcile_impact(db: AsyncSession = Depends(get_db)):
+    """Recompute impact counters from the source tables and report any drift"""
     try:
-        matching_service = MatchingService(db)
-        query = db.query(Donation)
+        corrections = await ImpactService(db).reconcile_totals()
+        return {"message": "Impact totals reconciled", "corrections": corrections}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to reconcile impact: {str(e)}")
+
+
+@app.post("/impact/batch")
+async def get_impact_batch(request: ImpactBatchRequest, db: AsyncSession = Depends(get_db)):
+    """Impact metrics for many amounts and/or donations in one vectorized pass"""
+    try:
+        impact_service = ImpactService(db)
+        result = {}
+        if request.pounds:
+            result["pounds"] = impact_service.calculate_impact_batch(request.pounds)
+        if request.donation_ids:
+            result["donations"] = await impact_service.calculate_donation_impacts(request.donation_ids)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to calculate batch impact: {str(e)}")
+
+
+@app.post("/impact/scenarios")
+async def get_impact_scenarios(request: ImpactScenarioRequest, db: AsyncSession = Depends(get_db)):
+    """Projected impact if a share of pending donations completes, for many scenarios"""
+    try:
+        return await ImpactService(db).project_scenarios(request.completion_rates, request.category_rates)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to project scenarios: {str(e)}")
+
+
+@app.get("/impact/timeseries", dependencies=[conditional_get("impact_rollups", period_seconds=60)])
+async def get_impact_timeseries(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: str = "day",
+    group_by: Optional[str] = None,
+    max_points: int = 366,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Impact trend from pre-aggregated rollups (resolution: hour/day/week/month; group_by: category/donor/area)"""
+    end = end or datetime.now()
+    start = start or end - timedelta(days=30)
+    try:
+        return await RollupService(db).query(start, end, resolution, group_by, max_points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get impact timeseries: {str(e)}")
+
+
+@app.post("/impact/rollups/rebuild")
+async def rebuild_impact_rollups(db: AsyncSession = Depends(get_db)):
+    """Rebuild all impact rollup buckets from completed donations"""
+    try:
+        count = await RollupService(db).rebuild()
+        return {"message": f"Rolled up {count} completed donations", "count": count}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild rollups: {str(e)}")
+
+
+# Fields selectable with `fields=` on the list endpoints
+DONATION_COLUMNS = {
+    "donation_id": Donation.id,
+    "donor_id": Donation.donor_id,
+    "food_type": Donation.food_type,
+    "food_category": Donation.food_category,
+    "quantity_lbs": Donation.quantity_lbs,
+    "pickup_window_start": Donation.pickup_window_start,
+    "pickup_window_end": Donation.pickup_window_end,
+    "address": Donation.address,
+    "latitude": Donation.latitude,
+    "longitude": Donation.longitude,
+    "neighborhood_code": Donation.neighborhood_code,
+    "storage_requirement": Donation.storage_requirement,
+    "perishability_score": Donation.perishability_score,
+    "status": Donation.status,
+    "posted_at": Donation.posted_at,
+    "completed_at": Donation.completed_at,
+}
+# Computed per donation by the matching service; only paid for when requested
+DONATION_MATCH_FIELDS = ("recipient_options", "match_scores")
+DONATION_FIELDS = (*DONATION_COLUMNS, *DONATION_MATCH_FIELDS)
+DONATION_DEFAULT_FIELDS = ("donation_id", "recipient_options", "match_scores")
+
+ROUTE_COLUMNS = {
+    "route_id": Route.id,
+    "donation_id": Route.donation_id,
+    "driver_id": Route.driver_id,
+    "recipient_id": Route.recipient_id,
+    "status": Route.status,
+    "estimated_duration_minutes": Route.estimated_duration_minutes,
+    "estimated_distance_miles": Route.estimated_distance_miles,
+    "instructions": Route.route_instructions,
+    "neighborhood_code": Route.neighborhood_code,
+    "started_at": Route.started_at,
+    "completed_at": Route.completed_at,
+    "created_at": Route.created_at,
+}
+ROUTE_DEFAULT_FIELDS = (
+    "route_id", "status", "estimated_duration_minutes", "estimated_distance_miles", "instructions"
+)
+# Tables each cached read depends on (see conditional_get)
+ARCHIVE_TABLES = (
+    "donations", "routes", "route_stops", "donations_archive", "routes_archive", "route_stops_archive"
+)
+# Match scores depend on the donation and the recipients only
+DONATION_LIST_TABLES = ("donations", "donations_archive", "recipients")
+ROUTE_MAP_TABLES = ("routes", "route_stops", "donations", "recipients", "drivers")
+ADMIN_SNAPSHOT_TABLES = ("impact_totals", *ROUTE_MAP_TABLES)
+DONATION_ARCHIVE_DEFAULT_FIELDS = (
+    "donation_id", "status", "food_type", "quantity_lbs", "posted_at", "completed_at", "archived"
+)
+
+
+async def _list_with_archive(db, response, model, columns, sort_key, default_fields, fields, status, cursor, limit):
+    """
+    One keyset page over hot and archived rows of `model` together. Same
+    fields as the hot listing (column fields only) plus `archived`.
+    """
+    source = with_archive(model)
+    available = {**{f: source.c[c.key] for f, c in columns.items()}, "archived": source.c.archived}
+    selected = parse_fields(fields, available, default_fields)
+    query = select(source.c.id, *(available[f] for f in selected), cursor_key(source.c[sort_key]))
+    if status:
+        query = query.where(source.c.status == status)
+    query = paginate(query, source.c[sort_key], source.c.id, cursor, limit)
+    
+    rows, next_cursor = split_page((await db.execute(query)).all(), limit, lambda row: row[0])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return json_response([dict(zip(selected, row[1:-1])) for row in rows], response)
+
+
+@app.get("/events/stream")
+async def stream_events(
+    request: Request,
+    topics: Optional[str] = None,
+    snapshot: bool = True,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    last_event_id: Optional[int] = Header(None),
+):
+    """
+    Server-Sent Events: a `snapshot` (newest `limit` donations and routes,
+    impact totals and counts), then a delta per committed change:
+    `donation.created`, `donation.<status>` (assigned, completed, ...),
+    `route.created` and `route.status`. `topics=donation,route` filters;
+    `snapshot=false` sends a `ready` event instead. Reconnecting with
+    `Last-Event-ID` replays what was missed.
+    """
+    selected = [t.strip() for t in topics.split(",") if t.strip()] if topics else None
+    unknown = [t for t in selected or [] if t not in LIVE_TOPICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(unknown)}")
+    # The snapshot opens its own short-lived session; a request-scoped one
+    # would hold a pooled connection for as long as the stream stays open
+    session_factory, _ = await read_session_factory(_read_pinned(request))
+    return StreamingResponse(
+        event_stream(
+            session_factory, selected, last_event_id, snapshot, limit,
+            heartbeat_seconds=float(os.getenv("EVENT_STREAM_HEARTBEAT_SECONDS", "15")),
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/events/stats")
+async def get_event_stats():
+    """Live-update bus: backend, subscribers, events published; per-table change versions"""
+    return {**get_event_bus().stats(), "change_versions": change_versions.stats()}
+
+
+@app.post("/archive/run")
+async def run_archival(older_than_days: Optional[float] = Query(None, ge=0), db: AsyncSession = Depends(get_db)):
+    """Archive completed/expired donations older than `older_than_days` (default ARCHIVE_AFTER_DAYS) now"""
+    try:
+        moved = await ArchiveService(db).archive(older_than_days)
+        return {"message": f"Archived {moved['donations']} donations", "moved": moved}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to archive: {str(e)}")
+
+
+@app.get("/archive/stats", dependencies=[conditional_get(*ARCHIVE_TABLES)])
+async def get_archive_stats(db: AsyncSession = Depends(get_read_db)):
+    """Hot and archived row counts for donations, routes and route stops"""
+    try:
+        return await ArchiveService(db).stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get archive stats: {str(e)}")
+
+
+@app.get("/donations", dependencies=[conditional_get(*DONATION_LIST_TABLES)])
+async def list_donations(
+    response: Response,
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    List donations newest first, optionally filtered by status.
+
+    Returns at most `limit` donations; when more exist the `X-Next-Cursor`
+    response header holds the `cursor` for the next page. `fields` is a
+    comma-separated projection (default: donation_id,recipient_options,match_scores).
+    `include_archived=true` also searches archived donations (no matching fields).
+    """
+    try:
+        if include_archived:
+            return await _list_with_archive(
+                db, response, Donation, DONATION_COLUMNS, "posted_at", DONATION_ARCHIVE_DEFAULT_FIELDS,
+                fields, status, cursor, limit
+            )
+        selected = parse_fields(fields, DONATION_FIELDS, DONATION_DEFAULT_FIELDS)
+        column_fields = [f for f in selected if f in DONATION_COLUMNS]
+        needs_matching = any(f in DONATION_MATCH_FIELDS for f in selected)
+        if needs_matching:
+            # Matching needs the whole donation
+            query = select(Donation, cursor_key(Donation.posted_at))
+        else:
+            query = select(Donation.id, *(DONATION_COLUMNS[f] for f in column_fields), cursor_key(Donation.posted_at))
         if status:
-            query = query.filter(Donation.status == status)
+            query = query.where(Donation.status == status)
+        query = paginate(query, Donation.posted_at, Donation.id, cursor, limit)
         
-        donations = query.all()
+        rows, next_cursor = split_page(
+            (await db.execute(query)).all(), limit,
+            (lambda row: row[0].id) if needs_matching else (lambda row: row[0])
+        )
+        matching_service = MatchingService(db)
         results = []
-        for donation in donations:
-            recipient_options = matching_service.find_matching_recipients(donation)
-            match_scores = []
-            for recipient in recipient_options:
-                score = matching_service.calculate_match_score(donation, recipient)
-                match_scores.append({
-                    "recipient_id": recipient.id,
-                    "recipient_name": recipient.name,
-                    "score": score,
-                    "distance_miles": matching_service.calculate_distance(
-                        donation.address, recipient.address
-                    )
-                })
-            match_scores.sort(key=lambda x: x["score"], reverse=True)
-            results.append(DonationResponse(
-                donation_id=donation.id,
-                recipient_options=[r.id for r in recipient_options],
-                match_scores=match_scores
-            ))
-        return results
+        for row in rows:
+            if needs_matching:
+                donation = row[0]
+                values = {f: getattr(donation, DONATION_COLUMNS[f].key) for f in column_fields}
+                values["recipient_options"], values["match_scores"] = await matching_service.cached_matches(donation)
+            else:
+                values = dict(zip(column_fields, row[1:-1]))
+            results.append(project(values, selected))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return json_response(results, response)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list donations: {str(e)}")
 
 
-@app.get("/routes")
-async def list_routes(status: Optional[str] = None, db: Session = Depends(get_db)):
-    """List all routes, optionally filtered by status"""
+RECIPIENT_NEARBY_FIELDS = (
+    "id", "name", "address", "latitude", "longitude", "neighborhood_code",
+    "organization_type", "categories_needed", "storage_capacity_lbs",
+)
+
+
+@app.get("/recipients/nearby", dependencies=[conditional_get("recipients")])
+async def nearby_recipients(
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_miles: float = Query(3.0, gt=0, le=50),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Recipients within `radius_miles` of a point, nearest first"""
     try:
-        query = db.query(Route)
-        if status:
-            query = query.filter(Route.status == status)
+        spatial = SpatialRepository(db)
+        nearby = await spatial.within_radius(Recipient, lat, lng, radius_miles, limit=limit)
+        return json_response({
+            "backend": await spatial.backend(),
+            "count": len(nearby),
+            "recipients": [
+                {**{f: getattr(r, f) for f in RECIPIENT_NEARBY_FIELDS}, "distance_miles": round(miles, 3)}
+                for r, miles in nearby
+            ],
+        }, response)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find nearby recipients: {str(e)}")
+
+
+@app.get("/donations/nearby", dependencies=[conditional_get("donations", "drivers")])
+async def nearby_donations(
+    response: Response,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    driver_id: Optional[int] = None,
+    radius_miles: float = Query(3.0, gt=0, le=50),
+    status: Optional[str] = DonationStatus.PENDING.value,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Donations within `radius_miles` of a point (or of a driver's last known
+    location), nearest first. Pending only unless another `status` is given.
+    """
+    try:
+        if driver_id is not None:
+            driver = await db.get(Driver, driver_id)
+            if not driver:
+                raise HTTPException(status_code=404, detail="Driver not found")
+            if driver.latitude is None or driver.longitude is None:
+                raise HTTPException(status_code=400, detail="Driver has no known location")
+            lat, lng = driver.latitude, driver.longitude
+        elif lat is None or lng is None:
+            raise HTTPException(status_code=400, detail="Provide lat and lng, or driver_id")
         
-        routes = query.all()
-        return [
-            RouteResponse(
-                route_id=r.id,
-                status=r.status,
-                estimated_duration_minutes=r.estimated_duration_minutes,
-                estimated_distance_miles=r.estimated_distance_miles,
-                instructions=r.route_instructions
+        criteria = [Donation.status == status] if status else []
+        spatial = SpatialRepository(db)
+        nearby = await spatial.within_radius(Donation, lat, lng, radius_miles, *criteria, limit=limit)
+        return json_response({
+            "backend": await spatial.backend(),
+            "count": len(nearby),
+            "donations": [
+                {
+                    **{f: getattr(d, column.key) for f, column in DONATION_COLUMNS.items()},
+                    "distance_miles": round(miles, 3),
+                }
+                for d, miles in nearby
+            ],
+        }, response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find nearby donations: {str(e)}")
+
+
+@app.get("/routes", dependencies=[conditional_get("routes", "routes_archive")])
+async def list_routes(
+    response: Response,
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    List routes newest first, optionally filtered by status.
+
+    Paged like `/donations` (`limit`, `cursor`, `X-Next-Cursor`). The
+    `instructions` JSON is only read from the database when it is in `fields`.
+    `include_archived=true` also searches archived routes.
+    """
+    try:
+        if include_archived:
+            return await _list_with_archive(
+                db, response, Route, ROUTE_COLUMNS, "created_at", (*ROUTE_DEFAULT_FIELDS, "archived"),
+                fields, status, cursor, limit
             )
-            for r in routes
-        ]
+        selected = parse_fields(fields, ROUTE_COLUMNS, ROUTE_DEFAULT_FIELDS)
+        query = select(Route.id, *(ROUTE_COLUMNS[f] for f in selected), cursor_key(Route.created_at))
+        if status:
+            query = query.where(Route.status == status)
+        query = paginate(query, Route.created_at, Route.id, cursor, limit)
+        
+        rows, next_cursor = split_page((await db.execute(query)).all(), limit, lambda row: row[0])
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return json_response([dict(zip(selected, row[1:-1])) for row in rows], response)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list routes: {str(e)}")
 
 
-@app.get("/routes/{route_id}/map")
-async def get_route_map(route_id: int, db: Session = Depends(get_db)):
+def _route_map_query():
+    """
+    Routes with everything the map needs: donation, recipient and driver are
+    joined into the route query, stops come from one extra IN query, so any
+    number of routes costs two round trips.
+    """
+    return select(Route).options(
+        joinedload(Route.donation),
+        joinedload(Route.recipient),
+        joinedload(Route.driver),
+        selectinload(Route.stops),
+    )
+
+
+def _route_map_payload(route: Route, include_instructions: bool = True) -> dict:
+    donation, recipient, driver = route.donation, route.recipient, route.driver
+    payload = {
+        "route_id": route.id,
+        "status": route.status,
+        "start": {
+            "address": donation.address if donation else None,
+            "lat": donation.latitude if donation else None,
+            "lng": donation.longitude if donation else None
+        },
+        "end": {
+            "address": recipient.address if recipient else None,
+            "lat": recipient.latitude if recipient else None,
+            "lng": recipient.longitude if recipient else None
+        },
+        "donation": {
+            "donation_id": donation.id,
+            "food_type": donation.food_type,
+            "quantity_lbs": donation.quantity_lbs,
+            "status": donation.status
+        } if donation else None,
+        "recipient": {"recipient_id": recipient.id, "name": recipient.name} if recipient else None,
+        "driver": {"driver_id": driver.id, "name": driver.name, "phone": driver.phone} if driver else None,
+        "stops": [
+            {
+                "stop_type": stop.stop_type,
+                "address": stop.address,
+                "lat": stop.latitude,
+                "lng": stop.longitude,
+                "sequence": stop.sequence,
+                "estimated_arrival": stop.estimated_arrival,
+                "completed_at": stop.completed_at
+            }
+            for stop in sorted(route.stops, key=lambda s: (s.sequence is None, s.sequence))
+        ],
+        "distance_miles": route.estimated_distance_miles,
+        "duration_minutes": route.estimated_duration_minutes,
+    }
+    if include_instructions:
+        payload["instructions"] = route.route_instructions
+    return payload
+
+
+@app.get("/routes/map", dependencies=[conditional_get(*ROUTE_MAP_TABLES)])
+async def get_routes_map(
+    response: Response,
+    ids: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    instructions: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Map data for many routes in one call: the given comma-separated `ids`,
+    or the newest `limit` routes (optionally filtered by status).
+    """
+    try:
+        query = _route_map_query()
+        if ids:
+            try:
+                route_ids = [int(i) for i in ids.split(",") if i.strip()]
+            except ValueError:
+                raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+            query = query.where(Route.id.in_(route_ids[:MAX_PAGE_SIZE]))
+        if status:
+            query = query.where(Route.status == status)
+        query = query.order_by(Route.created_at.desc(), Route.id.desc()).limit(limit)
+        
+        routes = (await db.execute(query)).scalars().unique().all()
+        return json_response([_route_map_payload(route, include_instructions=instructions) for route in routes], response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get routes map: {str(e)}")
+
+
+@app.get("/routes/{route_id}/map", dependencies=[conditional_get(*ROUTE_MAP_TABLES)])
+async def get_route_map(route_id: int, response: Response, db: AsyncSession = Depends(get_read_db)):
     """Get route map data for visualization"""
     try:
-        route = db.query(Route).filter(Route.id == route_id).first()
+        route = (await db.execute(_route_map_query().where(Route.id == route_id))).scalars().first()
         if not route:
             raise HTTPException(status_code=404, detail="Route not found")
         
-        donation = db.query(Donation).filter(Donation.id == route.donation_id).first()
-        recipient = db.query(Recipient).filter(Recipient.id == route.recipient_id).first()
-        
-        return {
-            "route_id": route_id,
-            "start": {
-                "address": donation.address,
-                "lat": donation.latitude,
-                "lng": donation.longitude
-            },
-            "end": {
-                "address": recipient.address,
-                "lat": recipient.latitude,
-                "lng": recipient.longitude
-            },
-            "distance_miles": route.estimated_distance_miles,
-            "duration_minutes": route.estimated_duration_minutes,
-            "instructions": route.route_instructions
-        }
+        return json_response(_route_map_payload(route), response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get route map: {str(e)}")
 
 
+# One admin snapshot per (page, route count), shared by every viewer
+admin_snapshot_cache = SnapshotCache(float(os.getenv("ADMIN_SNAPSHOT_TTL_SECONDS", "30")))
+
+
+async def _build_admin_snapshot(db: AsyncSession, limit: int, cursor: Optional[str], route_limit: int, matches: bool) -> dict:
+    """Impact counters, a page of donations and the newest routes with geometry, from one session"""
+    summary = await ImpactService(db).dashboard_summary()
+    
+    query = paginate(select(Donation, cursor_key(Donation.posted_at)), Donation.posted_at, Donation.id, cursor, limit)
+    rows, next_cursor = split_page((await db.execute(query)).all(), limit, lambda row: row[0].id)
+    matching_service = MatchingService(db)
+    donations = []
+    for donation, _ in rows:
+        values = {f: getattr(donation, column.key) for f, column in DONATION_COLUMNS.items()}
+        if matches:
+            values["recipient_options"], values["match_scores"] = await matching_service.cached_matches(donation)
+        donations.append(values)
+    
+    routes = (await db.execute(
+        _route_map_query().order_by(Route.created_at.desc(), Route.id.desc()).limit(route_limit)
+    )).scalars().unique().all()
+    return {
+        **summary,
+        "donations": donations,
+        "next_cursor": next_cursor,
+        "routes": [_route_map_payload(route, include_instructions=False) for route in routes],
+        "generated_at": datetime.now(),
+    }
+
+
+@app.get("/admin/snapshot", dependencies=[conditional_get(*ADMIN_SNAPSHOT_TABLES)])
+async def get_admin_snapshot(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    route_limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    matches: bool = True,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Everything the admin dashboards show in one call: impact and counts, a
+    page of donations (with cached recipient matches unless matches=false;
+    `next_cursor` continues it) and the newest `route_limit` routes with
+    map geometry. Cached for ADMIN_SNAPSHOT_TTL_SECONDS or until the data
+    changes; `X-Cache` says whether this one was built or shared.
+    """
+    try:
+        version = change_versions.version(ADMIN_SNAPSHOT_TABLES)
+        # get_read_db drops the ETag when a lagging replica may have served
+        # stale rows; such a result is returned but not cached
+        payload, cached = await admin_snapshot_cache.get(
+            (limit, cursor, route_limit, matches),
+            version,
+            lambda: _build_admin_snapshot(db, limit, cursor, route_limit, matches),
+            store="etag" in response.headers,
+            # A client pinned to the primary must not join a replica's build
+            source=response.headers.get("X-DB-Role"),
+        )
+        response.headers["X-Cache"] = "HIT" if cached else "MISS"
+        if payload["next_cursor"]:
+            response.headers["X-Next-Cursor"] = payload["next_cursor"]
+        return json_response(payload, response)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get admin snapshot: {str(e)}")
+
+
+@app.get("/admin/snapshot/stats")
+async def get_admin_snapshot_stats():
+    """Admin snapshot cache hits, misses and shared builds"""
+    return admin_snapshot_cache.stats()
+
+
 @app.patch("/route/{route_id}/status")
 async def update_route_status(
     route_id: int,
     status: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update route status"""
     try:
-        route = db.query(Route).filter(Route.id == route_id).first()
+        route = await db.get(Route, route_id)
         if not route:
             raise HTTPException(status_code=404, detail="Route not found")
         
+        impact_service = ImpactService(db)
+        await impact_service.record_route_status(route.status, status)
+        previous_status = route.status
         route.status = status
         if status == "completed":
             from datetime import datetime
-            route.completed_at = datetime.now()
+            if previous_status != RouteStatus.COMPLETED:
+                route.completed_at = datetime.now()
             # Update donation status
-            donation = db.query(Donation).filter(Donation.id == route.donation_id).first()
+            donation = await db.get(Donation, route.donation_id)
             if donation:
-                donation.status = "completed"
-                donation.completed_at = datetime.now()
+                await impact_service.record_donation_status(donation.status, DonationStatus.COMPLETED, donation.quantity_lbs)
+                # Count a completion once, like the status counters above
+                if donation.status != DonationStatus.COMPLETED:
+                    donation.status = DonationStatus.COMPLETED
+                    donation.completed_at = datetime.now()
+                    await RollupService(db).record_completion(donation)
         
-        db.commit()
+        await db.commit()
         return {"message": "Route status updated", "route_id": route_id, "status": status}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update route status: {str(e)}")
 
 
 @app.post("/nyc-data/populate-recipients")
-async def populate_nyc_recipients(db: Session = Depends(get_db)):
-    """Populate recipients from NYC Open Data"""
+async def populate_nyc_recipients(db: AsyncSession = Depends(get_db)):
+    """Sync recipients with the full NYC Open Data food pantry dataset (bulk upsert)"""
     try:
         nyc_service = NYCDataService()
-        count = await nyc_service.populate_recipients_from_nyc_data(db)
-        return {"message": f"Populated {count} recipients from NYC Open Data", "count": count}
+        counts = await nyc_service.populate_recipients_from_nyc_data(db)
+        return {
+            "message": f"Synced {counts['staged']} recipients from NYC Open Data "
+                       f"({counts['inserted']} added, {counts['updated']} updated, {counts['unchanged']} unchanged)",
+            "count": counts["inserted"],
+            **counts
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to populate NYC data: {str(e)}")
 
 
 @app.get("/nyc-data/food-pantries")
 async def get_nyc_food_pantries(limit: int = 50):
-    """Get food pantries from NYC Open Data"""
+    """Get food pantries from NYC Open Data (local snapshot when synced)"""
     try:
         nyc_service = NYCDataService()
         pantries = await nyc_service.get_food_pantries(limit=limit)
-        return {"pantries": pantries, "count": len(pantries), "source": "NYC Open Data Portal"}
+        table = nyc_service.snapshot.get("food_pantries")
+        return {
+            "pantries": pantries,
+            "count": len(pantries),
+            "source": "NYC Open Data Portal",
+            "synced_at": table.synced_at if table else None
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get NYC data: {str(e)}")
+
+
+@app.get("/nyc-data/neighborhoods")
+async def get_nyc_neighborhoods(name: Optional[str] = None):
+    """Neighborhood Tabulation Areas, optionally filtered by name (local snapshot when synced)"""
+    try:
+        neighborhoods = await NYCDataService().get_neighborhood_data(name)
+        return {"neighborhoods": neighborhoods, "count": len(neighborhoods), "source": "NYC Open Data Portal"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get NYC data: {str(e)}")
+
+
+@app.get("/nyc-data/neighborhoods/coverage", dependencies=[conditional_get(*ARCHIVE_TABLES, "recipients")])
+async def get_neighborhood_coverage(borough: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    """
+    Donations, recipients and deliveries per neighborhood, least served
+    first. Reads the stored neighborhood tags; no geometry per request.
+    """
+    try:
+        neighborhoods = await NeighborhoodService(db).coverage(borough)
+        return {
+            "neighborhoods": neighborhoods,
+            "count": len(neighborhoods),
+            "underserved": sum(1 for n in neighborhoods if n["underserved"])
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get neighborhood coverage: {str(e)}")
+
+
+@app.post("/nyc-data/neighborhoods/tag")
+async def tag_neighborhoods(retag: bool = False, db: AsyncSession = Depends(get_db)):
+    """Tag donations, recipients and routes with their neighborhood (`retag=true` redoes all rows)"""
+    try:
+        return await NeighborhoodService(db).tag(retag=retag)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to tag neighborhoods: {str(e)}")
+
+
+@app.get("/nyc-data/traffic")
+async def get_nyc_traffic():
+    """DOT traffic volume counts (local snapshot when synced)"""
+    try:
+        counts = await NYCDataService().get_traffic_data()
+        return {"traffic": counts, "count": len(counts), "source": "NYC Open Data Portal"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get NYC data: {str(e)}")
 
 
+@app.post("/nyc-data/sync")
+async def sync_nyc_data(datasets: Optional[str] = None, full: bool = False):
+    """
+    Refresh the local NYC Open Data snapshot (comma-separated `datasets`,
+    default all). Incremental on `:updated_at` unless `full=true`.
+    """
+    try:
+        names = [d.strip() for d in datasets.split(",") if d.strip()] if datasets else None
+        return {"datasets": await _sync_nyc_data(names, full=full)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to sync NYC data: {str(e)}")
+
+
+@app.get("/nyc-data/snapshot")
+async def get_nyc_snapshot_status():
+    """Rows, version and sync high-water mark of each local dataset snapshot"""
+    return {
+        "datasets": get_nyc_snapshot().status(),
+        "traffic_speed_index": get_traffic_index().status()
+    }
+
+
+@app.get("/nyc-data/traffic/speed-profile")
+async def get_traffic_speed_profile(lat: float, lng: float):
+    """Speed factor for each hour of the week (Monday 00:00 first) at a location"""
+    factors = get_traffic_index().speed_factors([lat] * HOURS_PER_WEEK, [lng] * HOURS_PER_WEEK, range(HOURS_PER_WEEK))
+    return {"lat": lat, "lng": lng, "speed_factors": [round(f, 2) for f in factors.tolist()]}
+
+
 @app.get("/geocode/autocomplete")
 async def geocode_autocomplete(q: str, limit: int = 5):
     """Address autocomplete using Nominatim (OpenStreetMap) - Free and Open Source"""
     try:
-        from geopy.geocoders import Nominatim
-        geocoder = Nominatim(user_agent="food_rescue_route_ai")
+        geocoder = make_geocoder()
         
-        # Use Nominatim search for autocomplete
-        results = geocoder.geocode(q, exactly_one=False, limit=limit)
+        # Use Nominatim search for autocomplete (blocking I/O, so off the event loop)
+        results = await run_in_threadpool(geocoder.geocode, q, exactly_one=False, limit=limit)
         
         suggestions = []
         if results:
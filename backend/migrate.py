@@ -0,0 +1,39 @@
+"""
+Apply Alembic migrations to DATABASE_URL.
+
+Databases created by the old `Base.metadata.create_all` bootstrap have the
+tables but no `alembic_version` row; those are stamped at the initial
+revision first so only the later migrations run against them.
+
+    python migrate.py
+"""
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+INITIAL_REVISION = "0001"
+
+
+def alembic_config(configure_logger: bool = True) -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.attributes["configure_logger"] = configure_logger
+    return config
+
+
+def run_migrations(configure_logger: bool = True) -> None:
+    """Upgrade the database to the latest revision"""
+    config = alembic_config(configure_logger)
+    tables = set(inspect(engine).get_table_names())
+    if "alembic_version" not in tables and "donations" in tables:
+        print("Existing schema without migration history; stamping initial revision")
+        command.stamp(config, INITIAL_REVISION)
+    command.upgrade(config, "head")
+
+
+if __name__ == "__main__":
+    run_migrations()
+    print("✅ Database schema is up to date")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, JSON, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, JSON, Enum as SQLEnum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -55,6 +55,10 @@ class Donor(Base):
 
 class Recipient(Base):
     __tablename__ = "recipients"
+    __table_args__ = (
+        # Natural key for the NYC Open Data sync (INSERT ... ON CONFLICT target)
+        Index("uq_recipients_name_address", "name", "address", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -63,6 +67,7 @@ class Recipient(Base):
     address = Column(String, nullable=False)
     latitude = Column(Float)
     longitude = Column(Float)
+    neighborhood_code = Column(String, index=True)  # NTA containing latitude/longitude
     organization_type = Column(String)  # food_bank, shelter, community_fridge, etc.
     categories_needed = Column(JSON)  # List of FoodCategory values
     storage_capacity_lbs = Column(Float)
@@ -93,6 +98,14 @@ class Driver(Base):
 
 class Donation(Base):
     __tablename__ = "donations"
+    __table_args__ = (
+        # Listing donations by status, newest first
+        Index("ix_donations_status_posted_at", "status", "posted_at"),
+        # Keyset pagination over all donations
+        Index("ix_donations_posted_at_id", "posted_at", "id"),
+        # Pending donations ordered by when their pickup window closes
+        Index("ix_donations_status_pickup_window_end", "status", "pickup_window_end"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     donor_id = Column(Integer, ForeignKey("donors.id"), nullable=False)
@@ -104,6 +117,7 @@ class Donation(Base):
     address = Column(String, nullable=False)
     latitude = Column(Float)
     longitude = Column(Float)
+    neighborhood_code = Column(String, index=True)  # NTA of the pickup address
     storage_requirement = Column(SQLEnum(StorageRequirement))
     perishability_score = Column(Float)  # 0-10
     status = Column(SQLEnum(DonationStatus), default=DonationStatus.PENDING)
@@ -116,6 +130,11 @@ class Donation(Base):
 
 class Route(Base):
     __tablename__ = "routes"
+    __table_args__ = (
+        Index("ix_routes_status_created_at", "status", "created_at"),
+        Index("ix_routes_created_at_id", "created_at", "id"),
+        Index("ix_routes_donation_id", "donation_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     donation_id = Column(Integer, ForeignKey("donations.id"), nullable=False)
@@ -125,6 +144,7 @@ class Route(Base):
     estimated_duration_minutes = Column(Float)
     estimated_distance_miles = Column(Float)
     route_instructions = Column(JSON)  # Turn-by-turn instructions
+    neighborhood_code = Column(String, index=True)  # NTA the food is delivered to (the recipient's)
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -137,6 +157,9 @@ class Route(Base):
 
 class RouteStop(Base):
     __tablename__ = "route_stops"
+    __table_args__ = (
+        Index("ix_route_stops_route_id_sequence", "route_id", "sequence"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     route_id = Column(Integer, ForeignKey("routes.id"), nullable=False)
@@ -150,3 +173,161 @@ class RouteStop(Base):
     
     route = relationship("Route", back_populates="stops")
 
+
+# Cold storage. Completed/expired donations past ARCHIVE_AFTER_DAYS move here
+# with their routes and stops (same ids, same columns plus archived_at), so
+# the hot tables only hold recent and open work. See ArchiveService.
+
+class ArchivedDonation(Base):
+    __tablename__ = "donations_archive"
+    __table_args__ = (
+        Index("ix_donations_archive_posted_at_id", "posted_at", "id"),
+        Index("ix_donations_archive_status_posted_at", "status", "posted_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    donor_id = Column(Integer, ForeignKey("donors.id"), nullable=False, index=True)
+    food_type = Column(String, nullable=False)
+    food_category = Column(SQLEnum(FoodCategory))
+    quantity_lbs = Column(Float, nullable=False)
+    pickup_window_start = Column(DateTime(timezone=True), nullable=False)
+    pickup_window_end = Column(DateTime(timezone=True), nullable=False)
+    address = Column(String, nullable=False)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    neighborhood_code = Column(String, index=True)
+    storage_requirement = Column(SQLEnum(StorageRequirement))
+    perishability_score = Column(Float)
+    status = Column(SQLEnum(DonationStatus))
+    posted_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ArchivedRoute(Base):
+    __tablename__ = "routes_archive"
+    __table_args__ = (
+        Index("ix_routes_archive_created_at_id", "created_at", "id"),
+        Index("ix_routes_archive_status_created_at", "status", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    donation_id = Column(Integer, ForeignKey("donations_archive.id"), nullable=False, index=True)
+    driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=False)
+    recipient_id = Column(Integer, ForeignKey("recipients.id"), nullable=False)
+    status = Column(SQLEnum(RouteStatus))
+    estimated_duration_minutes = Column(Float)
+    estimated_distance_miles = Column(Float)
+    route_instructions = Column(JSON)
+    neighborhood_code = Column(String, index=True)
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ArchivedRouteStop(Base):
+    __tablename__ = "route_stops_archive"
+    
+    id = Column(Integer, primary_key=True)
+    route_id = Column(Integer, ForeignKey("routes_archive.id"), nullable=False, index=True)
+    stop_type = Column(String)
+    address = Column(String, nullable=False)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    sequence = Column(Integer)
+    estimated_arrival = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+
+
+
+class ImpactTotal(Base):
+    """
+    Running counters per entity status, maintained in the same transaction as
+    the status change so impact endpoints never need to scan history.
+    """
+    __tablename__ = "impact_totals"
+    
+    scope = Column(String, primary_key=True)  # donation or route
+    status = Column(String, primary_key=True)
+    item_count = Column(Integer, nullable=False, default=0)
+    total_lbs = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ImpactRollup(Base):
+    """
+    Pre-aggregated impact per time bucket, updated as donations complete.
+    One row per (resolution, bucket_start, food_category, donor_id, area).
+    """
+    __tablename__ = "impact_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "resolution", "bucket_start", "food_category", "donor_id", "area",
+            name="uq_impact_rollups_bucket"
+        ),
+        Index("ix_impact_rollups_resolution_bucket", "resolution", "bucket_start"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    resolution = Column(String, nullable=False)  # hour or day
+    bucket_start = Column(DateTime, nullable=False)
+    food_category = Column(String, nullable=False)
+    donor_id = Column(Integer, nullable=False)
+    area = Column(String, nullable=False)  # NTA code, or borough for untagged donations
+    lbs_rescued = Column(Float, nullable=False, default=0.0)
+    meals = Column(Float, nullable=False, default=0.0)
+    co2e_avoided = Column(Float, nullable=False, default=0.0)
+    donation_count = Column(Integer, nullable=False, default=0)
+
+
+class Job(Base):
+    """
+    A unit of background work (services/job_queue.py), written in the same
+    transaction as the data it works on so it survives restarts.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest due job
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # handler name, e.g. donations.enrich
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, completed, failed (bulk ingests: receiving)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime(timezone=True), nullable=False)  # not before (retry backoff)
+    locked_by = Column(String)  # worker holding the job while running
+    locked_at = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    stage_timings = Column(JSON)  # stage -> ms, latest attempt
+    history = Column(JSON)  # one entry per attempt: worker, timings, error
+    result = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+
+class IdempotencyKey(Base):
+    """
+    A client-supplied Idempotency-Key and the response it produced, so a
+    retried write is answered without running again (services/idempotency.py).
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # Purging expired keys
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+    
+    scope = Column(String, primary_key=True)  # endpoint, e.g. POST /donation
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)  # hash of the request body
+    status = Column(String, nullable=False)  # in_progress or completed
+    claim_token = Column(String, nullable=False)  # identifies the request holding an in_progress key
+    locked_until = Column(DateTime(timezone=True))  # an in_progress claim older than this was abandoned
+    response_status = Column(Integer)
+    response_body = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
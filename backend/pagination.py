@@ -0,0 +1,84 @@
+"""
+Keyset (cursor) pagination and field projection for list endpoints.
+
+Pages are ordered newest first on (timestamp, id). The cursor is the sort
+key of the last row served, so each page is an index range scan no matter
+how deep the client has paged, unlike OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import String, tuple_, type_coerce
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def cursor_key(sort_column):
+    """
+    The sort column as stored. SQLite keeps timestamps as text, and rows
+    written by CURRENT_TIMESTAMP and by the driver use different formats,
+    so the cursor must compare against the raw text rather than a
+    re-rendered datetime. Other databases return a datetime here.
+    """
+    return type_coerce(sort_column, String).label("cursor_key")
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    if isinstance(sort_value, datetime):
+        payload = ["dt", sort_value.isoformat(), row_id]
+    else:
+        payload = ["raw", sort_value, row_id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Any, int]:
+    """Returns (kind, sort value, id); raises ValueError for a malformed cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        kind, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if kind == "dt":
+            value = datetime.fromisoformat(value)
+        elif kind != "raw":
+            raise ValueError(kind)
+        return kind, value, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def paginate(query, sort_column, id_column, cursor: Optional[str], limit: int):
+    """
+    Order `query` newest first on (sort_column, id_column), continue after
+    `cursor` and fetch one extra row so the caller can tell whether another
+    page exists. `query` must select `cursor_key(sort_column)` last.
+    """
+    if cursor:
+        kind, value, row_id = decode_cursor(cursor)
+        column = type_coerce(sort_column, String) if kind == "raw" else sort_column
+        query = query.where(tuple_(column, id_column) < tuple_(value, row_id))
+    return query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def split_page(rows: List[Any], limit: int, row_id) -> Tuple[List[Any], Optional[str]]:
+    """Trim the look-ahead row and build the next cursor from the last row kept"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[-1], row_id(last))
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], default: Iterable[str]) -> List[str]:
+    """Validate a comma-separated `fields=` list; raises ValueError on unknown names"""
+    if not fields:
+        return list(default)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return requested
+
+
+def project(values: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    return {field: values[field] for field in fields}
@@ -52,8 +52,10 @@ class MatchScore(BaseModel):
 
 class DonationResponse(BaseModel):
     donation_id: int
-    recipient_options: List[int]
+    recipient_options: List[int]  # filled in by the enrichment job (see status_url)
     match_scores: List[MatchScore]
+    job_id: Optional[int] = None
+    status_url: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -83,3 +85,13 @@ class ImpactResponse(BaseModel):
     ch4_avoided_tons: float
     landfill_space_saved: float
 
+
+
+class ImpactBatchRequest(BaseModel):
+    pounds: List[float] = []
+    donation_ids: List[int] = []
+
+
+class ImpactScenarioRequest(BaseModel):
+    completion_rates: List[float] = []
+    category_rates: List[Dict[str, float]] = []
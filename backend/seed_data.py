@@ -5,6 +5,7 @@ Run this after setting up the database.
 import os
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine, Base
+from migrate import run_migrations
 from models import Donor, Recipient, Driver, Donation, FoodCategory, StorageRequirement
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
@@ -12,7 +13,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Create tables
-Base.metadata.create_all(bind=engine)
+run_migrations()
 
 db = SessionLocal()
 
@@ -1,7 +1,9 @@
 import os
+import threading
+import time
 from typing import Dict, Any, Optional
-import google.generativeai as genai
 from dotenv import load_dotenv
+from services.providers import GeminiRestModel, gemini_api_base
 
 load_dotenv()
 
@@ -12,18 +14,76 @@ class AIAgent:
     - Classify food categories
     - Estimate perishability
     - Decide driver assignment vs courier fallback
+
+    The Gemini SDK is imported and the model is built lazily on first use, so
+    importing this module (and starting a worker) stays cheap. Use
+    `get_ai_agent()` to share one configured instance across requests.
     """
     
+    MODEL_NAME = "gemini-pro"
+    
     def __init__(self):
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
-        self.model = None
-        
-        if self.gemini_api_key:
-            try:
-                genai.configure(api_key=self.gemini_api_key)
-                self.model = genai.GenerativeModel('gemini-pro')
-            except Exception as e:
-                print(f"Gemini initialization error: {e}")
+        self._model = None
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self.init_seconds: Optional[float] = None
+    
+    @property
+    def model(self):
+        """Gemini model, configured on first access (None when unavailable)"""
+        if not self._initialized:
+            self._initialize_model()
+        return self._model
+    
+    def _initialize_model(self) -> None:
+        with self._init_lock:
+            if self._initialized:
+                return
+            started = time.perf_counter()
+            if self.gemini_api_key:
+                try:
+                    api_base = gemini_api_base()
+                    if api_base:
+                        self._model = GeminiRestModel(api_base, self.gemini_api_key, self.MODEL_NAME)
+                    else:
+                        import google.generativeai as genai
+                        genai.configure(api_key=self.gemini_api_key)
+                        self._model = genai.GenerativeModel(self.MODEL_NAME)
+                except Exception as e:
+                    print(f"Gemini initialization error: {e}")
+            self.init_seconds = time.perf_counter() - started
+            self._initialized = True
+    
+    def warm_up(self) -> None:
+        """Import the SDK and build the model ahead of the first request"""
+        self._initialize_model()
+    
+    def health(self, probe: bool = False) -> Dict[str, Any]:
+        """
+        Report agent readiness. With `probe=True` a tiny prompt is sent to the
+        model and its round-trip latency is measured.
+        """
+        if probe:
+            self._initialize_model()
+        status = {
+            "configured": bool(self.gemini_api_key),
+            "initialized": self._initialized,
+            "model": self.MODEL_NAME if self._model else None,
+            "init_ms": round(self.init_seconds * 1000, 2) if self.init_seconds is not None else None,
+        }
+        if probe:
+            if not self.model:
+                status["probe"] = {"ok": False, "error": "model unavailable, using fallback logic"}
+            else:
+                started = time.perf_counter()
+                try:
+                    self.model.generate_content("Reply with OK.")
+                    status["probe"] = {"ok": True}
+                except Exception as e:
+                    status["probe"] = {"ok": False, "error": str(e)}
+                status["probe"]["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return status
     
     async def classify_food_category(self, food_type: str) -> str:
         """Classify food into category using AI"""
@@ -190,3 +250,17 @@ Return only valid JSON, nothing else."""
                 "assignment_type": "volunteer",
                 "reason": "Default to volunteer"
             }
+
+
+_agent: Optional[AIAgent] = None
+_agent_lock = threading.Lock()
+
+
+def get_ai_agent() -> AIAgent:
+    """Return the process-wide AIAgent, creating it on first call"""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = AIAgent()
+    return _agent
@@ -0,0 +1,121 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, exists, func, insert, literal, select, union_all
+from typing import Dict, Optional
+from datetime import datetime, timedelta
+import os
+from models import (
+    ArchivedDonation, ArchivedRoute, ArchivedRouteStop, Donation, Route, RouteStop,
+    DonationStatus, RouteStatus
+)
+
+# Hot table -> archive table with the same columns (plus archived_at)
+ARCHIVE_MODELS = {
+    Donation: ArchivedDonation,
+    Route: ArchivedRoute,
+    RouteStop: ArchivedRouteStop,
+}
+
+
+def with_archive(model):
+    """
+    Hot and archived rows of `model` as one subquery (UNION ALL), with the
+    model's column names plus an `archived` flag. Filters and ordering on
+    it are pushed into both halves.
+    """
+    archived = ARCHIVE_MODELS[model]
+    keys = [attr.key for attr in model.__mapper__.column_attrs]
+    hot = select(*(getattr(model, key) for key in keys), literal(False).label("archived"))
+    cold = select(*(getattr(archived, key) for key in keys), literal(True).label("archived"))
+    return union_all(hot, cold).subquery(f"{model.__tablename__}_all")
+
+
+class ArchiveService:
+    """
+    Hot/cold split for donations and routes. Completed and expired
+    donations older than ARCHIVE_AFTER_DAYS move, with their routes and
+    stops, into the `*_archive` tables, so the operational queries only
+    ever see recent and open work.
+
+    Nothing is lost from impact reporting: rollups are written when a
+    donation completes, and reconciliation counts both tables.
+    """
+
+    ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+    BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+    ARCHIVABLE_STATUSES = (DonationStatus.COMPLETED, DonationStatus.EXPIRED)
+    OPEN_ROUTE_STATUSES = (RouteStatus.ASSIGNED, RouteStatus.IN_PROGRESS)
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _archivable(self, cutoff: datetime):
+        open_route = exists().where(
+            Route.donation_id == Donation.id, Route.status.in_(self.OPEN_ROUTE_STATUSES)
+        )
+        return (
+            select(Donation.id)
+            .where(
+                Donation.status.in_(self.ARCHIVABLE_STATUSES),
+                func.coalesce(Donation.completed_at, Donation.posted_at) < cutoff,
+                ~open_route,
+            )
+            .order_by(Donation.id)
+            .limit(self.BATCH_SIZE)
+        )
+
+    async def archive(self, older_than_days: Optional[float] = None) -> Dict[str, int]:
+        """
+        Move eligible donations (and their routes and stops) to the archive
+        in batches of BATCH_SIZE, one transaction per batch. Donations with
+        a route still assigned or in progress stay hot.
+        """
+        days = self.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        cutoff = datetime.now() - timedelta(days=days)
+        moved = {"donations": 0, "routes": 0, "route_stops": 0}
+        while True:
+            donation_ids = (await self.db.execute(self._archivable(cutoff))).scalars().all()
+            if not donation_ids:
+                break
+            route_ids = (await self.db.execute(
+                select(Route.id).where(Route.donation_id.in_(donation_ids))
+            )).scalars().all()
+            # Parents first into the archive, children first out of the hot tables
+            await self._move_batch(donation_ids, route_ids, moved)
+            await self.db.commit()
+        return moved
+
+    async def _move_batch(self, donation_ids, route_ids, moved: Dict[str, int]) -> None:
+        for model in (Donation, Route, RouteStop):
+            archived = ARCHIVE_MODELS[model]
+            keys = [attr.key for attr in model.__mapper__.column_attrs]
+            await self.db.execute(
+                insert(archived).from_select(
+                    [getattr(archived, key) for key in keys],
+                    select(*(getattr(model, key) for key in keys))
+                    .where(self._batch_filter(model, donation_ids, route_ids))
+                )
+            )
+        for model, name in ((RouteStop, "route_stops"), (Route, "routes"), (Donation, "donations")):
+            result = await self.db.execute(
+                delete(model)
+                .where(self._batch_filter(model, donation_ids, route_ids))
+                .execution_options(synchronize_session=False)
+            )
+            moved[name] += result.rowcount
+
+    @staticmethod
+    def _batch_filter(model, donation_ids, route_ids):
+        if model is Donation:
+            return Donation.id.in_(donation_ids)
+        if model is Route:
+            return Route.id.in_(route_ids)
+        return RouteStop.route_id.in_(route_ids)
+
+    async def stats(self) -> Dict[str, Dict[str, int]]:
+        """Row counts of each hot table and its archive"""
+        result = {}
+        for model, archived in ARCHIVE_MODELS.items():
+            hot = (await self.db.execute(select(func.count()).select_from(model))).scalar()
+            cold = (await self.db.execute(select(func.count()).select_from(archived))).scalar()
+            result[model.__tablename__] = {"hot": hot, "archived": cold}
+        return result
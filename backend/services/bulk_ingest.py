@@ -0,0 +1,332 @@
+"""
+Bulk donation ingestion from CSV or NDJSON.
+
+The request body is parsed as it streams in, each record is validated with
+`DonationCreate`, and valid rows are inserted BULK_INGEST_CHUNK_SIZE at a
+time (one multi-row INSERT and one commit per chunk). Each chunk's commit
+also enqueues a `donations.enrich` job for its rows, so classification,
+geocoding, perishability and matching run on the job workers as one batch
+per chunk (services/donation_enrichment.py).
+
+Each ingest is recorded as a `donations.bulk_ingest` row in `jobs` (never
+claimed by the workers), so its status is readable from any process and
+after a restart. Its counters are updated in the same transaction as each
+chunk; the result per input row is stored when the body has been read. If a
+chunk fails (database error, client disconnect) the chunks before it stay
+committed, and the job is marked failed with the rows that didn't land.
+"""
+import codecs
+import csv
+import json
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Donation, DonationStatus, Donor, Job
+from schemas import DonationCreate
+from services.donation_enrichment import ENRICH_DONATIONS
+from services.impact_service import ImpactService
+from services.job_queue import COMPLETED, FAILED, enqueue
+from services.live_updates import donation_event_payload, queue_live_event
+
+CHUNK_SIZE = int(os.getenv("BULK_INGEST_CHUNK_SIZE", "500"))
+MAX_ROWS = int(os.getenv("BULK_INGEST_MAX_ROWS", "100000"))
+
+FORMATS = ("csv", "ndjson")
+
+BULK_INGEST = "donations.bulk_ingest"
+RECEIVING = "receiving"  # job row status while the body is read
+
+# (row number, record, parse error)
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decoded lines of a byte stream, without their line endings"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.rstrip("\r"):
+        yield pending.rstrip("\r")
+
+
+async def ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    row = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row, None, "Each line must be a JSON object"
+        else:
+            yield row, record, None
+
+
+async def csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """
+    Records of a CSV with a header row. A quoted field may span lines: lines
+    are joined until the quotes balance, then parsed as one record. Empty
+    cells are left out so optional fields take their defaults.
+    """
+    header: Optional[List[str]] = None
+    row = 0
+    pending: List[str] = []
+    async for line in iter_lines(chunks):
+        pending.append(line)
+        text = "\n".join(pending)
+        if text.count('"') % 2:
+            continue  # inside a quoted field
+        pending = []
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) > len(header):
+            yield row, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row, {name: value for name, value in zip(header, values) if value.strip() != ""}, None
+    if pending:
+        row += 1
+        yield row, None, "Unterminated quoted field"
+
+
+@dataclass
+class IngestJob:
+    id: int  # its row in `jobs`
+    format: str
+    status: str = RECEIVING  # receiving -> enriching -> completed | failed (from the enrichment jobs)
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    received: int = 0
+    inserted: int = 0
+    invalid: int = 0
+    failed: int = 0
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    enrichment_job_ids: List[int] = field(default_factory=list)
+    ingest_ms: float = 0.0
+    error: Optional[str] = None
+
+    def reject(self, row: int, errors: List[str]) -> None:
+        self.invalid += 1
+        self.rows.append({"row": row, "status": "invalid", "errors": errors})
+
+    def accept(self, row: int, donation_id: int, enrichment_job_id: int) -> None:
+        self.inserted += 1
+        self.rows.append({
+            "row": row, "status": "inserted", "donation_id": donation_id, "enrichment_job_id": enrichment_job_id,
+        })
+
+    def fail(self, rows: List[int], error: str) -> None:
+        """Valid rows that were not inserted because the ingest stopped"""
+        recorded = {r["row"] for r in self.rows}
+        for row in rows:
+            if row not in recorded:
+                self.failed += 1
+                self.rows.append({"row": row, "status": "failed", "errors": [error]})
+
+    def stored(self, rows: bool = True) -> Dict[str, Any]:
+        """The job row's `result`"""
+        result = {
+            "status": self.status, "received": self.received, "inserted": self.inserted, "invalid": self.invalid,
+            "failed": self.failed, "enrichment_job_ids": self.enrichment_job_ids, "ingest_ms": self.ingest_ms,
+        }
+        if rows:
+            result["rows"] = self.rows
+        return result
+
+    @classmethod
+    def from_record(cls, record: Job) -> "IngestJob":
+        result = record.result or {}
+        return cls(
+            id=record.id, format=record.payload["format"], created_at=record.created_at, error=record.last_error,
+            **{name: result[name] for name in (
+                "status", "received", "inserted", "invalid", "failed", "enrichment_job_ids", "ingest_ms", "rows",
+            ) if name in result},
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "format": self.format,
+            "status": self.status,
+            "created_at": self.created_at,
+            "received": self.received,
+            "inserted": self.inserted,
+            "invalid": self.invalid,
+            "failed": self.failed,
+            "enrichment_jobs": len(self.enrichment_job_ids),
+            "timings_ms": {"ingest": round(self.ingest_ms, 2)},
+            "error": self.error,
+        }
+
+    async def progress(self, db: AsyncSession, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Summary with the enrichment jobs' state, plus a page of rows. Inserted
+        rows whose chunk has been enriched carry `recipient_options` and
+        `match_scores`.
+        """
+        summary = self.summary()
+        jobs = (await db.execute(
+            select(Job.id, Job.status, Job.stage_timings, Job.last_error).where(Job.id.in_(self.enrichment_job_ids))
+        )).all() if self.enrichment_job_ids else []
+        states = Counter(job.status for job in jobs)
+        if self.status == FAILED or states[FAILED]:
+            summary["status"] = FAILED
+        elif self.status != RECEIVING and states[COMPLETED] == len(self.enrichment_job_ids):
+            summary["status"] = "completed"
+        summary["enrichment_jobs"] = dict(states)
+        summary["enrichment_errors"] = {job.id: job.last_error for job in jobs if job.last_error}
+        for job in jobs:
+            for stage, ms in (job.stage_timings or {}).items():
+                summary["timings_ms"][stage] = round(summary["timings_ms"].get(stage, 0.0) + ms, 2)
+
+        rows = self.rows[offset:offset + limit] if limit is not None else self.rows[offset:]
+        wanted = {row["enrichment_job_id"] for row in rows if "enrichment_job_id" in row}
+        matches = {}
+        if wanted:
+            for (result,) in (await db.execute(
+                select(Job.result).where(Job.id.in_(wanted), Job.status == COMPLETED)
+            )).all():
+                matches.update((match["donation_id"], match) for match in result["donations"])
+        summary["rows"] = [
+            {**row, **{k: v for k, v in matches[row["donation_id"]].items() if k != "donation_id"}}
+            if row.get("donation_id") in matches else row
+            for row in rows
+        ]
+        return summary
+
+
+class BulkIngestService:
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    @staticmethod
+    async def get_job(db: AsyncSession, job_id: int) -> Optional[IngestJob]:
+        record = await db.get(Job, job_id)
+        if record is None or record.kind != BULK_INGEST:
+            return None
+        return IngestJob.from_record(record)
+
+    async def _new_job(self, fmt: str) -> IngestJob:
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            record = Job(
+                kind=BULK_INGEST, payload={"format": fmt}, status=RECEIVING, attempts=0, max_attempts=0,
+                run_after=now, started_at=now,
+            )
+            db.add(record)
+            await db.commit()
+        return IngestJob(id=record.id, format=fmt)
+
+    async def _finish_job(self, job: IngestJob) -> None:
+        """Store the outcome and per-row results on the job row"""
+        try:
+            async with self.session_factory() as db:
+                await db.execute(update(Job).where(Job.id == job.id).values(
+                    status=FAILED if job.status == FAILED else COMPLETED, result=job.stored(),
+                    last_error=job.error, finished_at=datetime.now(timezone.utc),
+                ))
+                await db.commit()
+        except Exception as e:
+            # The response still carries the results; only status_url lacks them
+            print(f"Failed to store bulk ingest job {job.id}: {e}")
+
+    async def ingest(self, chunks: AsyncIterator[bytes], fmt: str) -> IngestJob:
+        """
+        Parse, validate and insert the whole body; returns the job with a
+        result per row. A failure part-way is recorded on the job (status
+        `failed`, `error`, and `failed` rows) rather than raised.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+        job = await self._new_job(fmt)
+        records = csv_records(chunks) if fmt == "csv" else ndjson_records(chunks)
+        batch: List[Tuple[int, DonationCreate]] = []
+        started = time.perf_counter()
+        try:
+            async for row, record, error in records:
+                job.received += 1
+                if job.received > MAX_ROWS:
+                    job.received -= 1
+                    job.error = f"Stopped after BULK_INGEST_MAX_ROWS ({MAX_ROWS}) rows"
+                    break
+                if error:
+                    job.reject(row, [error])
+                    continue
+                try:
+                    batch.append((row, DonationCreate.model_validate(record)))
+                except ValidationError as e:
+                    job.reject(row, [
+                        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+                    ])
+                    continue
+                if len(batch) >= CHUNK_SIZE:
+                    await self._insert_chunk(job, batch)
+                    batch = []
+            if batch:
+                await self._insert_chunk(job, batch)
+                batch = []
+        except Exception as e:
+            # Earlier chunks stay committed and enriched; the pending batch didn't land
+            job.error = f"{type(e).__name__}: {e}"
+            job.fail([row for row, _ in batch], f"Not inserted: {job.error}")
+            job.status = FAILED
+            print(f"Bulk ingest job {job.id} failed after {job.inserted} rows: {job.error}")
+        finally:
+            job.ingest_ms = (time.perf_counter() - started) * 1000
+        job.rows.sort(key=lambda r: r["row"])
+        if job.status != FAILED:
+            job.status = "enriching" if job.inserted else COMPLETED
+        await self._finish_job(job)
+        return job
+
+    async def _insert_chunk(self, job: IngestJob, batch: List[Tuple[int, DonationCreate]]) -> None:
+        async with self.session_factory() as db:
+            donor_ids = {item.donor_id for _, item in batch}
+            known = set((await db.execute(select(Donor.id).where(Donor.id.in_(donor_ids)))).scalars().all())
+            accepted = []
+            for row, item in batch:
+                if item.donor_id in known:
+                    accepted.append((row, item.model_dump()))
+                else:
+                    job.reject(row, [f"donor_id: Donor {item.donor_id} not found"])
+            if not accepted:
+                return
+            values = [{**data, "status": DonationStatus.PENDING} for _, data in accepted]
+            inserted = (await db.execute(
+                insert(Donation).returning(Donation.id, Donation.posted_at, sort_by_parameter_order=True), values
+            )).all()
+            await ImpactService(db).record_donations_created(len(values), sum(v["quantity_lbs"] for v in values))
+            enrichment = enqueue(db, ENRICH_DONATIONS, {"donation_ids": [donation_id for donation_id, _ in inserted]})
+            # Multi-row INSERTs skip the ORM hooks, so queue the live events here
+            for (donation_id, posted_at), data in zip(inserted, values):
+                queue_live_event(db, "donation.created", {
+                    "donation": donation_event_payload(donation_id, {**data, "posted_at": posted_at})
+                })
+            await db.flush()
+            # The ingest's counters move in the same transaction as its rows
+            await db.execute(update(Job).where(Job.id == job.id).values(result={
+                **job.stored(rows=False), "inserted": job.inserted + len(inserted),
+                "enrichment_job_ids": [*job.enrichment_job_ids, enrichment.id],
+            }))
+            await db.commit()
+        job.enrichment_job_ids.append(enrichment.id)
+        for (row, _), (donation_id, _) in zip(accepted, inserted):
+            job.accept(row, donation_id, enrichment.id)
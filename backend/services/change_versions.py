@@ -0,0 +1,104 @@
+"""
+Change versions for conditional GETs.
+
+Each table has a counter that goes up whenever a committed transaction
+wrote to it, through the ORM or a DML statement run on a session. Read
+endpoints derive their ETag from the counters of the tables they read, so
+an unchanged poll is answered with 304 after comparing a few integers,
+without a database round trip.
+
+Counters live in process memory, and the ETag carries a per-process boot
+id, so tags from before a restart (or from another worker) never match.
+Other workers hear about a commit through the event bus; with the
+in-process bus only writes made by this process are seen.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from services.event_bus import Event, get_event_bus
+
+CHANGE_EVENT = "changes.tables"
+
+
+class ChangeVersions:
+    def __init__(self):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+        self._changed_at = 0.0
+        self._lock = threading.Lock()
+
+    def bump(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            self._changed_at = time.monotonic()
+
+    def version(self, tables: Iterable[str]) -> int:
+        # Every counter only grows, so the sum changes whenever any of them does
+        return sum(self._versions.get(table, 0) for table in tables)
+
+    def etag(self, tables: Iterable[str], extra: Optional[str] = None) -> str:
+        tag = f"{self.boot_id}-{self.version(tables)}"
+        return f'W/"{tag}-{extra}"' if extra else f'W/"{tag}"'
+
+    def changed_within(self, seconds: float) -> bool:
+        """Whether any table changed in the last `seconds` (e.g. not yet on a lagging replica)"""
+        return self._changed_at > 0 and time.monotonic() - self._changed_at < seconds
+
+    def on_event(self, bus_event: Event) -> None:
+        """Bus listener: commits made by other workers"""
+        if bus_event.type == CHANGE_EVENT and bus_event.data.get("origin") != self.boot_id:
+            self.bump(bus_event.data["tables"])
+
+    def stats(self) -> Dict[str, object]:
+        return {"boot_id": self.boot_id, "versions": dict(self._versions)}
+
+
+change_versions = ChangeVersions()
+get_event_bus().add_listener(change_versions.on_event)
+
+
+def _record(session: Session, tables: Iterable[str]) -> None:
+    session.info.setdefault("changed_tables", set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session, flush_context):
+    _record(session, {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, "__table__")
+    })
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _record(orm_execute_state.session, {table.name})
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed(session):
+    tables: Optional[Set[str]] = session.info.pop("changed_tables", None)
+    if not tables:
+        return
+    change_versions.bump(tables)
+    bus = get_event_bus()
+    if not bus.distributed:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    bus.publish_nowait(CHANGE_EVENT, {"tables": sorted(tables), "origin": change_versions.boot_id})
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    session.info.pop("changed_tables", None)
@@ -0,0 +1,184 @@
+"""
+Donation enrichment: AI category classification, geocoding, perishability
+scoring and recipient matching, run after the donation is committed.
+
+`DonationEnricher` works on a batch of donation ids, so one donation from
+`POST /donation` and a 500-row chunk from bulk ingestion take the same path.
+Each AI call is made once per distinct food type (perishability: per type
+and posted time; a bulk chunk shares one) per job, and each geocode
+once per distinct address not already known from earlier donations. Stages
+only touch donations that still need them, so a retried job picks up where
+the failed attempt stopped.
+"""
+import asyncio
+import os
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from models import Donation, FoodCategory
+from services.ai_agent import get_ai_agent
+from services.job_queue import JobContext, job_handler
+from services.live_updates import donation_event_payload, queue_live_event
+from services.matching_service import MatchingService
+from services.neighborhood_index import neighborhood_for
+from services.routing_service import RoutingService
+
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "4"))
+
+ENRICH_DONATIONS = "donations.enrich"
+
+
+def _category_value(donation: Donation) -> str:
+    return donation.food_category.value if donation.food_category else "packaged"
+
+
+def _perishability_kind(donation: Donation) -> Tuple[str, str, str]:
+    """The estimate_perishability arguments for a donation: food type, category and posted time"""
+    return donation.food_type.strip().lower(), _category_value(donation), str(donation.posted_at)
+
+
+class DonationEnricher:
+    def __init__(self, session_factory, ai_agent):
+        self.session_factory = session_factory
+        self.ai_agent = ai_agent
+        # Memos, so each distinct type/address costs one call per job
+        self._categories: Dict[str, str] = {}
+        self._coords: Dict[str, Optional[Tuple[float, float]]] = {}
+        self._estimates: Dict[Tuple[str, str, str], float] = {}
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    async def enrich(self, donation_ids: List[int], stage: Callable) -> Dict[str, Any]:
+        """Run every stage over `donation_ids`; `stage(name)` times each one"""
+        with stage("classify"):
+            await self.classify(donation_ids)
+        with stage("geocode"):
+            await self.geocode(donation_ids)
+        with stage("perishability"):
+            await self.score_perishability(donation_ids)
+        with stage("match"):
+            matches = await self.match(donation_ids)
+        return {"donations": matches, "enrichment": dict(self.counts)}
+
+    async def _run_ai(self, coroutine):
+        # The agent's calls block on the model client; run each on a worker
+        # thread with its own loop so the API's event loop stays free
+        return await asyncio.to_thread(asyncio.run, coroutine)
+
+    async def _gather_limited(self, keys, call) -> Dict[Any, Any]:
+        semaphore = asyncio.Semaphore(ENRICH_CONCURRENCY)
+
+        async def run(key):
+            async with semaphore:
+                return key, await call(key)
+
+        return dict(await asyncio.gather(*(run(key) for key in keys)))
+
+    async def classify(self, ids: List[int]) -> None:
+        async with self.session_factory() as db:
+            rows = (await db.execute(
+                select(Donation.id, Donation.food_type).where(Donation.id.in_(ids), Donation.food_category.is_(None))
+            )).all()
+            if not rows:
+                return
+            by_type = defaultdict(list)
+            for donation_id, food_type in rows:
+                by_type[food_type.strip().lower()].append(donation_id)
+            missing = by_type.keys() - self._categories.keys()
+            self._categories.update(await self._gather_limited(
+                missing, lambda food_type: self._run_ai(self.ai_agent.classify_food_category(food_type))
+            ))
+            self.counts["ai_classifications"] += len(missing)
+            by_category = defaultdict(list)
+            for food_type, donation_ids in by_type.items():
+                try:
+                    category = FoodCategory(self._categories[food_type])
+                except ValueError:
+                    category = FoodCategory.PACKAGED
+                by_category[category].extend(donation_ids)
+            for category, donation_ids in by_category.items():
+                await db.execute(update(Donation).where(Donation.id.in_(donation_ids)).values(food_category=category))
+            await db.commit()
+            self.counts["classified"] += len(rows)
+
+    async def geocode(self, ids: List[int]) -> None:
+        async with self.session_factory() as db:
+            rows = (await db.execute(
+                select(Donation.id, Donation.address).where(Donation.id.in_(ids), Donation.latitude.is_(None))
+            )).all()
+            if not rows:
+                return
+            addresses = {address for _, address in rows} - self._coords.keys()
+            if addresses:
+                # Addresses geocoded before (by earlier donations) cost nothing
+                self._coords.update(
+                    (address, (lat, lng))
+                    for address, lat, lng in (await db.execute(
+                        select(Donation.address, Donation.latitude, Donation.longitude)
+                        .where(Donation.address.in_(addresses), Donation.latitude.is_not(None))
+                        .distinct()
+                    )).all()
+                )
+            missing = addresses - self._coords.keys()
+            routing_service = RoutingService()
+            self._coords.update(await self._gather_limited(missing, routing_service.geocode))
+            self.counts["geocoder_calls"] += len(missing)
+            updates = [
+                {"id": donation_id, "latitude": self._coords[address][0], "longitude": self._coords[address][1],
+                 "neighborhood_code": neighborhood_for(*self._coords[address])}
+                for donation_id, address in rows if self._coords.get(address)
+            ]
+            if updates:
+                await db.execute(update(Donation), updates)
+            await db.commit()
+            self.counts["geocoded"] += len(updates)
+
+    async def score_perishability(self, ids: List[int]) -> None:
+        async with self.session_factory() as db:
+            donations = (await db.execute(
+                select(Donation).where(Donation.id.in_(ids), Donation.perishability_score.is_(None))
+            )).scalars().all()
+            if not donations:
+                return
+            matching_service = MatchingService(db)
+            # The estimate depends on when the donation was posted, so that is
+            # part of the key (a bulk chunk shares one posted_at)
+            kinds = {_perishability_kind(d) for d in donations}
+            missing = kinds - self._estimates.keys()
+            self._estimates.update(await self._gather_limited(
+                missing, lambda kind: self._run_ai(self.ai_agent.estimate_perishability(*kind))
+            ))
+            self.counts["ai_perishability_estimates"] += len(missing)
+            updates = []
+            for d in donations:
+                estimate = self._estimates[_perishability_kind(d)]
+                # Local decay model averaged with the AI estimate
+                score = (matching_service.calculate_perishability_score(d) + estimate) / 2
+                updates.append({"id": d.id, "perishability_score": score})
+            await db.execute(update(Donation), updates)
+            await db.commit()
+            self.counts["scored"] += len(updates)
+
+    async def match(self, ids: List[int]) -> List[Dict[str, Any]]:
+        """Match results per donation; also tells live dashboards the enriched fields"""
+        async with self.session_factory() as db:
+            donations = (await db.execute(select(Donation).where(Donation.id.in_(ids)))).scalars().all()
+            matching_service = MatchingService(db)
+            matches = []
+            for donation in donations:
+                recipient_options, match_scores = await matching_service.cached_matches(donation)
+                matches.append({
+                    "donation_id": donation.id, "recipient_options": recipient_options, "match_scores": match_scores,
+                })
+                queue_live_event(db, "donation.enriched", {"donation": donation_event_payload(donation.id, {
+                    "food_category": donation.food_category, "latitude": donation.latitude,
+                    "longitude": donation.longitude, "neighborhood_code": donation.neighborhood_code,
+                })})
+            await db.commit()
+        self.counts["matched"] += len(matches)
+        return matches
+
+
+@job_handler(ENRICH_DONATIONS)
+async def enrich_donations(context: JobContext) -> Dict[str, Any]:
+    enricher = DonationEnricher(context.session_factory, get_ai_agent())
+    return await enricher.enrich(context.payload["donation_ids"], context.stage)
@@ -0,0 +1,217 @@
+"""
+Publish/subscribe for live updates.
+
+`EventBus` fans events out to subscribers inside one process. Each event
+gets an increasing id, and the last EVENT_BUS_BUFFER_SIZE events are kept
+so a reconnecting client can resume from the id it last saw instead of
+downloading everything again.
+
+With several API workers, set EVENT_BUS_URL=redis://... and events are
+published through a Redis channel instead: every worker receives every
+event (including its own) and delivers it to its local subscribers.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+
+@dataclass
+class Event:
+    id: int
+    type: str  # "<topic>.<what>", e.g. donation.created, route.status
+    data: Dict[str, Any]
+    published_at: float = field(default_factory=time.time)
+
+    @property
+    def topic(self) -> str:
+        return self.type.split(".", 1)[0]
+
+
+class Subscription:
+    """One consumer's queue. If it falls too far behind it is marked overflowed and must resync."""
+
+    def __init__(self, topics: Optional[Iterable[str]], max_queue: int):
+        self.topics = set(topics) if topics else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+        self.closed = False
+
+    def offer(self, event: Optional[Event]) -> None:
+        if event is not None and self.topics is not None and event.topic not in self.topics:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Next event, or None on timeout (and after close)"""
+        if self.closed:
+            return None
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is None:
+            self.closed = True
+        return event
+
+
+class EventBus:
+    """In-process bus; also the local fan-out for the Redis adapter"""
+
+    distributed = False  # whether other processes receive what this one publishes
+
+    def __init__(self, buffer_size: int = 1000, max_queue: int = 1000):
+        self._subscribers: Set[Subscription] = set()
+        self._listeners: List[Callable[[Event], None]] = []
+        self._recent: deque = deque(maxlen=buffer_size)
+        self._max_queue = max_queue
+        self._next_id = 1
+        self.published = 0
+        self.delivered = 0
+
+    @property
+    def last_id(self) -> int:
+        return self._recent[-1].id if self._recent else 0
+
+    def publish_nowait(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Publish from the event loop thread without awaiting"""
+        event = Event(self._next_id, event_type, data)
+        self._next_id += 1
+        self._deliver(event)
+
+    def _deliver(self, event: Event) -> None:
+        self.published += 1
+        self._recent.append(event)
+        for listener in self._listeners:
+            listener(event)
+        for subscription in list(self._subscribers):
+            subscription.offer(event)
+            self.delivered += 1
+
+    def since(self, last_id: int) -> Optional[List[Event]]:
+        """Events after `last_id`, or None if some of them have left the buffer"""
+        if last_id > self.last_id:
+            return None  # id from another run of the server
+        if last_id == self.last_id:
+            return []
+        if not self._recent or self._recent[0].id > last_id + 1:
+            return None
+        return [event for event in self._recent if event.id > last_id]
+
+    def add_listener(self, listener: Callable[[Event], None]) -> None:
+        """Call `listener` synchronously for every delivered event"""
+        self._listeners.append(listener)
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(topics, self._max_queue)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        """End every open stream"""
+        for subscription in list(self._subscribers):
+            subscription.offer(None)
+        self._subscribers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "last_event_id": self.last_id,
+            "buffered": len(self._recent),
+        }
+
+
+class RedisEventBus(EventBus):
+    """
+    Events go out on a Redis channel and come back to every worker through
+    a listener task. Ids come from a shared Redis counter, so a client can
+    resume on any worker.
+    """
+
+    distributed = True
+
+    def __init__(self, url: str, channel: str = "food_rescue:events", **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.channel = channel
+        self._redis = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+        self.publish_errors = 0
+
+    def publish_nowait(self, event_type: str, data: Dict[str, Any]) -> None:
+        task = asyncio.get_running_loop().create_task(self._publish(event_type, data))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        try:
+            event_id = await self._redis.incr(f"{self.channel}:seq")
+            await self._redis.publish(self.channel, json.dumps(asdict(Event(event_id, event_type, data))))
+        except Exception as e:
+            self.publish_errors += 1
+            print(f"Event bus publish failed: {e}")
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") == "message":
+                        self._deliver(Event(**json.loads(message["data"])))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Event bus listener error: {e}")
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(self.url)
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._listener:
+            self._listener.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "backend": "redis", "channel": self.channel, "publish_errors": self.publish_errors}
+
+
+_event_bus: Optional[EventBus] = None
+
+
+def get_event_bus() -> EventBus:
+    """Shared bus: Redis when EVENT_BUS_URL is set, otherwise in-process"""
+    global _event_bus
+    if _event_bus is None:
+        options = {
+            "buffer_size": int(os.getenv("EVENT_BUS_BUFFER_SIZE", "1000")),
+            "max_queue": int(os.getenv("EVENT_BUS_MAX_QUEUE", "1000")),
+        }
+        url = os.getenv("EVENT_BUS_URL")
+        _event_bus = RedisEventBus(url, **options) if url else EventBus(**options)
+    return _event_bus
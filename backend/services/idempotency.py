@@ -0,0 +1,214 @@
+"""
+Idempotency keys for retried writes.
+
+A client sends `Idempotency-Key: <unique value>` with `POST /donation` or
+`POST /assign_route`. The first request with a key claims it (a row in
+`idempotency_keys`, unique per endpoint and key) and runs; its response is
+stored in the same transaction as the write it describes. A retry with the
+same key and body gets the stored response back without running the
+endpoint again. Reusing a key with a different body is rejected (422).
+
+Concurrent duplicates are serialized: within a process by a lock per key,
+across processes by the claim row. A duplicate waits up to
+IDEMPOTENCY_WAIT_SECONDS for the first request to finish, then gets a 409.
+A request that fails releases its key so the client can retry; a claim left
+by a crashed process is taken over after IDEMPOTENCY_LOCK_SECONDS. Stored
+responses expire after IDEMPOTENCY_TTL_HOURS. Timestamps are aware UTC and
+compared in SQL: PostgreSQL returns these columns aware, SQLite naive.
+"""
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import orjson
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import IdempotencyKey
+
+IN_PROGRESS, COMPLETED = "in_progress", "completed"
+
+TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.1
+
+# (scope, key) -> [lock, requests using it]
+_locks: Dict[Tuple[str, str], List[Any]] = {}
+
+
+class IdempotencyError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+def _jsonable(value: Any) -> Any:
+    return value.model_dump(mode="json") if hasattr(value, "model_dump") else value
+
+
+def fingerprint(payload: Any) -> str:
+    """Stable hash of a request body (a pydantic model or plain data)"""
+    return hashlib.sha256(
+        orjson.dumps(_jsonable(payload), option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    ).hexdigest()
+
+
+@asynccontextmanager
+async def _key_lock(scope: str, key: str) -> AsyncIterator[None]:
+    entry = _locks.setdefault((scope, key), [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _locks[(scope, key)]
+
+
+class IdempotentRequest:
+    """
+    A claimed key. `replay` is the stored (status, body) when the request
+    already ran; otherwise the endpoint runs and calls `complete` before
+    committing its write.
+    """
+
+    def __init__(self, db: AsyncSession, scope: str, key: Optional[str]):
+        self.db = db
+        self.scope = scope
+        self.key = key
+        self.claim_token = uuid.uuid4().hex
+        self.replay: Optional[Tuple[int, Any]] = None
+        self.completed = False
+
+    async def complete(self, content: Any, status_code: int = 200) -> None:
+        """Store the response in the current transaction (no-op without a key)"""
+        if self.key is None:
+            return
+        await self.db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.scope == self.scope, IdempotencyKey.key == self.key,
+                IdempotencyKey.claim_token == self.claim_token,
+            )
+            .values(
+                status=COMPLETED, locked_until=None, response_status=status_code, response_body=_jsonable(content),
+                expires_at=datetime.now(timezone.utc) + timedelta(hours=TTL_HOURS),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        self.completed = True
+
+    async def _claim(self, request_fingerprint: str) -> None:
+        """Insert the key, or find the earlier request's outcome; sets `replay` for a finished one"""
+        deadline = time.monotonic() + WAIT_SECONDS
+        while True:
+            now = datetime.now(timezone.utc)
+            self.db.add(IdempotencyKey(
+                scope=self.scope, key=self.key, fingerprint=request_fingerprint, status=IN_PROGRESS,
+                claim_token=self.claim_token, locked_until=now + timedelta(seconds=LOCK_SECONDS),
+                expires_at=now + timedelta(hours=TTL_HOURS),
+            ))
+            try:
+                await self.db.commit()
+                return
+            except IntegrityError:
+                await self.db.rollback()
+
+            # Take the key over if it expired or its request died (checked by
+            # the UPDATE itself, so only one taker wins)
+            taken = await self.db.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.scope == self.scope, IdempotencyKey.key == self.key,
+                    or_(
+                        IdempotencyKey.expires_at < now,
+                        and_(IdempotencyKey.status == IN_PROGRESS, IdempotencyKey.locked_until < now),
+                    ),
+                )
+                .values(
+                    fingerprint=request_fingerprint, status=IN_PROGRESS, claim_token=self.claim_token,
+                    locked_until=now + timedelta(seconds=LOCK_SECONDS), response_status=None,
+                    response_body=None, expires_at=now + timedelta(hours=TTL_HOURS),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await self.db.commit()
+            if taken.rowcount:
+                return
+
+            # Columns rather than the entity, so the next loop's add() doesn't
+            # collide with it in the identity map
+            existing = (await self.db.execute(
+                select(
+                    IdempotencyKey.fingerprint, IdempotencyKey.status,
+                    IdempotencyKey.response_status, IdempotencyKey.response_body,
+                )
+                .where(IdempotencyKey.scope == self.scope, IdempotencyKey.key == self.key)
+            )).one_or_none()
+            if existing is None:
+                continue  # released in the meantime
+            if existing.fingerprint != request_fingerprint:
+                raise IdempotencyError(422, "Idempotency-Key was already used with a different request")
+            if existing.status == COMPLETED:
+                self.replay = (existing.response_status, existing.response_body)
+                return
+            if time.monotonic() >= deadline:
+                raise IdempotencyError(409, "A request with this Idempotency-Key is still in progress; retry later")
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def _release(self) -> None:
+        """Drop the claim so a retry runs again (its lock timeout covers a failure here)"""
+        try:
+            await self.db.rollback()
+            await self.db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.scope == self.scope, IdempotencyKey.key == self.key,
+                    IdempotencyKey.claim_token == self.claim_token,
+                )
+            )
+            await self.db.commit()
+        except Exception as e:
+            print(f"Failed to release Idempotency-Key {self.key!r}: {e}")
+
+
+@asynccontextmanager
+async def idempotent(
+    db: AsyncSession, scope: str, key: Optional[str], payload: Any
+) -> AsyncIterator[IdempotentRequest]:
+    """
+    Run the body at most once per (scope, key). Without a key the body
+    always runs and `complete` does nothing. Must be entered before the
+    endpoint writes anything: claiming commits `db`.
+    """
+    request = IdempotentRequest(db, scope, key)
+    if key is None:
+        yield request
+        return
+    if not key.strip() or len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError(400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+    async with _key_lock(scope, key):
+        await request._claim(fingerprint(payload))
+        if request.replay is not None:
+            yield request
+            return
+        try:
+            yield request
+        except BaseException:
+            await request._release()
+            raise
+        if not request.completed:
+            await request._release()
+
+
+async def purge_expired(db: AsyncSession) -> int:
+    """Delete stored responses past their TTL"""
+    result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.now(timezone.utc)))
+    await db.commit()
+    return result.rowcount
@@ -1,5 +1,17 @@
-from sqlalchemy.orm import Session
-from typing import Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import enum
+import numpy as np
+from models import (
+    ArchivedDonation, ArchivedRoute, Donation, Route, ImpactTotal, DonationStatus, RouteStatus, FoodCategory
+)
+
+
+def _status_key(status) -> Optional[str]:
+    if status is None:
+        return None
+    return status.value if isinstance(status, enum.Enum) else str(status)
 
 
 class ImpactService:
@@ -21,7 +33,7 @@ class ImpactService:
     # EPA: 1 cubic yard landfill density ≈ 450 lbs food waste
     POUNDS_PER_CUBIC_YARD = 450
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
     def calculate_impact(self, pounds_rescued: float) -> Dict[str, float]:
@@ -55,13 +67,240 @@ class ImpactService:
             "landfill_space_saved": round(landfill_space_saved, 2)
         }
     
-    def calculate_donation_impact(self, donation_id: int) -> Dict[str, float]:
+    async def calculate_donation_impact(self, donation_id: int) -> Dict[str, float]:
         """Calculate impact for a specific donation"""
-        from models import Donation
-        
-        donation = self.db.query(Donation).filter(Donation.id == donation_id).first()
+        donation = await self.db.get(Donation, donation_id) or await self.db.get(ArchivedDonation, donation_id)
         if not donation:
             return {}
         
         return self.calculate_impact(donation.quantity_lbs)
-
+    
+    # Vectorized batch / what-if API
+    
+    def _impact_arrays(self, pounds: np.ndarray) -> Dict[str, np.ndarray]:
+        """Same metrics as `calculate_impact`, computed over an array in one pass"""
+        return {
+            "lbs_rescued": pounds,
+            "meals": np.round(pounds / self.POUNDS_PER_MEAL, 2),
+            "co2e_avoided": np.round(pounds * self.CO2E_PER_POUND, 2),
+            "ch4_avoided_tons": np.round(pounds / self.POUNDS_PER_TON * self.CH4_PER_TON, 4),
+            "landfill_space_saved": np.round(pounds / self.POUNDS_PER_CUBIC_YARD, 2),
+        }
+    
+    def calculate_impact_batch(self, pounds_rescued: Sequence[float]) -> Dict[str, List[float]]:
+        """
+        Calculate impact metrics for many amounts at once.
+        
+        Returns one list per metric, aligned with `pounds_rescued`.
+        """
+        pounds = np.asarray(pounds_rescued, dtype=np.float64)
+        return {metric: values.tolist() for metric, values in self._impact_arrays(pounds).items()}
+    
+    async def calculate_donation_impacts(self, donation_ids: Sequence[int]) -> Dict[int, Dict[str, float]]:
+        """Impact per donation for a list of IDs (hot or archived), fetched in a single query"""
+        ids = list(donation_ids)
+        rows = (await self.db.execute(
+            select(Donation.id, Donation.quantity_lbs).where(Donation.id.in_(ids))
+            .union_all(select(ArchivedDonation.id, ArchivedDonation.quantity_lbs).where(ArchivedDonation.id.in_(ids)))
+        )).all()
+        if not rows:
+            return {}
+        ids = [row[0] for row in rows]
+        metrics = self._impact_arrays(np.array([row[1] or 0.0 for row in rows], dtype=np.float64))
+        return {
+            donation_id: {metric: float(values[i]) for metric, values in metrics.items()}
+            for i, donation_id in enumerate(ids)
+        }
+    
+    async def pending_lbs_by_category(self) -> Dict[str, float]:
+        """Pending pounds per food category (one GROUP BY query)"""
+        rows = (await self.db.execute(
+            select(Donation.food_category, func.coalesce(func.sum(Donation.quantity_lbs), 0.0))
+            .where(Donation.status == DonationStatus.PENDING)
+            .group_by(Donation.food_category)
+        )).all()
+        pending = {category.value: 0.0 for category in FoodCategory}
+        for category, lbs in rows:
+            key = category.value if category else FoodCategory.PACKAGED.value
+            pending[key] += float(lbs)
+        return pending
+    
+    async def project_scenarios(
+        self,
+        completion_rates: Optional[Sequence[float]] = None,
+        category_rates: Optional[Sequence[Dict[str, float]]] = None
+    ) -> Dict[str, object]:
+        """
+        Project cumulative impact if a share of pending donations completes.
+        
+        `completion_rates` holds one uniform rate (0-1) per scenario;
+        `category_rates` holds one {food_category: rate} mapping per scenario
+        (unlisted categories complete at 0). Both may be given; their
+        scenarios are concatenated in that order. All scenarios are evaluated
+        as a single matrix product.
+        """
+        totals = await self.get_totals()
+        completed_lbs = totals.get(("donation", DonationStatus.COMPLETED.value), (0, 0.0))[1]
+        pending = await self.pending_lbs_by_category()
+        categories = list(pending)
+        pending_vector = np.array([pending[c] for c in categories], dtype=np.float64)
+        
+        rate_rows = []
+        if completion_rates:
+            uniform = np.asarray(completion_rates, dtype=np.float64)
+            rate_rows.append(np.repeat(uniform[:, None], len(categories), axis=1))
+        if category_rates:
+            rate_rows.append(np.array(
+                [[rates.get(c, 0.0) for c in categories] for rates in category_rates],
+                dtype=np.float64
+            ))
+        rates = np.vstack(rate_rows) if rate_rows else np.zeros((0, len(categories)))
+        rates = np.clip(rates, 0.0, 1.0)
+        
+        projected_lbs = completed_lbs + rates @ pending_vector
+        return {
+            "baseline": self.calculate_impact(completed_lbs),
+            "pending_lbs_by_category": pending,
+            "scenario_count": int(rates.shape[0]),
+            "scenarios": {
+                metric: values.tolist() for metric, values in self._impact_arrays(projected_lbs).items()
+            },
+        }
+    
+    # Incrementally maintained totals (impact_totals)
+    
+    def _insert_statement(self):
+        """The dialect's INSERT for impact_totals, which supports ON CONFLICT"""
+        dialect_name = self.db.bind.dialect.name
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect_name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise ValueError(f"Impact counters are not supported on {dialect_name}")
+        return insert(ImpactTotal)
+    
+    def _upsert_statement(self):
+        """INSERT ... ON CONFLICT (scope, status) DO UPDATE adding the deltas, so first writers can't collide"""
+        statement = self._insert_statement()
+        excluded = statement.excluded
+        return statement.on_conflict_do_update(
+            index_elements=[ImpactTotal.scope, ImpactTotal.status],
+            set_={
+                "item_count": ImpactTotal.item_count + excluded.item_count,
+                "total_lbs": ImpactTotal.total_lbs + excluded.total_lbs,
+                # ON CONFLICT updates skip the column's onupdate
+                "updated_at": func.now(),
+            },
+        )
+    
+    async def _bump(self, scope: str, status: str, count_delta: int, lbs_delta: float) -> None:
+        await self.db.execute(
+            self._upsert_statement().values(
+                scope=scope, status=status, item_count=count_delta, total_lbs=lbs_delta
+            )
+        )
+    
+    async def _record_transition(self, scope: str, old_status, new_status, lbs: float) -> None:
+        old_key, new_key = _status_key(old_status), _status_key(new_status)
+        if old_key == new_key:
+            return
+        if old_key:
+            await self._bump(scope, old_key, -1, -lbs)
+        if new_key:
+            await self._bump(scope, new_key, 1, lbs)
+    
+    async def record_donation_status(self, old_status, new_status, quantity_lbs: float) -> None:
+        """
+        Move a donation between status counters. Call before committing the
+        status change so both land in the same transaction. Use
+        `old_status=None` for a newly created donation.
+        """
+        await self._record_transition("donation", old_status, new_status, quantity_lbs or 0.0)
+    
+    async def record_donations_created(self, count: int, quantity_lbs: float) -> None:
+        """Count `count` new pending donations at once (bulk inserts); same transaction as the insert"""
+        if count:
+            await self._bump("donation", _status_key(DonationStatus.PENDING), count, quantity_lbs or 0.0)
+    
+    async def record_route_status(self, old_status, new_status) -> None:
+        """Move a route between status counters (same transaction as the change)"""
+        await self._record_transition("route", old_status, new_status, 0.0)
+    
+    async def get_totals(self) -> Dict[Tuple[str, str], Tuple[int, float]]:
+        """All counters keyed by (scope, status); a read of a handful of rows"""
+        rows = (await self.db.execute(select(ImpactTotal))).scalars().all()
+        return {(row.scope, row.status): (row.item_count, row.total_lbs) for row in rows}
+    
+    async def dashboard_summary(self) -> Dict[str, Any]:
+        """Impact of completed donations plus the dashboard counts, from the counters"""
+        totals = await self.get_totals()
+        completed_lbs = totals.get(("donation", DonationStatus.COMPLETED.value), (0, 0.0))[1]
+        return {
+            "impact": self.calculate_impact(completed_lbs),
+            "counts": {
+                "pending_donations": totals.get(("donation", DonationStatus.PENDING.value), (0, 0.0))[0],
+                "total_donations": sum(count for (scope, _), (count, _) in totals.items() if scope == "donation"),
+                "active_routes": sum(
+                    totals.get(("route", status.value), (0, 0.0))[0]
+                    for status in (RouteStatus.ASSIGNED, RouteStatus.IN_PROGRESS)
+                ),
+            },
+        }
+    
+    async def reconcile_totals(self) -> Dict[str, Dict[str, float]]:
+        """
+        Recompute every counter from the source tables and correct drifted
+        values. Returns the corrections that were applied.
+        
+        A zero row is first created for every possible (scope, status), so
+        each counter exists and can be locked. The rows are then locked (FOR
+        UPDATE on PostgreSQL) before the source tables are counted, so a
+        status change can't bump them between the count and the correction.
+        """
+        await self.db.execute(
+            self._insert_statement()
+            .values([
+                {"scope": scope, "status": status.value, "item_count": 0, "total_lbs": 0.0}
+                for scope, statuses in (("donation", DonationStatus), ("route", RouteStatus))
+                for status in statuses
+            ])
+            .on_conflict_do_nothing(index_elements=[ImpactTotal.scope, ImpactTotal.status])
+        )
+        await self.db.commit()
+        existing = {
+            (row.scope, row.status): (row.item_count or 0, row.total_lbs or 0.0)
+            for row in (await self.db.execute(select(ImpactTotal).with_for_update())).scalars().all()
+        }
+        actual: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        # Archived donations and routes still count towards the totals
+        for model in (Donation, ArchivedDonation):
+            donation_rows = (await self.db.execute(
+                select(model.status, func.count(model.id), func.coalesce(func.sum(model.quantity_lbs), 0.0))
+                .group_by(model.status)
+            )).all()
+            for status, count, lbs in donation_rows:
+                key = ("donation", _status_key(status or DonationStatus.PENDING))
+                prev_count, prev_lbs = actual.get(key, (0, 0.0))
+                actual[key] = (prev_count + count, prev_lbs + float(lbs))
+        for model in (Route, ArchivedRoute):
+            route_rows = (await self.db.execute(
+                select(model.status, func.count(model.id)).group_by(model.status)
+            )).all()
+            for status, count in route_rows:
+                key = ("route", _status_key(status or RouteStatus.ASSIGNED))
+                actual[key] = (actual.get(key, (0, 0.0))[0] + count, 0.0)
+        
+        corrections = {}
+        for key in set(actual) | set(existing):
+            count, lbs = actual.get(key, (0, 0.0))
+            observed_count, observed_lbs = existing.get(key, (0, 0.0))
+            if key in existing and observed_count == count and abs(observed_lbs - lbs) < 1e-6:
+                continue
+            corrections[f"{key[0]}:{key[1]}"] = {
+                "item_count": count - observed_count,
+                "total_lbs": round(lbs - observed_lbs, 4),
+            }
+            await self._bump(key[0], key[1], count - observed_count, lbs - observed_lbs)
+        await self.db.commit()
+        return corrections
@@ -0,0 +1,306 @@
+"""
+Durable background jobs.
+
+A job is a row in `jobs`, added with `enqueue` in the same transaction as
+the data it works on: once that commits, the work will run even if the
+process restarts. Each process runs a pool of JOB_WORKERS async workers that
+claim due jobs with a conditional UPDATE (safe with several processes on one
+database), run the handler registered for the job's kind, and record the
+stage timings of every attempt. A failed attempt is retried after
+JOB_RETRY_BASE_SECONDS * 2^(attempt - 1) (capped at JOB_RETRY_MAX_SECONDS)
+until the job's max_attempts; a job whose worker died is requeued once its
+lease (JOB_LEASE_SECONDS) runs out.
+
+Timestamps are written as aware UTC datetimes (the columns are timezone
+aware; PostgreSQL returns them aware too) and only compared in SQL.
+"""
+import asyncio
+import os
+import random
+import socket
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from models import Job
+
+QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "72"))
+MAINTENANCE_SECONDS = 60
+
+_handlers: Dict[str, Callable[["JobContext"], Awaitable[Any]]] = {}
+_pool: Optional["JobWorkerPool"] = None
+
+
+def job_handler(kind: str):
+    """Register the coroutine that runs jobs of `kind`; its return value is stored as the result"""
+    def register(handler):
+        _handlers[kind] = handler
+        return handler
+    return register
+
+
+def enqueue(
+    db: AsyncSession, kind: str, payload: Dict[str, Any], max_attempts: int = MAX_ATTEMPTS, delay_seconds: float = 0
+) -> Job:
+    """Add a job to `db`; it becomes visible to workers when the caller commits"""
+    job = Job(
+        kind=kind, payload=payload, status=QUEUED, attempts=0, max_attempts=max_attempts,
+        run_after=datetime.now(timezone.utc) + timedelta(seconds=delay_seconds),
+    )
+    db.add(job)
+    db.sync_session.info["jobs_enqueued"] = True
+    return job
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers(session):
+    # Start new jobs now rather than at the next poll
+    if session.info.pop("jobs_enqueued", False) and _pool is not None:
+        _pool.notify()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_enqueued(session, previous_transaction):
+    session.info.pop("jobs_enqueued", None)
+
+
+def retry_delay(attempt: int) -> float:
+    """Seconds before retrying after failed attempt number `attempt` (1-based), with 10% jitter"""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def job_payload(job: Job) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_after": job.run_after,
+        "last_error": job.last_error,
+        "stage_timings_ms": job.stage_timings or {},
+        "history": job.history or [],
+        "result": job.result,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class JobContext:
+    """What a handler gets: the job's payload, a session factory and stage timing"""
+
+    def __init__(self, job: Job, session_factory):
+        self.job_id = job.id
+        self.kind = job.kind
+        self.payload = job.payload
+        self.attempt = job.attempts
+        self.session_factory = session_factory
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 2)
+
+
+class JobWorkerPool:
+    def __init__(self, session_factory, workers: int = JOB_WORKERS):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_maintenance = 0.0
+        self.busy = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        global _pool
+        _pool = self
+        self._wakeup = asyncio.Event()
+        await self.maintain()
+        self._tasks = [asyncio.create_task(self._work(f"{self.name}/{n}")) for n in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers and hand their unfinished jobs back to the queue"""
+        global _pool
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if _pool is self:
+            _pool = None
+        async with self.session_factory() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.status == RUNNING, Job.locked_by.like(f"{self.name}/%"))
+                .values(status=QUEUED, locked_by=None, locked_at=None, run_after=datetime.now(timezone.utc))
+            )
+            await db.commit()
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self, worker: str) -> None:
+        while True:
+            # Cleared before claiming, so a notify during the claim isn't lost
+            self._wakeup.clear()
+            try:
+                job = await self._claim(worker)
+            except Exception as e:
+                print(f"Job claim error: {e}")
+                job = None
+            if job is not None:
+                try:
+                    await self._run(worker, job)
+                except Exception as e:
+                    # Couldn't record the outcome; the lease expiry retries the job
+                    print(f"Job {job.id} bookkeeping error: {e}")
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                if time.monotonic() - self._last_maintenance >= MAINTENANCE_SECONDS:
+                    try:
+                        await self.maintain()
+                    except Exception as e:
+                        print(f"Job maintenance error: {e}")
+
+    async def _claim(self, worker: str) -> Optional[Job]:
+        """Mark the oldest due job running for `worker`; None when nothing is due"""
+        async with self.session_factory() as db:
+            for _ in range(5):  # another worker may win the same row
+                now = datetime.now(timezone.utc)
+                job_id = (await db.execute(
+                    select(Job.id)
+                    .where(Job.status == QUEUED, Job.run_after <= now)
+                    .order_by(Job.run_after, Job.id)
+                    .limit(1)
+                )).scalar()
+                if job_id is None:
+                    return None
+                claimed = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == QUEUED)
+                    .values(
+                        status=RUNNING, locked_by=worker, locked_at=now, attempts=Job.attempts + 1,
+                        started_at=func.coalesce(Job.started_at, now),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                if claimed.rowcount:
+                    return await db.get(Job, job_id, populate_existing=True)
+        return None
+
+    async def _run(self, worker: str, job: Job) -> None:
+        context = JobContext(job, self.session_factory)
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        result, error = None, None
+        self.busy += 1
+        try:
+            handler = _handlers.get(job.kind)
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind '{job.kind}'")
+            result = await handler(context)
+        except asyncio.CancelledError:
+            raise  # shutdown: stop() requeues the job
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"Job {job.id} ({job.kind}) attempt {context.attempt} failed: {error}")
+        finally:
+            self.busy -= 1
+
+        attempt = {
+            "attempt": context.attempt,
+            "worker": worker,
+            "started_at": started_at.isoformat(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "stage_timings_ms": context.timings,
+            "error": error,
+        }
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            record = await db.get(Job, job.id)
+            record.history = [*(record.history or []), attempt]
+            record.stage_timings = context.timings
+            record.locked_by = None
+            record.locked_at = None
+            record.last_error = error
+            if error is None:
+                record.status = COMPLETED
+                record.result = result
+                record.finished_at = now
+                self.completed += 1
+            elif record.attempts >= record.max_attempts:
+                record.status = FAILED
+                record.finished_at = now
+                self.failed += 1
+            else:
+                record.status = QUEUED
+                record.run_after = now + timedelta(seconds=retry_delay(record.attempts))
+                self.retried += 1
+            await db.commit()
+
+    async def maintain(self) -> Dict[str, int]:
+        """Requeue jobs whose lease ran out; delete finished jobs older than JOB_RETENTION_HOURS"""
+        self._last_maintenance = time.monotonic()
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            requeued = await db.execute(
+                update(Job)
+                .where(Job.status == RUNNING, Job.locked_at < now - timedelta(seconds=LEASE_SECONDS))
+                .values(status=QUEUED, locked_by=None, locked_at=None, run_after=now)
+            )
+            purged = await db.execute(
+                delete(Job).where(
+                    Job.status.in_((COMPLETED, FAILED)), Job.finished_at < now - timedelta(hours=RETENTION_HOURS)
+                )
+            )
+            await db.commit()
+        if requeued.rowcount:
+            print(f"Requeued {requeued.rowcount} jobs with expired leases")
+            self.notify()
+        return {"requeued": requeued.rowcount, "purged": purged.rowcount}
+
+    async def stats(self) -> Dict[str, Any]:
+        async with self.session_factory() as db:
+            counts = dict((await db.execute(select(Job.status, func.count()).group_by(Job.status))).all())
+            oldest_due = (await db.execute(
+                select(func.min(Job.run_after))
+                .where(Job.status == QUEUED, Job.run_after <= datetime.now(timezone.utc))
+            )).scalar()
+        return {
+            "workers": self.workers,
+            "busy_workers": self.busy,
+            "jobs": {status: counts.get(status, 0) for status in (QUEUED, RUNNING, COMPLETED, FAILED)},
+            "oldest_due": oldest_due,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+def get_job_pool() -> Optional[JobWorkerPool]:
+    return _pool
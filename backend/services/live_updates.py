@@ -0,0 +1,233 @@
+"""
+Live dashboard updates.
+
+Donation and route inserts and status changes are recorded by ORM flush
+hooks and published on the event bus once the transaction commits (dropped
+on rollback), so clients only ever see committed state. `/events/stream`
+sends one snapshot followed by these deltas as Server-Sent Events.
+
+Bulk Core statements bypass the hooks. Bulk ingestion queues its
+`donation.created` events itself (`queue_live_event`); the other paths
+(neighborhood tagging, archival) don't change what dashboards show.
+"""
+import asyncio
+import enum
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from models import Donation, Route, DonationStatus
+from services.event_bus import EventBus, get_event_bus
+from services.impact_service import ImpactService
+
+TOPICS = ("donation", "route")
+
+DONATION_EVENT_FIELDS = (
+    "donor_id", "food_type", "food_category", "quantity_lbs", "status", "address",
+    "latitude", "longitude", "neighborhood_code", "pickup_window_start",
+    "pickup_window_end", "posted_at", "completed_at",
+)
+ROUTE_EVENT_FIELDS = (
+    "donation_id", "driver_id", "recipient_id", "status", "estimated_duration_minutes",
+    "estimated_distance_miles", "neighborhood_code", "started_at", "completed_at", "created_at",
+)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _status(value: Any) -> Optional[str]:
+    return _jsonable(value) if value is not None else None
+
+
+def _payload(obj, id_key: str, fields: Iterable[str]) -> Dict[str, Any]:
+    # Only attributes already loaded: a flush hook must not trigger a SELECT
+    loaded = inspect(obj).dict
+    payload = {id_key: obj.id}
+    for name in fields:
+        if name in loaded:
+            payload[name] = _jsonable(loaded[name])
+    return payload
+
+
+def donation_payload(donation: Donation) -> Dict[str, Any]:
+    return _payload(donation, "donation_id", DONATION_EVENT_FIELDS)
+
+
+def route_payload(route: Route) -> Dict[str, Any]:
+    return _payload(route, "route_id", ROUTE_EVENT_FIELDS)
+
+
+def donation_event_payload(donation_id: int, values: Dict[str, Any]) -> Dict[str, Any]:
+    """`donation_payload` for a row inserted from plain values (multi-row INSERTs)"""
+    payload = {"donation_id": donation_id}
+    for name in DONATION_EVENT_FIELDS:
+        if name in values:
+            payload[name] = _jsonable(values[name])
+    return payload
+
+
+def queue_live_event(session, event_type: str, data: Dict[str, Any]) -> None:
+    """Publish `event_type` when `session` commits, for writes the ORM hooks don't see"""
+    if isinstance(session, AsyncSession):
+        session = session.sync_session
+    session.info.setdefault("live_events", []).append((event_type, data))
+
+
+def _queue(target, event_type: str, data: Dict[str, Any]) -> None:
+    session = object_session(target)
+    if session is not None:
+        queue_live_event(session, event_type, data)
+
+
+def _status_change(target):
+    """(changed, previous status) from the pending flush's attribute history"""
+    history = inspect(target).attrs.status.history
+    if not history.has_changes():
+        return False, None
+    previous = _status(history.deleted[0]) if history.deleted else None
+    return previous != _status(target.status), previous
+
+
+@event.listens_for(Donation, "after_insert")
+def _donation_inserted(mapper, connection, target):
+    _queue(target, "donation.created", {"donation": donation_payload(target)})
+
+
+@event.listens_for(Donation, "after_update")
+def _donation_updated(mapper, connection, target):
+    changed, previous = _status_change(target)
+    if not changed:
+        return
+    status = _status(target.status)
+    data = {"donation": donation_payload(target), "previous_status": previous}
+    if status == DonationStatus.COMPLETED.value:
+        # What the completion adds to the impact totals, so clients needn't refetch them
+        data["impact_delta"] = ImpactService(None).calculate_impact(target.quantity_lbs or 0.0)
+    _queue(target, f"donation.{status}", data)
+
+
+@event.listens_for(Route, "after_insert")
+def _route_inserted(mapper, connection, target):
+    _queue(target, "route.created", {"route": route_payload(target)})
+
+
+@event.listens_for(Route, "after_update")
+def _route_updated(mapper, connection, target):
+    changed, previous = _status_change(target)
+    if changed:
+        _queue(target, "route.status", {"route": route_payload(target), "previous_status": previous})
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    events = session.info.pop("live_events", None)
+    if not events:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # sync scripts have no live clients in this process
+    bus = get_event_bus()
+    for event_type, data in events:
+        bus.publish_nowait(event_type, data)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    session.info.pop("live_events", None)
+
+
+async def snapshot(db: AsyncSession, limit: int = 50) -> Dict[str, Any]:
+    """Current state for a new client: newest donations and routes, plus impact totals"""
+    donations = (await db.execute(
+        select(Donation).order_by(Donation.posted_at.desc(), Donation.id.desc()).limit(limit)
+    )).scalars().all()
+    routes = (await db.execute(
+        select(Route).order_by(Route.created_at.desc(), Route.id.desc()).limit(limit)
+    )).scalars().all()
+    return {
+        "donations": [donation_payload(d) for d in donations],
+        "routes": [route_payload(r) for r in routes],
+        **await ImpactService(db).dashboard_summary(),
+    }
+
+
+def format_sse(event_type: str, data: Any, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(
+    session_factory,
+    topics: Optional[Iterable[str]] = None,
+    last_event_id: Optional[int] = None,
+    include_snapshot: bool = True,
+    limit: int = 50,
+    heartbeat_seconds: float = 15.0,
+    bus: Optional[EventBus] = None,
+) -> AsyncIterator[str]:
+    """
+    SSE body. Subscribes before reading the snapshot so nothing committed
+    in between is missed (a delta may repeat what the snapshot shows;
+    clients apply them as upserts). A reconnect with a Last-Event-ID still
+    in the bus buffer replays just the missed events. Otherwise the client
+    gets a `resync` and, if it asked for one, a fresh snapshot.
+    """
+    bus = bus or get_event_bus()
+    # Only the dashboard topics; the bus also carries internal events
+    subscription = bus.subscribe(topics or TOPICS)
+    try:
+        replay = bus.since(last_event_id) if last_event_id is not None else None
+        if replay is not None:
+            for event in replay:
+                if subscription.topics is None or event.topic in subscription.topics:
+                    yield format_sse(event.type, event.data, event.id)
+            # Replayed events may also be queued already
+            seen = replay[-1].id if replay else last_event_id
+        else:
+            seen = bus.last_id
+            if last_event_id is not None:
+                yield format_sse("resync", {"reason": "missed events are no longer buffered"})
+            if include_snapshot:
+                async with session_factory() as db:
+                    state = await snapshot(db, limit)
+                yield format_sse("snapshot", state, seen)
+            else:
+                yield format_sse("ready", {"last_event_id": seen}, seen)
+
+        while True:
+            event = await subscription.get(heartbeat_seconds)
+            if subscription.closed:
+                break
+            if subscription.overflowed:
+                # Fell behind: deltas were dropped, so start over from a snapshot
+                subscription.overflowed = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                seen = bus.last_id
+                yield format_sse("resync", {"reason": "client fell behind"})
+                if include_snapshot:
+                    async with session_factory() as db:
+                        state = await snapshot(db, limit)
+                    yield format_sse("snapshot", state, seen)
+                continue
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            if event.id <= seen:
+                continue
+            yield format_sse(event.type, event.data, event.id)
+    finally:
+        bus.unsubscribe(subscription)
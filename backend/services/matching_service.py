@@ -1,17 +1,33 @@
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Tuple
 from models import Donation, Recipient, FoodCategory
 from geopy.distance import geodesic
-from geopy.geocoders import Nominatim
+from services.providers import make_geocoder
+from services.spatial_repository import SpatialRepository
+from services.change_versions import change_versions
+from collections import OrderedDict
 import os
 import httpx
 from datetime import datetime
 
 
 class MatchingService:
-    def __init__(self, db: Session):
+    # Recipients are prefiltered to this radius around a geocoded donation,
+    # widened (doubling) up to MAX_MATCH_RADIUS_MILES until enough are found
+    MATCH_RADIUS_MILES = float(os.getenv("MATCH_RADIUS_MILES", "5"))
+    MAX_MATCH_RADIUS_MILES = float(os.getenv("MAX_MATCH_RADIUS_MILES", "40"))
+    
+    # Ranked matches per donation, shared by all requests in the process and
+    # reused until a recipient changes (scores don't depend on anything else)
+    MATCH_CACHE_SIZE = int(os.getenv("MATCH_CACHE_SIZE", "5000"))
+    _match_cache: "OrderedDict[tuple, Tuple[List[int], List[Dict[str, Any]]]]" = OrderedDict()
+    
+    def __init__(self, db: AsyncSession):
         self.db = db
-        self.geocoder = Nominatim(user_agent="food_rescue_route_ai")
+        self.geocoder = make_geocoder()
+        self.spatial = SpatialRepository(db)
     
     def _geocode_address(self, address: str):
         """Geocode address to get coordinates"""
@@ -37,6 +53,12 @@ class MatchingService:
         except Exception:
             return 5.0  # Default distance
     
+    def distance_between(self, donation: Donation, recipient: Recipient) -> float:
+        """Miles between a donation and a recipient, from stored coordinates when both have them"""
+        if None not in (donation.latitude, donation.longitude, recipient.latitude, recipient.longitude):
+            return geodesic((donation.latitude, donation.longitude), (recipient.latitude, recipient.longitude)).miles
+        return self.calculate_distance(donation.address, recipient.address)
+    
     def calculate_perishability_score(self, donation: Donation) -> float:
         """Calculate perishability score (0-10) based on food category and time"""
         # Food category decay factors (from USDA data)
@@ -90,7 +112,7 @@ class MatchingService:
                 capacity_match = max(0.0, 1.0 - (donation.quantity_lbs / recipient.storage_capacity_lbs - 1.0))
         
         # Distance score (0-10, normalized to 0-1)
-        distance_miles = self.calculate_distance(donation.address, recipient.address)
+        distance_miles = self.distance_between(donation, recipient)
         distance_score = self.calculate_distance_score(distance_miles) / 10.0
         
         # Weighted match score
@@ -98,11 +120,38 @@ class MatchingService:
         
         return match_score
     
-    def find_matching_recipients(self, donation: Donation, limit: int = 5) -> List[Recipient]:
+    async def candidate_recipients(self, donation: Donation, limit: int) -> List[Recipient]:
+        """
+        Recipients worth scoring. For a geocoded donation, those within the
+        match radius, found through the spatial index, plus every recipient
+        without coordinates (their distance comes from geocoding the address);
+        otherwise all.
+        
+        Geocoded recipients farther than MAX_MATCH_RADIUS_MILES (40) are
+        never candidates. Past 20 miles the distance part of the score is
+        already 0, so they could only place on category and capacity.
+        """
+        if donation.latitude is None or donation.longitude is None:
+            return list((await self.db.execute(select(Recipient))).scalars().all())
+        radius = self.MATCH_RADIUS_MILES
+        while True:
+            nearby = await self.spatial.within_radius(Recipient, donation.latitude, donation.longitude, radius)
+            if len(nearby) >= limit or radius >= self.MAX_MATCH_RADIUS_MILES:
+                break
+            radius = min(radius * 2, self.MAX_MATCH_RADIUS_MILES)
+        ungeocoded = (await self.db.execute(
+            select(Recipient).where(or_(Recipient.latitude.is_(None), Recipient.longitude.is_(None)))
+        )).scalars().all()
+        return [recipient for recipient, _ in nearby] + list(ungeocoded)
+    
+    async def find_matching_recipients(self, donation: Donation, limit: int = 5) -> List[Recipient]:
         """Find top N matching recipients for a donation"""
-        # Get all recipients
-        all_recipients = self.db.query(Recipient).all()
+        all_recipients = await self.candidate_recipients(donation, limit)
         
+        # Scoring geocodes addresses (blocking I/O), so keep it off the event loop
+        return await run_in_threadpool(self._rank_recipients, donation, all_recipients, limit)
+    
+    def _rank_recipients(self, donation: Donation, all_recipients: List[Recipient], limit: int) -> List[Recipient]:
         # Calculate match scores for all
         scored_recipients = []
         for recipient in all_recipients:
@@ -115,3 +164,36 @@ class MatchingService:
         
         # Return top N
         return [recipient for _, recipient in scored_recipients[:limit]]
+    
+    async def score_recipients(self, donation: Donation, recipients: List[Recipient]) -> List[Dict[str, Any]]:
+        """Match score and distance for each recipient, best first"""
+        return await run_in_threadpool(self._score_recipients, donation, recipients)
+    
+    def _score_recipients(self, donation: Donation, recipients: List[Recipient]) -> List[Dict[str, Any]]:
+        match_scores = []
+        for recipient in recipients:
+            match_scores.append({
+                "recipient_id": recipient.id,
+                "recipient_name": recipient.name,
+                "score": self.calculate_match_score(donation, recipient),
+                "distance_miles": self.distance_between(donation, recipient)
+            })
+        match_scores.sort(key=lambda x: x["score"], reverse=True)
+        return match_scores
+    
+    async def cached_matches(self, donation: Donation, limit: int = 5) -> Tuple[List[int], List[Dict[str, Any]]]:
+        """(recipient ids, match scores) for a donation, as listed under recipient_options / match_scores"""
+        key = (
+            donation.id, donation.food_category, donation.quantity_lbs, donation.latitude, donation.longitude,
+            donation.address, limit, change_versions.version(("recipients",)),
+        )
+        cached = self._match_cache.get(key)
+        if cached is not None:
+            self._match_cache.move_to_end(key)
+            return cached
+        recipients = await self.find_matching_recipients(donation, limit)
+        cached = ([r.id for r in recipients], await self.score_recipients(donation, recipients))
+        self._match_cache[key] = cached
+        if len(self._match_cache) > self.MATCH_CACHE_SIZE:
+            self._match_cache.popitem(last=False)
+        return cached
@@ -0,0 +1,176 @@
+"""
+Point-in-polygon index over NYC Neighborhood Tabulation Areas (NTAs).
+
+Built from the `neighborhoods` snapshot (`the_geom` MultiPolygons). Every
+ring is flattened into edge arrays, and each polygon is registered in the
+cells of a coarse lat/lng grid that its bounding box overlaps. A lookup
+buckets the points by grid cell, then runs an even-odd ray cast for each
+candidate polygon over all of its candidate points at once, so tagging
+thousands of rows is a handful of NumPy passes.
+
+The index is derived from one snapshot version and cached on that
+SnapshotTable, so it is rebuilt only after the neighborhoods dataset syncs.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from services.nyc_snapshot import SnapshotStore, SnapshotTable, get_nyc_snapshot
+
+
+class NeighborhoodIndex:
+    """Grid-bucketed polygon index; lookups return NTA codes"""
+
+    CELL_DEGREES = 0.02  # ~2 km; an NTA typically spans a few cells
+    MAX_PAIRS = 4_000_000  # points x edges per ray-cast pass, bounds memory
+    CODE_COLUMNS = ("nta2020", "ntacode")  # 2020 and 2010 NTA datasets
+    BOROUGH_COLUMNS = ("boroname", "boro_name")
+
+    def __init__(self, neighborhoods: List[Dict[str, Any]], rings: List[List[np.ndarray]]):
+        self.neighborhoods = neighborhoods
+        self._by_code = {n["code"]: n for n in neighborhoods}
+
+        # Edges of every ring, grouped by polygon: polygon p owns
+        # edges[edge_offsets[p]:edge_offsets[p + 1]]
+        edges, offsets, bounds = [], [0], []
+        for polygon_rings in rings:
+            count = 0
+            for ring in polygon_rings:
+                edges.append(np.hstack([ring[:-1], ring[1:]]))  # lng1, lat1, lng2, lat2
+                count += len(ring) - 1
+            offsets.append(offsets[-1] + count)
+            points = np.vstack(polygon_rings) if polygon_rings else np.zeros((1, 2))
+            bounds.append([points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()])
+        self._edges = np.vstack(edges) if edges else np.zeros((0, 4))
+        self._edge_offsets = np.array(offsets, dtype=np.intp)
+        self._bounds = np.array(bounds, dtype=np.float64).reshape(-1, 4)
+
+        # Grid over the union of bounding boxes; cell -> candidate polygons (CSR)
+        if len(self._bounds):
+            self._origin = self._bounds[:, :2].min(axis=0)
+            extent = self._bounds[:, 2:].max(axis=0) - self._origin
+        else:
+            self._origin, extent = np.zeros(2), np.zeros(2)
+        self._cols, self._rows = (np.floor(extent / self.CELL_DEGREES).astype(int) + 1).tolist()
+        buckets: List[List[int]] = [[] for _ in range(self._rows * self._cols)]
+        for polygon, (min_lng, min_lat, max_lng, max_lat) in enumerate(self._bounds):
+            c0, r0 = self._cell_of(min_lng, min_lat)
+            c1, r1 = self._cell_of(max_lng, max_lat)
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    buckets[r * self._cols + c].append(polygon)
+        self._cell_offsets = np.zeros(len(buckets) + 1, dtype=np.intp)
+        np.cumsum([len(b) for b in buckets], out=self._cell_offsets[1:])
+        self._cell_polygons = np.array([p for b in buckets for p in b], dtype=np.intp)
+
+    def __len__(self) -> int:
+        return len(self.neighborhoods)
+
+    def _cell_of(self, lng: float, lat: float):
+        return (int((lng - self._origin[0]) // self.CELL_DEGREES),
+                int((lat - self._origin[1]) // self.CELL_DEGREES))
+
+    @classmethod
+    def from_table(cls, table: SnapshotTable) -> "NeighborhoodIndex":
+        kinds = table.column_kinds
+        geometries = table.values("the_geom") if "the_geom" in kinds else [None] * len(table)
+        code_column = next((c for c in cls.CODE_COLUMNS if c in kinds), None)
+        borough_column = next((c for c in cls.BOROUGH_COLUMNS if c in kinds), None)
+        codes = table.values(code_column) if code_column else [None] * len(table)
+        names = table.values("ntaname") if "ntaname" in kinds else [None] * len(table)
+        boroughs = table.values(borough_column) if borough_column else [None] * len(table)
+
+        neighborhoods, rings = [], []
+        for i, geometry in enumerate(geometries):
+            if not geometry or not (codes[i] or names[i]):
+                continue
+            if geometry.get("type") == "Polygon":
+                polygons = [geometry["coordinates"]]
+            elif geometry.get("type") == "MultiPolygon":
+                polygons = geometry["coordinates"]
+            else:
+                continue
+            polygon_rings = [
+                np.asarray(ring, dtype=np.float64)[:, :2]
+                for polygon in polygons for ring in polygon if len(ring) >= 4
+            ]
+            if not polygon_rings:
+                continue
+            neighborhoods.append({"code": codes[i] or names[i], "name": names[i], "borough": boroughs[i]})
+            rings.append(polygon_rings)
+        return cls(neighborhoods, rings)
+
+    def _contains(self, polygon: int, lngs: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        """Even-odd ray cast of many points against one polygon (holes included)"""
+        edges = self._edges[self._edge_offsets[polygon]:self._edge_offsets[polygon + 1]]
+        x1, y1, x2, y2 = (edges[:, i][np.newaxis, :] for i in range(4))
+        inside = np.zeros(len(lngs), dtype=bool)
+        step = max(1, self.MAX_PAIRS // max(len(edges), 1))
+        for start in range(0, len(lngs), step):
+            px = lngs[start:start + step, np.newaxis]
+            py = lats[start:start + step, np.newaxis]
+            straddles = (y1 > py) != (y2 > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing_x = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            inside[start:start + step] = ((straddles & (px < crossing_x)).sum(axis=1) % 2) == 1
+        return inside
+
+    def assign(self, lats: Sequence[float], lngs: Sequence[float]) -> np.ndarray:
+        """NTA code for each point (None where the point is in no NTA or is missing)"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        result = np.full(len(lats), -1, dtype=np.intp)
+        if len(lats) and len(self):
+            cols = np.floor((lngs - self._origin[0]) / self.CELL_DEGREES)
+            rows = np.floor((lats - self._origin[1]) / self.CELL_DEGREES)
+            valid = (cols >= 0) & (cols < self._cols) & (rows >= 0) & (rows < self._rows)
+            points = np.nonzero(valid)[0]
+            cells = (rows[points] * self._cols + cols[points]).astype(np.intp)
+
+            # Expand to (point, candidate polygon) pairs
+            counts = self._cell_offsets[cells + 1] - self._cell_offsets[cells]
+            pair_points = np.repeat(points, counts)
+            starts = np.repeat(self._cell_offsets[cells], counts)
+            within = np.arange(len(pair_points)) - np.repeat(np.cumsum(counts) - counts, counts)
+            pair_polygons = self._cell_polygons[starts + within]
+
+            # One vectorized ray cast per polygon over all of its candidate points
+            order = np.argsort(pair_polygons, kind="stable")
+            pair_points, pair_polygons = pair_points[order], pair_polygons[order]
+            boundaries = np.flatnonzero(np.diff(pair_polygons)) + 1
+            for group in np.split(np.arange(len(pair_polygons)), boundaries):
+                if not len(group):
+                    continue
+                polygon = pair_polygons[group[0]]
+                candidates = pair_points[group]
+                min_lng, min_lat, max_lng, max_lat = self._bounds[polygon]
+                in_box = ((lngs[candidates] >= min_lng) & (lngs[candidates] <= max_lng)
+                          & (lats[candidates] >= min_lat) & (lats[candidates] <= max_lat))
+                candidates = candidates[in_box & (result[candidates] < 0)]
+                if len(candidates):
+                    inside = self._contains(polygon, lngs[candidates], lats[candidates])
+                    result[candidates[inside]] = polygon
+        codes = np.array([n["code"] for n in self.neighborhoods] + [None], dtype=object)
+        return codes[result]
+
+    def lookup(self, lat: Optional[float], lng: Optional[float]) -> Optional[str]:
+        if lat is None or lng is None:
+            return None
+        return self.assign([lat], [lng])[0]
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        return self._by_code.get(code)
+
+
+def get_neighborhood_index(snapshot: Optional[SnapshotStore] = None) -> Optional[NeighborhoodIndex]:
+    """Index over the current neighborhoods snapshot; None until it has been synced"""
+    table = (snapshot or get_nyc_snapshot()).get("neighborhoods")
+    if table is None:
+        return None
+    if "polygon_index" not in table.cache:
+        table.cache["polygon_index"] = NeighborhoodIndex.from_table(table)
+    return table.cache["polygon_index"]
+
+
+def neighborhood_for(lat: Optional[float], lng: Optional[float]) -> Optional[str]:
+    """NTA code for one point, or None when untagged or no index is loaded"""
+    index = get_neighborhood_index()
+    return index.lookup(lat, lng) if index is not None else None
@@ -0,0 +1,148 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, select, update
+from typing import Any, Dict, List, Optional
+from starlette.concurrency import run_in_threadpool
+from models import ArchivedDonation, ArchivedRoute, Donation, Recipient, Route, DonationStatus, RouteStatus
+from services.neighborhood_index import NeighborhoodIndex, get_neighborhood_index
+
+
+class NeighborhoodService:
+    """
+    Neighborhood (NTA) tags on donations, recipients and routes, and the
+    coverage view built from them. Tags are written once from coordinates,
+    so grouping queries never touch geometry.
+    """
+
+    UPDATE_CHUNK_SIZE = 5000
+
+    def __init__(self, db: AsyncSession, index: Optional[NeighborhoodIndex] = None):
+        self.db = db
+        self.index = index or get_neighborhood_index()
+
+    async def _tag_points(self, model, retag: bool) -> int:
+        """Assign codes to rows with coordinates; returns rows whose code changed"""
+        query = select(model.id, model.latitude, model.longitude, model.neighborhood_code).where(
+            model.latitude.is_not(None), model.longitude.is_not(None)
+        )
+        if not retag:
+            query = query.where(model.neighborhood_code.is_(None))
+        rows = (await self.db.execute(query)).all()
+        if not rows:
+            return 0
+        codes = await run_in_threadpool(
+            self.index.assign, [row.latitude for row in rows], [row.longitude for row in rows]
+        )
+        changed = [
+            {"id": row.id, "neighborhood_code": code}
+            for row, code in zip(rows, codes) if code != row.neighborhood_code
+        ]
+        for i in range(0, len(changed), self.UPDATE_CHUNK_SIZE):
+            # ORM bulk UPDATE by primary key (executemany)
+            await self.db.execute(update(model), changed[i:i + self.UPDATE_CHUNK_SIZE])
+        return len(changed)
+
+    async def tag(self, retag: bool = False) -> Dict[str, Any]:
+        """
+        Tag untagged rows (every row with `retag`, e.g. after the NTA
+        boundaries changed). Routes take their recipient's neighborhood.
+        Rollups are rebuilt when donation tags change, since `area` is the
+        donation's neighborhood.
+        """
+        if self.index is None:
+            return {"indexed": False}
+        donations = await self._tag_points(Donation, retag)
+        recipients = await self._tag_points(Recipient, retag)
+        route_update = (
+            update(Route)
+            .values(neighborhood_code=(
+                select(Recipient.neighborhood_code)
+                .where(Recipient.id == Route.recipient_id)
+                .scalar_subquery()
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        if not retag and not recipients:
+            route_update = route_update.where(Route.neighborhood_code.is_(None))
+        routes = (await self.db.execute(route_update)).rowcount
+        await self.db.commit()
+        if donations:
+            from services.rollup_service import RollupService
+            await RollupService(self.db).rebuild()
+        return {
+            "indexed": True,
+            "neighborhoods": len(self.index),
+            "donations": donations,
+            "recipients": recipients,
+            "routes": routes,
+        }
+
+    async def coverage(self, borough: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Supply and deliveries per neighborhood, least served first. Every
+        NTA in the index is listed, including those with no activity.
+        """
+        # History counts too: archived donations and routes are included
+        donations, deliveries = [], []
+        for donation_model, route_model in ((Donation, Route), (ArchivedDonation, ArchivedRoute)):
+            donations += (await self.db.execute(
+                select(
+                    donation_model.neighborhood_code,
+                    func.count(donation_model.id),
+                    func.coalesce(func.sum(donation_model.quantity_lbs), 0.0),
+                    func.sum(case((donation_model.status == DonationStatus.PENDING, 1), else_=0)),
+                ).group_by(donation_model.neighborhood_code)
+            )).all()
+            deliveries += (await self.db.execute(
+                select(
+                    route_model.neighborhood_code,
+                    func.count(route_model.id),
+                    func.coalesce(func.sum(case(
+                        (route_model.status == RouteStatus.COMPLETED, donation_model.quantity_lbs), else_=0.0
+                    )), 0.0),
+                )
+                .join(donation_model, donation_model.id == route_model.donation_id)
+                .group_by(route_model.neighborhood_code)
+            )).all()
+        recipients = (await self.db.execute(
+            select(Recipient.neighborhood_code, func.count(Recipient.id))
+            .group_by(Recipient.neighborhood_code)
+        )).all()
+
+        known = self.index.neighborhoods if self.index is not None else []
+        rows: Dict[Optional[str], Dict[str, Any]] = {
+            n["code"]: {**n, "donations": 0, "donated_lbs": 0.0, "pending_donations": 0,
+                        "recipients": 0, "routes": 0, "delivered_lbs": 0.0}
+            for n in known
+        }
+
+        def row_for(code):
+            if code not in rows:
+                rows[code] = {"code": code, "name": None, "borough": None, "donations": 0,
+                              "donated_lbs": 0.0, "pending_donations": 0, "recipients": 0,
+                              "routes": 0, "delivered_lbs": 0.0}
+            return rows[code]
+
+        for code, count, lbs, pending in donations:
+            row = row_for(code)
+            row["donations"] += count
+            row["donated_lbs"] = round(row["donated_lbs"] + lbs, 2)
+            row["pending_donations"] += pending or 0
+        for code, count in recipients:
+            row_for(code)["recipients"] = count
+        for code, count, lbs in deliveries:
+            row = row_for(code)
+            row["routes"] += count
+            row["delivered_lbs"] = round(row["delivered_lbs"] + lbs, 2)
+
+        result = []
+        for row in rows.values():
+            if borough and (row["borough"] or "").lower() != borough.lower():
+                continue
+            row["delivered_lbs_per_recipient"] = (
+                round(row["delivered_lbs"] / row["recipients"], 2) if row["recipients"] else None
+            )
+            row["underserved"] = row["code"] is not None and (row["recipients"] == 0 or row["routes"] == 0)
+            result.append(row)
+        # Untagged rows (code None) last; otherwise fewest pounds delivered first
+        result.sort(key=lambda r: (r["code"] is None, r["delivered_lbs"], -r["pending_donations"]))
+        return result
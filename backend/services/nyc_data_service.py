@@ -1,10 +1,24 @@
 """
 NYC Open Data Integration Service
 Fetches data from NYC Open Data Portal APIs (free, no API key required)
+
+Datasets are mirrored into a local columnar snapshot (see nyc_snapshot.py) by
+`sync`, which pages concurrently and, after the first run, only pulls rows
+whose `:updated_at` is newer than the snapshot. Reads are served from the
+snapshot and fall back to the live API when no snapshot exists yet.
 """
+import asyncio
 import httpx
+import os
+import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from sqlalchemy import func, or_, select
+from models import Recipient
+from services.providers import nyc_open_data_base
+from services.nyc_snapshot import SnapshotStore, SnapshotTable, get_nyc_snapshot
+from services.traffic_index import get_traffic_index
+from services.neighborhood_index import get_neighborhood_index
 
 
 class NYCDataService:
@@ -13,15 +27,59 @@ class NYCDataService:
     All NYC Open Data APIs are free and don't require API keys.
     """
     
-    BASE_URL = "https://data.cityofnewyork.us/resource"
+    FOOD_PANTRY_DATASET = "9cy3-7kc7"
+    SYNC_PAGE_SIZE = 10000  # Socrata allows up to 50000 rows per request
+    
+    # Snapshot name -> dataset id, numeric columns and an optional row cap.
+    # Rows are mirrored unfiltered so a status change (e.g. a pantry closing)
+    # arrives through the incremental sync like any other update.
+    DATASETS = {
+        "food_pantries": {"id": "9cy3-7kc7", "floats": ("latitude", "longitude")},
+        "neighborhoods": {"id": "fn6f-htvy", "floats": ("shape_area", "shape_leng")},
+        "traffic": {"id": "7ym2-wayt", "floats": ("vol",),
+                    "max_rows": int(os.getenv("NYC_TRAFFIC_MAX_ROWS", "200000"))},
+    }
+    UPSERT_CHUNK_SIZE = 5000  # rows per execute; SQLAlchemy batches them into multi-row INSERTs
+    
+    # Defaults for recipients created from the dataset
+    PANTRY_DEFAULTS = {
+        "organization_type": "food_pantry",
+        "categories_needed": ["produce", "packaged", "prepared", "bakery"],
+        "storage_capacity_lbs": 1000.0,
+        "daily_time_windows": [{"start": "09:00", "end": "17:00"}],
+    }
+    # Columns owned by the dataset (and the neighborhood derived from its
+    # coordinates); refreshed on every sync. Everything else (capacity,
+    # categories, windows, email) may be edited locally and is kept.
+    SYNCED_COLUMNS = ("phone", "latitude", "longitude", "neighborhood_code")
+    
+    def __init__(self, snapshot: Optional[SnapshotStore] = None):
+        self.base_url = nyc_open_data_base()
+        self.snapshot = snapshot or get_nyc_snapshot()
+        self.sync_concurrency = int(os.getenv("NYC_SYNC_CONCURRENCY", "4"))
+    
+    @staticmethod
+    def _pantry_from_record(item: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": item.get("name", "Unknown"),
+            "address": item.get("address", ""),
+            "borough": item.get("borough", ""),
+            "latitude": float(item.get("latitude", 0)) if item.get("latitude") else None,
+            "longitude": float(item.get("longitude", 0)) if item.get("longitude") else None,
+            "phone": item.get("phone", ""),
+            "hours": item.get("hours", ""),
+            "type": "food_pantry"
+        }
     
     async def get_food_pantries(self, limit: int = 100) -> List[Dict[str, Any]]:
         """
         Fetch food pantries and emergency food locations from NYC DOHMH
         Dataset: Food Help NYC
         """
+        if self.snapshot.get("food_pantries") is not None:
+            return self.snapshot_food_pantries(limit)
         try:
-            url = f"{self.BASE_URL}/9cy3-7kc7.json"
+            url = f"{self.base_url}/{self.FOOD_PANTRY_DATASET}.json"
             params = {
                 "$limit": limit,
                 "$where": "status='Open'",  # Only open locations
@@ -32,21 +90,8 @@ class NYCDataService:
                 response = await client.get(url, params=params, timeout=10.0)
                 
                 if response.status_code == 200:
-                    data = response.json()
                     # Transform to our format
-                    pantries = []
-                    for item in data:
-                        pantries.append({
-                            "name": item.get("name", "Unknown"),
-                            "address": item.get("address", ""),
-                            "borough": item.get("borough", ""),
-                            "latitude": float(item.get("latitude", 0)) if item.get("latitude") else None,
-                            "longitude": float(item.get("longitude", 0)) if item.get("longitude") else None,
-                            "phone": item.get("phone", ""),
-                            "hours": item.get("hours", ""),
-                            "type": "food_pantry"
-                        })
-                    return pantries
+                    return [self._pantry_from_record(item) for item in response.json()]
                 else:
                     print(f"NYC Data API error: {response.status_code}")
                     return []
@@ -67,8 +112,14 @@ class NYCDataService:
         """
         Fetch neighborhood data from NYC Neighborhood Tabulation Areas
         """
+        table = self.snapshot.get("neighborhoods")
+        if table is not None:
+            names = table.values("ntaname") if "ntaname" in table.column_kinds else [None] * len(table)
+            needle = (neighborhood or "").lower()
+            matches = [i for i, name in enumerate(names) if not needle or (name and needle in name.lower())]
+            return table.records(matches[:100])
         try:
-            url = f"{self.BASE_URL}/fn6f-htvy.json"
+            url = f"{self.base_url}/fn6f-htvy.json"
             params = {"$limit": 100}
             
             if neighborhood:
@@ -88,11 +139,14 @@ class NYCDataService:
     async def get_traffic_data(self, location: str = None) -> Dict[str, Any]:
         """
         Fetch traffic volume data from NYC DOT
-        Can be used to estimate delays
+        Local ETAs use the speed profile built from it (see traffic_index.py)
         """
+        table = self.snapshot.get("traffic")
+        if table is not None:
+            return table.records(range(min(50, len(table))))
         try:
             # NYC DOT Traffic Volume Counts
-            url = f"{self.BASE_URL}/7ym2-wayt.json"
+            url = f"{self.base_url}/7ym2-wayt.json"
             params = {"$limit": 50}
             
             async with httpx.AsyncClient() as client:
@@ -106,39 +160,211 @@ class NYCDataService:
             print(f"Error fetching traffic data: {e}")
             return {}
     
-    async def populate_recipients_from_nyc_data(self, db) -> int:
+    # Snapshot sync
+    
+    def _dataset_url(self, dataset_id: str) -> str:
+        return f"{self.base_url}/{dataset_id}.json"
+    
+    async def _get_json(self, client: httpx.AsyncClient, url: str, params: Dict[str, Any]) -> Any:
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+    
+    async def _fetch_dataset(self, client: httpx.AsyncClient, config: Dict[str, Any],
+                             since: Optional[str]) -> List[Dict[str, Any]]:
         """
-        Populate recipients table with NYC food pantry data
-        Returns number of recipients added
+        All rows updated after `since` (everything when None). Counts the
+        matching rows first, then fetches the pages concurrently.
         """
-        from models import Recipient
+        url = self._dataset_url(config["id"])
+        where = f":updated_at > '{since}'" if since else None
+        count_params = {"$select": "count(*) AS count"}
+        if where:
+            count_params["$where"] = where
+        total = int((await self._get_json(client, url, count_params))[0]["count"])
+        if config.get("max_rows"):
+            total = min(total, config["max_rows"])
         
-        pantries = await self.get_food_pantries(limit=50)
-        added_count = 0
+        semaphore = asyncio.Semaphore(self.sync_concurrency)
         
+        async def fetch_page(offset: int) -> List[Dict[str, Any]]:
+            params = {
+                "$select": ":*, *",  # include :id and :updated_at
+                "$order": ":id",  # stable order so pages don't overlap
+                "$limit": min(self.SYNC_PAGE_SIZE, total - offset),
+                "$offset": offset,
+            }
+            if where:
+                params["$where"] = where
+            async with semaphore:
+                return await self._get_json(client, url, params)
+        
+        pages = await asyncio.gather(*(
+            fetch_page(offset) for offset in range(0, total, self.SYNC_PAGE_SIZE)
+        ))
+        return [row for page in pages for row in page]
+    
+    async def _sync_dataset(self, client: httpx.AsyncClient, name: str, full: bool) -> Dict[str, Any]:
+        config = self.DATASETS[name]
+        started = time.perf_counter()
+        current = self.snapshot.get(name)
+        since = None if full or current is None else current.high_water_mark
+        fetched = await self._fetch_dataset(client, config, since)
+        if fetched or current is None or since is None:
+            # Decoding, merging and encoding columns is CPU-bound
+            current = await asyncio.to_thread(self._write_snapshot, name, config, current, fetched, since)
+        if name == "traffic":
+            # Speed profile for local ETAs; rebuilt only when the snapshot changed
+            await asyncio.to_thread(get_traffic_index().refresh, current)
+        return {
+            "mode": "incremental" if since else "full",
+            "fetched": len(fetched),
+            "rows": len(current),
+            "high_water_mark": current.high_water_mark,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+    
+    def _write_snapshot(self, name: str, config: Dict[str, Any], current: Optional[SnapshotTable],
+                        fetched: List[Dict[str, Any]], since: Optional[str]) -> SnapshotTable:
+        if since is None:
+            rows = fetched
+        else:
+            # Merge changed rows into the previous snapshot by Socrata row id
+            merged = {row.get(":id"): row for row in current.records()}
+            for row in fetched:
+                merged[row.get(":id")] = row
+            rows = list(merged.values())
+        
+        stamps = [row[":updated_at"] for row in rows if row.get(":updated_at")]
+        table = SnapshotTable.from_records(
+            name, rows, config.get("floats", ()),
+            dataset_id=config["id"],
+            high_water_mark=max(stamps) if stamps else None,
+            synced_at=datetime.now().isoformat(),
+        )
+        return self.snapshot.save(table)
+    
+    async def sync(self, datasets: Optional[List[str]] = None, full: bool = False) -> Dict[str, Any]:
+        """
+        Refresh the local snapshot of each dataset (all by default), all
+        datasets in parallel over one HTTP client. Incremental unless
+        `full` or no snapshot exists yet; a full sync also drops rows that
+        were deleted upstream.
+        """
+        names = datasets or list(self.DATASETS)
+        unknown = [n for n in names if n not in self.DATASETS]
+        if unknown:
+            raise ValueError(f"Unknown datasets: {', '.join(unknown)}. Known: {', '.join(self.DATASETS)}")
+        limits = httpx.Limits(max_connections=self.sync_concurrency * len(names))
+        async with httpx.AsyncClient(timeout=60.0, limits=limits) as client:
+            results = await asyncio.gather(*(self._sync_dataset(client, n, full) for n in names))
+        return dict(zip(names, results))
+    
+    def snapshot_food_pantries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Open pantries from the snapshot, ordered by name"""
+        table = self.snapshot.get("food_pantries")
+        if table is None:
+            return []
+        order = table.cache.get("open_by_name")
+        if order is None:
+            statuses = table.values("status") if "status" in table.column_kinds else [None] * len(table)
+            names = table.values("name") if "name" in table.column_kinds else [""] * len(table)
+            order = sorted(
+                (i for i, status in enumerate(statuses) if status in (None, "Open")),
+                key=lambda i: names[i] or ""
+            )
+            table.cache["open_by_name"] = order
+        indices = order if limit is None else order[:limit]
+        return [self._pantry_from_record(item) for item in table.records(indices)]
+    
+    def _stage_recipients(self, pantries: List[Dict[str, Any]]) -> Dict[tuple, Dict[str, Any]]:
+        """
+        Recipient rows keyed by the (name, address) natural key. Duplicate
+        keys keep the last record, since one upsert statement can't touch
+        the same row twice. Pantries without coordinates are skipped. Rows
+        are tagged with their neighborhood in one bulk lookup.
+        """
+        staged = {}
         for pantry in pantries:
-            # Check if recipient already exists
-            existing = db.query(Recipient).filter(
-                Recipient.name == pantry["name"],
-                Recipient.address == pantry["address"]
-            ).first()
-            
-            if not existing and pantry.get("latitude") and pantry.get("longitude"):
-                recipient = Recipient(
-                    name=pantry["name"],
-                    email=f"contact@{pantry['name'].lower().replace(' ', '')}.org",
-                    phone=pantry.get("phone", ""),
-                    address=pantry["address"],
-                    latitude=pantry["latitude"],
-                    longitude=pantry["longitude"],
-                    organization_type="food_pantry",
-                    categories_needed=["produce", "packaged", "prepared", "bakery"],
-                    storage_capacity_lbs=1000.0,  # Default capacity
-                    daily_time_windows=[{"start": "09:00", "end": "17:00"}]
-                )
-                db.add(recipient)
-                added_count += 1
+            name = (pantry.get("name") or "").strip()
+            address = (pantry.get("address") or "").strip()
+            if not name or not address or pantry.get("latitude") is None or pantry.get("longitude") is None:
+                continue
+            staged[(name, address)] = {
+                "name": name,
+                "address": address,
+                "phone": pantry.get("phone") or "",
+                "latitude": pantry["latitude"],
+                "longitude": pantry["longitude"],
+                "neighborhood_code": None,
+                **self.PANTRY_DEFAULTS,
+            }
+        index = get_neighborhood_index(self.snapshot)
+        if index is not None and staged:
+            rows = list(staged.values())
+            codes = index.assign([r["latitude"] for r in rows], [r["longitude"] for r in rows])
+            for row, code in zip(rows, codes):
+                row["neighborhood_code"] = code
+        return staged
+    
+    @classmethod
+    def _upsert_statement(cls, dialect_name: str):
+        """INSERT ... ON CONFLICT (name, address) DO UPDATE, only where a synced column changed"""
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect_name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise ValueError(f"Bulk recipient sync is not supported on {dialect_name}")
         
-        db.commit()
-        return added_count
+        statement = insert(Recipient)
+        excluded = statement.excluded
+        return statement.on_conflict_do_update(
+            index_elements=[Recipient.name, Recipient.address],
+            set_={column: excluded[column] for column in cls.SYNCED_COLUMNS},
+            where=or_(*(
+                getattr(Recipient, column).is_distinct_from(excluded[column])
+                for column in cls.SYNCED_COLUMNS
+            ))
+        ).returning(Recipient.id)
+    
+    async def upsert_recipients(self, db, pantries: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Upsert pantries into recipients. The statement is compiled once and
+        executed with a parameter list, which SQLAlchemy sends as multi-row
+        INSERT ... ON CONFLICT batches ("insertmanyvalues").
+        Returns fetched/staged/skipped/inserted/updated/unchanged counts.
+        """
+        staged = list(self._stage_recipients(pantries).values())
+        statement = self._upsert_statement(db.bind.dialect.name)
+        count_recipients = select(func.count(Recipient.id))
+        
+        before = await db.scalar(count_recipients)
+        affected = 0
+        for i in range(0, len(staged), self.UPSERT_CHUNK_SIZE):
+            result = await db.execute(statement, staged[i:i + self.UPSERT_CHUNK_SIZE])
+            affected += len(result.all())
+        after = await db.scalar(count_recipients)
+        await db.commit()
+        
+        # RETURNING yields inserted and changed rows; the row count delta
+        # tells the two apart
+        inserted = after - before
+        return {
+            "fetched": len(pantries),
+            "staged": len(staged),
+            "skipped": len(pantries) - len(staged),
+            "inserted": inserted,
+            "updated": affected - inserted,
+            "unchanged": len(staged) - affected,
+        }
+    
+    async def populate_recipients_from_nyc_data(self, db) -> Dict[str, int]:
+        """
+        Sync the recipients table with the full Food Help NYC dataset:
+        refresh the pantry snapshot incrementally, then upsert every open
+        pantry from it. Returns the counts from `upsert_recipients`.
+        """
+        await self.sync(["food_pantries"])
+        return await self.upsert_recipients(db, self.snapshot_food_pantries())
 
@@ -0,0 +1,224 @@
+"""
+Local columnar snapshot of NYC Open Data datasets.
+
+Each dataset lives in its own directory:
+
+    <NYC_SNAPSHOT_DIR>/<dataset>/manifest.json
+    <NYC_SNAPSHOT_DIR>/<dataset>/v<version>/<column>.npy
+
+Float columns are stored as float64 arrays (NaN = missing). Text and JSON
+columns are stored as one UTF-8 blob (`<column>.data.npy`) plus row offsets
+(`<column>.offsets.npy`), so long values such as NTA geometries don't pad
+every row. All arrays are memory-mapped on load.
+
+A save writes a new version directory, then atomically replaces the
+manifest, so a reader never sees a partially written snapshot.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def snapshot_dir() -> str:
+    return os.getenv("NYC_SNAPSHOT_DIR", os.path.join(BACKEND_DIR, "data", "nyc_snapshot"))
+
+
+class SnapshotTable:
+    """One dataset: column arrays plus its manifest"""
+
+    def __init__(self, name: str, manifest: Dict[str, Any], columns: Dict[str, Any]):
+        self.name = name
+        self.manifest = manifest
+        self._columns = columns
+        self._decoded: Dict[str, List[Any]] = {}
+        self.cache: Dict[str, Any] = {}  # derived views, valid for this version only
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    @property
+    def column_kinds(self) -> Dict[str, str]:
+        return self.manifest["columns"]
+
+    @property
+    def high_water_mark(self) -> Optional[str]:
+        return self.manifest.get("high_water_mark")
+
+    @property
+    def synced_at(self) -> Optional[str]:
+        return self.manifest.get("synced_at")
+
+    def floats(self, column: str) -> np.ndarray:
+        return self._columns[column]
+
+    def values(self, column: str) -> List[Any]:
+        """Decoded values of a text/json column (None for missing); cached"""
+        if column not in self._decoded:
+            kind = self.column_kinds[column]
+            if kind == "float":
+                array = self._columns[column]
+                self._decoded[column] = [None if np.isnan(v) else float(v) for v in array]
+            else:
+                data, offsets = self._columns[column]
+                blob = bytes(data)
+                decoded = []
+                for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+                    if end == start:
+                        decoded.append(None)
+                        continue
+                    text = blob[start:end].decode("utf-8")
+                    decoded.append(json.loads(text) if kind == "json" else text)
+                self._decoded[column] = decoded
+        return self._decoded[column]
+
+    def records(self, indices: Optional[Iterable[int]] = None,
+                columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Rows as dicts shaped like the Socrata JSON (missing fields omitted)"""
+        columns = list(columns or self.column_kinds)
+        decoded = [(column, self.values(column)) for column in columns]
+        rows = range(len(self)) if indices is None else indices
+        return [
+            {column: values[i] for column, values in decoded if values[i] is not None}
+            for i in rows
+        ]
+
+    @classmethod
+    def from_records(cls, name: str, records: List[Dict[str, Any]],
+                     float_columns: Sequence[str] = (), **manifest) -> "SnapshotTable":
+        names: Dict[str, None] = {}
+        for record in records:
+            for column in record:
+                names.setdefault(column, None)
+        columns: Dict[str, Any] = {}
+        kinds: Dict[str, str] = {}
+        for column in names:
+            raw = [record.get(column) for record in records]
+            if column in float_columns:
+                kinds[column] = "float"
+                columns[column] = np.array(
+                    [float(v) if v not in (None, "") else np.nan for v in raw], dtype=np.float64
+                )
+                continue
+            kind = "json" if any(isinstance(v, (dict, list)) for v in raw) else "text"
+            encoded = [
+                b"" if v is None else (json.dumps(v) if kind == "json" else str(v)).encode("utf-8")
+                for v in raw
+            ]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(e) for e in encoded], out=offsets[1:])
+            kinds[column] = kind
+            columns[column] = (np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+        return cls(name, {"rows": len(records), "columns": kinds, **manifest}, columns)
+
+
+class SnapshotStore:
+    """All dataset snapshots under one directory"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or snapshot_dir()
+        self._tables: Dict[str, SnapshotTable] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[SnapshotTable]:
+        return self._tables.get(name)
+
+    def load(self) -> Dict[str, int]:
+        """Memory-map every dataset found on disk; returns rows per dataset"""
+        if not os.path.isdir(self.directory):
+            return {}
+        loaded = {}
+        for name in sorted(os.listdir(self.directory)):
+            table = self._load_table(name)
+            if table is not None:
+                self._tables[name] = table
+                loaded[name] = len(table)
+        return loaded
+
+    def _load_table(self, name: str) -> Optional[SnapshotTable]:
+        manifest_path = os.path.join(self.directory, name, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        version_dir = os.path.join(self.directory, name, f"v{manifest['version']}")
+        columns: Dict[str, Any] = {}
+        for column, kind in manifest["columns"].items():
+            path = os.path.join(version_dir, _file_name(column))
+            if kind == "float":
+                columns[column] = np.load(f"{path}.npy", mmap_mode="r")
+            else:
+                columns[column] = (
+                    np.load(f"{path}.data.npy", mmap_mode="r"),
+                    np.load(f"{path}.offsets.npy", mmap_mode="r"),
+                )
+        return SnapshotTable(name, manifest, columns)
+
+    def save(self, table: SnapshotTable) -> SnapshotTable:
+        """Persist `table` as the dataset's next version and serve it from now on"""
+        with self._lock:
+            dataset_dir = os.path.join(self.directory, table.name)
+            os.makedirs(dataset_dir, exist_ok=True)
+            current = self.get(table.name)
+            version = (current.manifest["version"] + 1) if current else int(time.time())
+            version_dir = os.path.join(dataset_dir, f"v{version}")
+            os.makedirs(version_dir, exist_ok=True)
+            for column, kind in table.column_kinds.items():
+                path = os.path.join(version_dir, _file_name(column))
+                if kind == "float":
+                    np.save(f"{path}.npy", np.asarray(table.floats(column)))
+                else:
+                    data, offsets = table._columns[column]
+                    np.save(f"{path}.data.npy", np.asarray(data))
+                    np.save(f"{path}.offsets.npy", np.asarray(offsets))
+
+            manifest = {**table.manifest, "version": version}
+            tmp_path = os.path.join(dataset_dir, "manifest.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, os.path.join(dataset_dir, "manifest.json"))
+
+            # Older versions are no longer referenced by the manifest
+            for entry in os.listdir(dataset_dir):
+                if entry.startswith("v") and entry != f"v{version}":
+                    shutil.rmtree(os.path.join(dataset_dir, entry), ignore_errors=True)
+
+            loaded = self._load_table(table.name)
+            self._tables[table.name] = loaded
+            return loaded
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "rows": len(table),
+                "version": table.manifest.get("version"),
+                "synced_at": table.synced_at,
+                "high_water_mark": table.high_water_mark,
+                "columns": table.column_kinds,
+            }
+            for name, table in self._tables.items()
+        }
+
+
+def _file_name(column: str) -> str:
+    # Socrata system fields start with ':'
+    return column.replace(":", "_sys_").replace(os.sep, "_")
+
+
+_store: Optional[SnapshotStore] = None
+_store_lock = threading.Lock()
+
+
+def get_nyc_snapshot() -> SnapshotStore:
+    """Process-wide snapshot store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SnapshotStore()
+    return _store
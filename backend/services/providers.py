@@ -0,0 +1,75 @@
+"""
+External provider endpoints (Gemini, Nominatim, OpenRouteService, NYC Open Data).
+
+Every base URL can be overridden through environment variables so the backend
+can be pointed at the local stand-in server in `benchmarks/provider_stub.py`
+for offline load testing:
+
+    GEMINI_API_BASE=http://127.0.0.1:8100
+    NOMINATIM_DOMAIN=127.0.0.1:8100
+    NOMINATIM_SCHEME=http
+    ORS_API_BASE=http://127.0.0.1:8100
+    NYC_OPEN_DATA_BASE=http://127.0.0.1:8100/resource
+"""
+import os
+from typing import Optional
+import httpx
+from geopy.geocoders import Nominatim
+from dotenv import load_dotenv
+
+load_dotenv()
+
+USER_AGENT = "food_rescue_route_ai"
+
+
+def nominatim_domain() -> str:
+    return os.getenv("NOMINATIM_DOMAIN", "nominatim.openstreetmap.org")
+
+
+def ors_api_base() -> str:
+    return os.getenv("ORS_API_BASE", "https://api.openrouteservice.org").rstrip("/")
+
+
+def nyc_open_data_base() -> str:
+    return os.getenv("NYC_OPEN_DATA_BASE", "https://data.cityofnewyork.us/resource").rstrip("/")
+
+
+def gemini_api_base() -> Optional[str]:
+    """REST base URL for Gemini; None means use the google-generativeai SDK"""
+    base = os.getenv("GEMINI_API_BASE")
+    return base.rstrip("/") if base else None
+
+
+def make_geocoder() -> Nominatim:
+    """Nominatim geocoder honouring NOMINATIM_DOMAIN / NOMINATIM_SCHEME"""
+    return Nominatim(
+        user_agent=USER_AGENT,
+        domain=nominatim_domain(),
+        scheme=os.getenv("NOMINATIM_SCHEME", "https"),
+    )
+
+
+class GeminiRestResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class GeminiRestModel:
+    """
+    Minimal `generateContent` client over plain HTTP. Exposes the same
+    `generate_content(prompt).text` surface the agent uses from the SDK.
+    """
+
+    def __init__(self, base_url: str, api_key: str, model_name: str, timeout: float = 30.0):
+        self.url = f"{base_url}/v1beta/models/{model_name}:generateContent"
+        self.client = httpx.Client(headers={"x-goog-api-key": api_key}, timeout=timeout)
+
+    def generate_content(self, prompt: str) -> GeminiRestResponse:
+        response = self.client.post(
+            self.url,
+            json={"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        )
+        response.raise_for_status()
+        data = response.json()
+        parts = data["candidates"][0]["content"]["parts"]
+        return GeminiRestResponse("".join(part.get("text", "") for part in parts))
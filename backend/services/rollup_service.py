@@ -0,0 +1,232 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, insert, select
+from typing import Dict, List, Any, Optional
+from datetime import datetime, timedelta
+import math
+from models import ArchivedDonation, Donation, ImpactRollup, DonationStatus
+from services.impact_service import ImpactService
+
+
+class RollupService:
+    """
+    Time-series impact rollups. Hourly and daily buckets of pounds, meals,
+    CO₂e and donation counts are kept per food category, donor and area, so
+    trend queries read pre-aggregated rows instead of scanning donations.
+    The area is the donation's neighborhood (NTA code), or the borough
+    parsed from the address while it is untagged.
+    """
+
+    STORED_RESOLUTIONS = ("hour", "day")
+    QUERY_RESOLUTIONS = ("hour", "day", "week", "month")
+    GROUP_COLUMNS = {
+        "category": ImpactRollup.food_category,
+        "donor": ImpactRollup.donor_id,
+        "area": ImpactRollup.area,
+    }
+
+    BOROUGHS = [
+        ("staten island", "staten_island"),
+        ("brooklyn", "brooklyn"),
+        ("bronx", "bronx"),
+        ("queens", "queens"),
+        ("manhattan", "manhattan"),
+        ("new york, ny", "manhattan"),
+    ]
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @classmethod
+    def area_for(cls, donation: Donation) -> str:
+        """Neighborhood of the donation, else the borough parsed from its address"""
+        if donation.neighborhood_code:
+            return donation.neighborhood_code
+        address = (donation.address or "").lower()
+        for token, area in cls.BOROUGHS:
+            if token in address:
+                return area
+        return "unknown"
+
+    @staticmethod
+    def bucket_start(moment: datetime, resolution: str) -> datetime:
+        moment = moment.replace(tzinfo=None, minute=0, second=0, microsecond=0)
+        if resolution == "hour":
+            return moment
+        day = moment.replace(hour=0)
+        if resolution == "day":
+            return day
+        if resolution == "week":
+            return day - timedelta(days=day.weekday())
+        if resolution == "month":
+            return day.replace(day=1)
+        raise ValueError(f"Unknown resolution: {resolution}")
+
+    def _upsert_statement(self):
+        """INSERT ... ON CONFLICT (bucket) DO UPDATE adding the amounts, so first writers can't collide"""
+        dialect_name = self.db.bind.dialect.name
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        elif dialect_name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            raise ValueError(f"Impact rollups are not supported on {dialect_name}")
+
+        statement = upsert(ImpactRollup)
+        excluded = statement.excluded
+        return statement.on_conflict_do_update(
+            index_elements=[
+                ImpactRollup.resolution, ImpactRollup.bucket_start, ImpactRollup.food_category,
+                ImpactRollup.donor_id, ImpactRollup.area,
+            ],
+            set_={
+                column: getattr(ImpactRollup, column) + excluded[column]
+                for column in ("lbs_rescued", "meals", "co2e_avoided", "donation_count")
+            },
+        )
+
+    async def _bump(self, resolution: str, bucket: datetime, category: str, donor_id: int,
+                    area: str, lbs: float, count: int) -> None:
+        await self.db.execute(self._upsert_statement().values(
+            resolution=resolution, bucket_start=bucket, food_category=category, donor_id=donor_id,
+            area=area, lbs_rescued=lbs, meals=lbs / ImpactService.POUNDS_PER_MEAL,
+            co2e_avoided=lbs * ImpactService.CO2E_PER_POUND, donation_count=count,
+        ))
+
+    async def record_completion(self, donation: Donation) -> None:
+        """
+        Add a completed donation to its hourly and daily buckets. Call in the
+        same transaction that marks the donation completed.
+        """
+        completed_at = donation.completed_at or datetime.now()
+        category = donation.food_category.value if donation.food_category else "packaged"
+        area = self.area_for(donation)
+        for resolution in self.STORED_RESOLUTIONS:
+            await self._bump(
+                resolution, self.bucket_start(completed_at, resolution), category,
+                donation.donor_id, area, donation.quantity_lbs or 0.0, 1
+            )
+
+    async def rebuild(self) -> int:
+        """Recreate all buckets from completed donations, hot and archived; returns donations rolled up"""
+        await self.db.execute(delete(ImpactRollup))
+        buckets: Dict[tuple, List[float]] = {}
+        count = 0
+        for model in (Donation, ArchivedDonation):
+            completed = await self.db.stream_scalars(
+                select(model)
+                .where(model.status == DonationStatus.COMPLETED)
+                .execution_options(yield_per=1000)
+            )
+            async for donation in completed:
+                count += 1
+                completed_at = donation.completed_at or donation.posted_at or datetime.now()
+                category = donation.food_category.value if donation.food_category else "packaged"
+                area = self.area_for(donation)
+                for resolution in self.STORED_RESOLUTIONS:
+                    key = (resolution, self.bucket_start(completed_at, resolution), category, donation.donor_id, area)
+                    totals = buckets.setdefault(key, [0.0, 0])
+                    totals[0] += donation.quantity_lbs or 0.0
+                    totals[1] += 1
+        rows = [
+            {
+                "resolution": resolution, "bucket_start": bucket, "food_category": category,
+                "donor_id": donor_id, "area": area, "lbs_rescued": lbs,
+                "meals": lbs / ImpactService.POUNDS_PER_MEAL,
+                "co2e_avoided": lbs * ImpactService.CO2E_PER_POUND,
+                "donation_count": n,
+            }
+            for (resolution, bucket, category, donor_id, area), (lbs, n) in buckets.items()
+        ]
+        if rows:
+            await self.db.execute(insert(ImpactRollup), rows)
+        await self.db.commit()
+        return count
+
+    async def is_empty(self) -> bool:
+        return (await self.db.execute(select(ImpactRollup.id).limit(1))).first() is None
+
+    async def query(
+        self,
+        start: datetime,
+        end: datetime,
+        resolution: str = "day",
+        group_by: Optional[str] = None,
+        max_points: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Time series between `start` (inclusive) and `end` (exclusive).
+
+        Hour queries read hourly buckets; day/week/month read daily buckets
+        and fold them. If a series has more than `max_points` buckets,
+        consecutive buckets are merged so the response stays small.
+        """
+        if resolution not in self.QUERY_RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {', '.join(self.QUERY_RESOLUTIONS)}")
+        if group_by and group_by not in self.GROUP_COLUMNS:
+            raise ValueError(f"group_by must be one of {', '.join(self.GROUP_COLUMNS)}")
+
+        source = "hour" if resolution == "hour" else "day"
+        group_column = self.GROUP_COLUMNS[group_by] if group_by else None
+        columns = [
+            ImpactRollup.bucket_start,
+            func.sum(ImpactRollup.lbs_rescued),
+            func.sum(ImpactRollup.meals),
+            func.sum(ImpactRollup.co2e_avoided),
+            func.sum(ImpactRollup.donation_count),
+        ]
+        group_columns = [ImpactRollup.bucket_start]
+        if group_column is not None:
+            columns.append(group_column)
+            group_columns.append(group_column)
+        rows = (await self.db.execute(
+            select(*columns)
+            .where(
+                ImpactRollup.resolution == source,
+                ImpactRollup.bucket_start >= start,
+                ImpactRollup.bucket_start < end
+            )
+            .group_by(*group_columns)
+            .order_by(ImpactRollup.bucket_start)
+        )).all()
+
+        series: Dict[str, Dict[datetime, List[float]]] = {}
+        for row in rows:
+            group = str(row[5]) if group_column is not None else "all"
+            bucket = self.bucket_start(row[0], resolution)
+            totals = series.setdefault(group, {}).setdefault(bucket, [0.0, 0.0, 0.0, 0])
+            for i in range(4):
+                totals[i] += row[i + 1] or 0
+
+        result = {}
+        for group, buckets in series.items():
+            points = sorted(buckets.items())
+            if max_points and len(points) > max_points:
+                points = self._downsample(points, max_points)
+            result[group] = [
+                {
+                    "bucket_start": bucket.isoformat(),
+                    "lbs_rescued": round(totals[0], 2),
+                    "meals": round(totals[1], 2),
+                    "co2e_avoided": round(totals[2], 2),
+                    "donation_count": int(totals[3]),
+                }
+                for bucket, totals in points
+            ]
+        return {
+            "resolution": resolution,
+            "group_by": group_by,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "series": result,
+        }
+
+    @staticmethod
+    def _downsample(points: List[tuple], max_points: int) -> List[tuple]:
+        """Merge runs of consecutive buckets, labelled by the first bucket of each run"""
+        stride = math.ceil(len(points) / max_points)
+        merged = []
+        for i in range(0, len(points), stride):
+            chunk = points[i:i + stride]
+            totals = [sum(p[1][j] for p in chunk) for j in range(4)]
+            merged.append((chunk[0][0], totals))
+        return merged
@@ -1,18 +1,27 @@
+import asyncio
 import os
 import httpx
-from typing import Dict, List, Any, Optional, Tuple
-from geopy.geocoders import Nominatim
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 from geopy.distance import geodesic
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from services.providers import make_geocoder, ors_api_base
+from services.traffic_index import NYC_TZ, get_traffic_index, hour_of_week
 
 load_dotenv()
 
 
 class RoutingService:
+    AVERAGE_SPEED_MPH = 25.0  # all-week average in NYC; scaled by the traffic speed index
+    EARTH_RADIUS_MILES = 3958.8
+    
     def __init__(self):
         self.google_maps_api_key = os.getenv("GOOGLE_MAPS_API_KEY")
         self.ors_api_key = os.getenv("ORS_API_KEY")
-        self.geocoder = Nominatim(user_agent="food_rescue_route_ai")
+        self.geocoder = make_geocoder()
+        self.traffic_index = get_traffic_index()
     
     def _geocode_address(self, address: str) -> Optional[Tuple[float, float]]:
         """Geocode an address to lat/lng coordinates"""
@@ -24,16 +33,22 @@ class RoutingService:
             print(f"Geocoding error for {address}: {e}")
         return None
     
+    async def geocode(self, address: str) -> Optional[Tuple[float, float]]:
+        """Geocode without blocking the event loop"""
+        return await run_in_threadpool(self._geocode_address, address)
+    
     async def optimize_route(
         self,
         start_address: str,
         end_address: str,
-        driver_address: str = None
+        driver_address: str = None,
+        depart_at: Optional[datetime] = None
     ) -> Dict[str, Any]:
         """
         Optimize route from start to end, optionally starting from driver location.
         Returns route with duration, distance, and turn-by-turn instructions.
         Uses OpenRouteService as primary (open source), falls back to Google Maps.
+        `depart_at` (default now) sets the traffic hour for the local estimate.
         """
         # Try OpenRouteService first (open source, free tier)
         if self.ors_api_key:
@@ -48,7 +63,7 @@ class RoutingService:
                 return result
         
         # Final fallback: estimated route
-        return self._route_estimate(start_address, end_address)
+        return await run_in_threadpool(self._route_estimate, start_address, end_address, depart_at)
     
     async def _route_with_ors(
         self,
@@ -59,15 +74,15 @@ class RoutingService:
         """Route using OpenRouteService API (open source)"""
         try:
             # Geocode addresses
-            start_coords = self._geocode_address(start_address)
-            end_coords = self._geocode_address(end_address)
+            start_coords = await self.geocode(start_address)
+            end_coords = await self.geocode(end_address)
             
             if not start_coords or not end_coords:
                 print("Failed to geocode addresses for ORS")
                 return None
             
             # OpenRouteService Directions API
-            url = "https://api.openrouteservice.org/v2/directions/driving-car"
+            url = f"{ors_api_base()}/v2/directions/driving-car"
             
             headers = {
                 "Authorization": self.ors_api_key,
@@ -197,10 +212,47 @@ class RoutingService:
             print(f"Google Maps routing error: {e}")
             return None
     
+    def _minutes_per_mile(self, starts: np.ndarray, ends: np.ndarray, hour: int) -> np.ndarray:
+        """
+        Driving pace for each start/end pair at the given hour of the week.
+        The speed factor is sampled at the start, midpoint and end of the
+        straight line; averaging 1/factor weights the three thirds by time.
+        """
+        samples = np.stack([starts, (starts + ends) / 2, ends])
+        factors = self.traffic_index.speed_factors(samples[..., 0], samples[..., 1], hour)
+        return (1.0 / factors).mean(axis=0) * 60 / self.AVERAGE_SPEED_MPH
+    
+    def estimate_duration_matrix(
+        self,
+        origins: Sequence[Tuple[float, float]],
+        destinations: Sequence[Tuple[float, float]],
+        depart_at: Optional[datetime] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Local (offline) distance and duration between every origin and
+        destination, as (len(origins), len(destinations)) arrays of miles and
+        minutes. Straight-line distance at the traffic-adjusted speed for
+        the departure hour, computed in one vectorized pass.
+        """
+        origins = np.radians(np.asarray(origins, dtype=np.float64).reshape(-1, 2))
+        destinations = np.radians(np.asarray(destinations, dtype=np.float64).reshape(-1, 2))
+        lat1, lng1 = origins[:, 0:1], origins[:, 1:2]
+        lat2, lng2 = destinations[:, 0], destinations[:, 1]
+        # Haversine
+        h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+        distance_miles = 2 * self.EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+        
+        shape = distance_miles.shape
+        starts = np.broadcast_to(np.degrees(origins)[:, np.newaxis, :], shape + (2,)).reshape(-1, 2)
+        ends = np.broadcast_to(np.degrees(destinations)[np.newaxis, :, :], shape + (2,)).reshape(-1, 2)
+        pace = self._minutes_per_mile(starts, ends, hour_of_week(depart_at)).reshape(shape)
+        return {"distance_miles": distance_miles, "duration_minutes": distance_miles * pace}
+    
     def _route_estimate(
         self,
         start_address: str,
-        end_address: str
+        end_address: str,
+        depart_at: Optional[datetime] = None
     ) -> Dict[str, Any]:
         """Fallback: return estimated route using geodesic distance"""
         try:
@@ -211,8 +263,12 @@ class RoutingService:
             if start_coords and end_coords:
                 # Calculate straight-line distance
                 distance_miles = geodesic(start_coords, end_coords).miles
-                # Estimate driving time (assume 25 mph average in NYC)
-                duration_minutes = (distance_miles / 25) * 60
+                # Estimate driving time from the average NYC speed, adjusted
+                # for traffic at the departure hour
+                pace = self._minutes_per_mile(
+                    np.array([start_coords]), np.array([end_coords]), hour_of_week(depart_at)
+                )[0]
+                duration_minutes = distance_miles * pace
             else:
                 # Default estimate
                 distance_miles = 2.5
@@ -256,28 +312,51 @@ class RoutingService:
     async def optimize_multi_stop_route(
         self,
         stops: List[Dict[str, str]],
-        start_address: str
+        start_address: str,
+        depart_at: Optional[datetime] = None
     ) -> Dict[str, Any]:
         """
         Optimize route with multiple stops (Vehicle Routing Problem).
-        For MVP, uses simple nearest-neighbor heuristic.
+        For MVP, uses simple nearest-neighbor heuristic: the next stop is the
+        one closest in traffic-adjusted time (estimate_duration_matrix) at the
+        running arrival time. Each leg departs when the previous one arrives
+        (`depart_at`, default now, for the first), so later legs get the
+        traffic of their own hour. Stops that can't be geocoded follow the
+        others in their given order.
         """
         total_duration = 0.0
         total_distance = 0.0
         all_instructions = []
         
-        current_address = start_address
+        leg_departure = depart_at or datetime.now(NYC_TZ)
+        start_coords, *stop_coords = await asyncio.gather(
+            self.geocode(start_address), *(self.geocode(stop["address"]) for stop in stops)
+        )
+        remaining = [i for i, coords in enumerate(stop_coords) if coords]
+        unlocated = [i for i, coords in enumerate(stop_coords) if not coords]
         
-        for stop in stops:
-            route = await self.optimize_route(current_address, stop["address"])
+        current_address, current_coords = start_address, start_coords
+        ordered = []
+        while remaining or unlocated:
+            if remaining and current_coords:
+                durations = self.estimate_duration_matrix(
+                    [current_coords], [stop_coords[i] for i in remaining], leg_departure
+                )["duration_minutes"][0]
+                index = remaining.pop(int(np.argmin(durations)))
+            else:
+                index = (remaining or unlocated).pop(0)
+            stop = stops[index]
+            route = await self.optimize_route(current_address, stop["address"], depart_at=leg_departure)
             total_duration += route["duration_minutes"]
             total_distance += route["distance_miles"]
             all_instructions.extend(route["instructions"])
-            current_address = stop["address"]
+            leg_departure += timedelta(minutes=route["duration_minutes"])
+            current_address, current_coords = stop["address"], stop_coords[index]
+            ordered.append(stop)
         
         return {
             "duration_minutes": total_duration,
             "distance_miles": total_distance,
             "instructions": all_instructions,
-            "stops": stops
+            "stops": ordered
         }
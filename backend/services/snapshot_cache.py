@@ -0,0 +1,85 @@
+"""
+Shared cache for expensive read payloads.
+
+An entry is served while the change version it was built at is still
+current and it is younger than the TTL (which bounds anything that drifts
+without a write, like match scores against a moving clock). Concurrent
+misses for the same key wait for one build instead of each running it,
+so a burst of dashboard viewers costs one set of queries. Builds are only
+shared between callers reading from the same source (primary or replica),
+so a request pinned to the primary never gets a lagging replica's result.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+@dataclass
+class _Entry:
+    version: int
+    expires_at: float
+    value: Any
+
+
+class SnapshotCache:
+    def __init__(self, ttl_seconds: float, max_entries: int = 64):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._building: Dict[Tuple[Hashable, int, Hashable], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    async def get(
+        self, key: Hashable, version: int, build: Callable[[], Awaitable[Any]], store: bool = True,
+        source: Hashable = None
+    ) -> Tuple[Any, bool]:
+        """
+        (value, served from cache). `build` runs on a miss; with
+        `store=False` its result is shared with concurrent waiters but not
+        kept (e.g. read from a replica that may be behind `version`).
+        `source` names where `build` reads from; only concurrent callers
+        with the same source share a build.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version and entry.expires_at > time.monotonic():
+            self.hits += 1
+            return entry.value, True
+        building = self._building.get((key, version, source))
+        if building is not None:
+            self.shared += 1
+            # Shielded so one waiter's cancelled request can't cancel everyone's build
+            return await asyncio.shield(building), True
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._building[(key, version, source)] = future
+        try:
+            value = await build()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here; waiters (if any) still get it
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._building[(key, version, source)]
+        future.set_result(value)
+        if self.ttl_seconds > 0 and store:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]  # oldest
+            self._entries[key] = _Entry(version, time.monotonic() + self.ttl_seconds, value)
+        return value, False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_builds": self.shared,
+        }
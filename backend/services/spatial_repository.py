@@ -0,0 +1,135 @@
+"""
+Proximity queries on recipients and donations, filtered in SQL.
+
+Migration 0006 adds a spatial index where the database supports one:
+
+- SQLite: `<table>_rtree` R*Tree virtual tables kept in sync by triggers
+- PostgreSQL + PostGIS: a generated `geog` geography column with a GiST index
+
+Both make a bounding-box or radius lookup an index search (logarithmic in
+the table size) instead of a scan. Without either, the same filters run as
+plain latitude/longitude range predicates, so callers never load the whole
+table into Python.
+"""
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import column, func, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+EARTH_RADIUS_MILES = 3958.8
+METERS_PER_MILE = 1609.344
+
+# Detected backend per database URL: "rtree", "postgis" or "bbox"
+_backends: Dict[str, str] = {}
+
+
+def bounding_box(lat: float, lng: float, radius_miles: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lng, max_lng) enclosing a circle of `radius_miles`"""
+    dlat = math.degrees(radius_miles / EARTH_RADIUS_MILES)
+    dlng = math.degrees(radius_miles / (EARTH_RADIUS_MILES * max(math.cos(math.radians(lat)), 1e-6)))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+def haversine_miles(lat: float, lng: float, lats: Sequence[float], lngs: Sequence[float]) -> np.ndarray:
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lng2 = np.radians(np.asarray(lngs, dtype=np.float64))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def _rtree(model):
+    return table(
+        f"{model.__tablename__}_rtree",
+        column("id"), column("min_lat"), column("max_lat"), column("min_lng"), column("max_lng"),
+    )
+
+
+class SpatialRepository:
+    """Bounding-box and radius lookups pushed into SQL"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def backend(self) -> str:
+        """Spatial index available in this database (detected once per URL)"""
+        bind = self.db.bind
+        key = str(bind.url)
+        if key not in _backends:
+            dialect = bind.dialect.name
+            backend = "bbox"
+            if dialect == "sqlite":
+                found = await self.db.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipients_rtree'"
+                ))
+                backend = "rtree" if found.first() else "bbox"
+            elif dialect == "postgresql":
+                found = await self.db.execute(text(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'recipients' AND column_name = 'geog'"
+                ))
+                backend = "postgis" if found.first() else "bbox"
+            _backends[key] = backend
+        return _backends[key]
+
+    def _in_box(self, backend: str, model, box: Tuple[float, float, float, float]):
+        """SELECT of `model` rows inside the box, using the spatial index when there is one"""
+        min_lat, max_lat, min_lng, max_lng = box
+        query = select(model)
+        if backend == "rtree":
+            # R*Tree bounds are float32, rounded outwards: search by overlap,
+            # then apply the exact box to the few candidates. A subquery (not a
+            # join) keeps the planner from scanning the table and probing the
+            # R*Tree by id.
+            rtree = _rtree(model)
+            query = query.where(model.id.in_(select(rtree.c.id).where(
+                rtree.c.max_lat >= min_lat, rtree.c.min_lat <= max_lat,
+                rtree.c.max_lng >= min_lng, rtree.c.min_lng <= max_lng,
+            )))
+        elif backend == "postgis":
+            envelope = func.geography(func.ST_MakeEnvelope(min_lng, min_lat, max_lng, max_lat, 4326))
+            query = query.where(column("geog").op("&&")(envelope))
+        return query.where(
+            model.latitude.between(min_lat, max_lat),
+            model.longitude.between(min_lng, max_lng),
+        )
+
+    async def in_bbox(self, model, min_lat: float, max_lat: float, min_lng: float, max_lng: float,
+                      *criteria, limit: Optional[int] = None) -> List[Any]:
+        """Rows of `model` inside the box, with any extra WHERE `criteria`"""
+        query = self._in_box(await self.backend(), model, (min_lat, max_lat, min_lng, max_lng))
+        query = query.where(*criteria).order_by(model.id)
+        if limit:
+            query = query.limit(limit)
+        return list((await self.db.execute(query)).scalars().all())
+
+    async def within_radius(self, model, lat: float, lng: float, radius_miles: float,
+                            *criteria, limit: Optional[int] = None) -> List[Tuple[Any, float]]:
+        """(row, distance in miles) for rows within `radius_miles`, nearest first"""
+        backend = await self.backend()
+        if backend == "postgis":
+            point = func.geography(func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326))
+            distance = (func.ST_Distance(column("geog"), point) / METERS_PER_MILE).label("distance_miles")
+            query = (
+                select(model, distance)
+                .where(func.ST_DWithin(column("geog"), point, radius_miles * METERS_PER_MILE), *criteria)
+                .order_by(distance)
+            )
+            if limit:
+                query = query.limit(limit)
+            return [(row[0], float(row[1])) for row in (await self.db.execute(query)).all()]
+
+        # The index narrows to the enclosing box; the exact circle is applied here
+        candidates = (await self.db.execute(
+            self._in_box(backend, model, bounding_box(lat, lng, radius_miles)).where(*criteria)
+        )).scalars().all()
+        if not candidates:
+            return []
+        distances = haversine_miles(
+            lat, lng, [c.latitude for c in candidates], [c.longitude for c in candidates]
+        )
+        order = [i for i in np.argsort(distances, kind="stable") if distances[i] <= radius_miles]
+        if limit:
+            order = order[:limit]
+        return [(candidates[i], float(distances[i])) for i in order]
@@ -0,0 +1,302 @@
+"""
+Traffic speed profile built from NYC DOT traffic volume counts.
+
+The city is divided into a lat/lng grid, and each cell gets one speed factor
+per hour of the week (Monday 00:00 = 0 ... Sunday 23:00 = 167). A factor is
+the expected speed relative to the cell's all-week average, so 0.6 means
+traffic moves at 60% of the usual pace in that hour.
+
+Volumes are turned into travel-time multipliers with the BPR
+(Bureau of Public Roads) volume-delay curve:
+
+    t(v) = 1 + alpha * (v / c) ** beta
+
+The counts don't include road capacity, so each cell's busiest hour is
+taken to run at PEAK_VOLUME_CAPACITY_RATIO. Hours with no counts for a cell
+use the city-wide profile for that hour. Cells with no counts at all use it
+for every hour.
+
+The index is stored next to the NYC snapshot as one uint8 array
+(rows x cols x 168, factor in percent) plus index.json, and memory-mapped on
+load. A lookup is one array read.
+"""
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+import numpy as np
+from services.nyc_snapshot import SnapshotTable, snapshot_dir
+
+HOURS_PER_WEEK = 168
+NYC_TZ = ZoneInfo("America/New_York")  # DOT count timestamps are local
+
+# NAD83 / New York Long Island (EPSG:2263): Lambert Conformal Conic,
+# two standard parallels, GRS80 ellipsoid, US survey feet
+_LCC_A = 6378137.0
+_LCC_F = 1 / 298.257222101
+_LCC_E = (2 * _LCC_F - _LCC_F ** 2) ** 0.5
+_LCC_LAT1 = np.radians(41 + 2 / 60)
+_LCC_LAT2 = np.radians(40 + 40 / 60)
+_LCC_LAT0 = np.radians(40 + 10 / 60)
+_LCC_LNG0 = np.radians(-74.0)
+_LCC_FALSE_EASTING_M = 300000.0
+_US_FOOT_M = 1200 / 3937
+
+_POINT_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s+(-?\d+(?:\.\d+)?)")
+
+
+def _lcc_m(lat):
+    return np.cos(lat) / np.sqrt(1 - (_LCC_E * np.sin(lat)) ** 2)
+
+
+def _lcc_t(lat):
+    e_sin = _LCC_E * np.sin(lat)
+    return np.tan(np.pi / 4 - lat / 2) / ((1 - e_sin) / (1 + e_sin)) ** (_LCC_E / 2)
+
+
+_LCC_N = (np.log(_lcc_m(_LCC_LAT1)) - np.log(_lcc_m(_LCC_LAT2))) / (
+    np.log(_lcc_t(_LCC_LAT1)) - np.log(_lcc_t(_LCC_LAT2))
+)
+_LCC_AF = _LCC_A * _lcc_m(_LCC_LAT1) / (_LCC_N * _lcc_t(_LCC_LAT1) ** _LCC_N)
+_LCC_RHO0 = _LCC_AF * _lcc_t(_LCC_LAT0) ** _LCC_N
+
+
+def state_plane_to_latlng(x_ft: np.ndarray, y_ft: np.ndarray):
+    """Inverse Lambert projection of EPSG:2263 coordinates (feet) to degrees"""
+    x = np.asarray(x_ft, dtype=np.float64) * _US_FOOT_M - _LCC_FALSE_EASTING_M
+    y = _LCC_RHO0 - np.asarray(y_ft, dtype=np.float64) * _US_FOOT_M
+    rho = np.hypot(x, y)
+    t = (rho / _LCC_AF) ** (1 / _LCC_N)
+    lng = np.arctan2(x, y) / _LCC_N + _LCC_LNG0
+    lat = np.pi / 2 - 2 * np.arctan(t)
+    for _ in range(5):  # converges to well under a metre
+        e_sin = _LCC_E * np.sin(lat)
+        lat = np.pi / 2 - 2 * np.arctan(t * ((1 - e_sin) / (1 + e_sin)) ** (_LCC_E / 2))
+    return np.degrees(lat), np.degrees(lng)
+
+
+def hour_of_week(when: Optional[datetime] = None) -> int:
+    """
+    Hour of the week in New York time, which the DOT counts are in (the
+    server may run in UTC). Aware datetimes are converted; naive ones are
+    taken to be New York local time already. Default now.
+    """
+    if when is None:
+        when = datetime.now(NYC_TZ)
+    elif when.tzinfo is not None:
+        when = when.astimezone(NYC_TZ)
+    return when.weekday() * 24 + when.hour
+
+
+def index_dir() -> str:
+    return os.path.join(snapshot_dir(), "traffic_speed_index")
+
+
+class TrafficSpeedIndex:
+    """Grid cell x hour-of-week speed factors, memory-mapped"""
+
+    # Grid over the five boroughs
+    LAT_MIN, LAT_MAX = 40.49, 40.92
+    LNG_MIN, LNG_MAX = -74.26, -73.69
+    CELL_DEGREES = float(os.getenv("TRAFFIC_GRID_CELL_DEGREES", "0.01"))  # ~1 km
+
+    BPR_ALPHA = 0.15
+    BPR_BETA = 4.0
+    PEAK_VOLUME_CAPACITY_RATIO = 1.5
+    MIN_FACTOR, MAX_FACTOR = 0.3, 2.0
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or index_dir()
+        self.manifest: Optional[Dict[str, Any]] = None
+        self._factors: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._factors is not None
+
+    @property
+    def shape(self):
+        rows = int(np.ceil((self.LAT_MAX - self.LAT_MIN) / self.CELL_DEGREES))
+        cols = int(np.ceil((self.LNG_MAX - self.LNG_MIN) / self.CELL_DEGREES))
+        return rows, cols
+
+    def _cells(self, lats: np.ndarray, lngs: np.ndarray):
+        """Row/column of each point, and whether it falls inside the grid"""
+        rows, cols = self.shape
+        r = np.floor((np.asarray(lats, dtype=np.float64) - self.LAT_MIN) / self.CELL_DEGREES)
+        c = np.floor((np.asarray(lngs, dtype=np.float64) - self.LNG_MIN) / self.CELL_DEGREES)
+        inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+        return np.where(inside, r, 0).astype(np.intp), np.where(inside, c, 0).astype(np.intp), inside
+
+    # Lookups
+
+    def speed_factors(self, lats, lngs, hours) -> np.ndarray:
+        """
+        Speed factor for each point at the given hour(s) of the week.
+        1.0 outside the grid or when no index has been built.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        if self._factors is None:
+            return np.ones(lats.shape)
+        r, c, inside = self._cells(lats, lngs)
+        hours = np.broadcast_to(np.asarray(hours, dtype=np.intp) % HOURS_PER_WEEK, lats.shape)
+        factors = self._factors[r, c, hours].astype(np.float64) / 100.0
+        return np.where(inside, factors, 1.0)
+
+    def speed_factor(self, lat: float, lng: float, when: Optional[datetime] = None) -> float:
+        return float(self.speed_factors([lat], [lng], hour_of_week(when))[0])
+
+    # Build
+
+    def _observations(self, table: SnapshotTable):
+        """(lat, lng, hour of week, volume) for every count with usable fields"""
+        required = ("wktgeom", "yr", "m", "d", "hh", "vol")
+        if any(column not in table.column_kinds for column in required):
+            return None
+        geometry = table.values("wktgeom")
+        years, months, days, hours = (table.values(c) for c in ("yr", "m", "d", "hh"))
+        volume = np.asarray(table.floats("vol"))
+
+        keep, xs, ys, dates, hh = [], [], [], [], []
+        for i, wkt in enumerate(geometry):
+            point = _POINT_RE.search(wkt) if wkt else None
+            if not point or not (years[i] and months[i] and days[i] and hours[i]) or np.isnan(volume[i]):
+                continue
+            try:
+                dates.append(f"{int(years[i]):04d}-{int(months[i]):02d}-{int(days[i]):02d}")
+                hh.append(int(hours[i]) % 24)
+            except ValueError:
+                continue
+            keep.append(i)
+            xs.append(float(point.group(1)))
+            ys.append(float(point.group(2)))
+
+        lats, lngs = state_plane_to_latlng(np.array(xs), np.array(ys))
+        # 1970-01-01 was a Thursday; shift so Monday = 0
+        weekdays = (np.array(dates, dtype="datetime64[D]").astype(np.int64) + 3) % 7
+        how = weekdays * 24 + np.array(hh, dtype=np.int64)
+        return lats, lngs, how, volume[np.array(keep, dtype=np.intp)]
+
+    def _volume_to_factors(self, mean_volume: np.ndarray, observed: np.ndarray) -> np.ndarray:
+        """Per-hour speed factors for one or more cells (last axis = hour of week)"""
+        peak = np.max(np.where(observed, mean_volume, 0.0), axis=-1, keepdims=True)
+        capacity = np.where(peak > 0, peak / self.PEAK_VOLUME_CAPACITY_RATIO, 1.0)
+        travel_time = 1 + self.BPR_ALPHA * (mean_volume / capacity) ** self.BPR_BETA
+        hours_seen = np.maximum(observed.sum(axis=-1, keepdims=True), 1)
+        average_time = np.where(observed, travel_time, 0.0).sum(axis=-1, keepdims=True) / hours_seen
+        return np.clip(average_time / travel_time, self.MIN_FACTOR, self.MAX_FACTOR)
+
+    def build(self, table: SnapshotTable) -> Dict[str, Any]:
+        """Build the index from the traffic snapshot, save it and serve it"""
+        observations = self._observations(table)
+        rows, cols = self.shape
+        if observations is None or len(observations[0]) == 0:
+            factors = np.full((rows, cols, HOURS_PER_WEEK), 100, dtype=np.uint8)
+            counted = cells_with_data = 0
+        else:
+            lats, lngs, how, volume = observations
+            r, c, inside = self._cells(lats, lngs)
+            cell = (r * cols + c)[inside]
+            how, volume = how[inside], volume[inside]
+            counted = int(inside.sum())
+
+            # Mean volume per (cell, hour of week)
+            slot = cell * HOURS_PER_WEEK + how
+            totals = np.bincount(slot, weights=volume, minlength=rows * cols * HOURS_PER_WEEK)
+            counts = np.bincount(slot, minlength=rows * cols * HOURS_PER_WEEK)
+            totals = totals.reshape(rows * cols, HOURS_PER_WEEK)
+            counts = counts.reshape(rows * cols, HOURS_PER_WEEK)
+            observed = counts > 0
+            cell_factors = self._volume_to_factors(np.divide(totals, np.maximum(counts, 1)), observed)
+
+            # City-wide profile fills the hours a cell has no counts for
+            city_totals, city_counts = totals.sum(axis=0), counts.sum(axis=0)
+            city_observed = city_counts > 0
+            city_factors = np.where(
+                city_observed,
+                self._volume_to_factors(np.divide(city_totals, np.maximum(city_counts, 1)), city_observed),
+                1.0,
+            )
+            filled = np.where(observed, cell_factors, city_factors[np.newaxis, :])
+            factors = np.round(filled * 100).astype(np.uint8).reshape(rows, cols, HOURS_PER_WEEK)
+            cells_with_data = int(observed.any(axis=1).sum())
+
+        manifest = {
+            "source_version": table.manifest.get("version"),
+            "built_at": datetime.now().isoformat(),
+            "observations": counted,
+            "cells_with_data": cells_with_data,
+            "grid": {
+                "lat_min": self.LAT_MIN, "lng_min": self.LNG_MIN,
+                "cell_degrees": self.CELL_DEGREES, "rows": rows, "cols": cols,
+            },
+        }
+        self._save(factors, manifest)
+        return self.status()
+
+    def _save(self, factors: np.ndarray, manifest: Dict[str, Any]) -> None:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            file_name = f"factors-{manifest['source_version']}.npy"
+            np.save(os.path.join(self.directory, file_name), factors)
+            manifest = {**manifest, "file": file_name}
+            tmp_path = os.path.join(self.directory, "index.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, os.path.join(self.directory, "index.json"))
+            for entry in os.listdir(self.directory):
+                if entry.startswith("factors-") and entry != file_name:
+                    os.remove(os.path.join(self.directory, entry))
+            self._load()
+
+    # Load
+
+    def _load(self) -> bool:
+        # Not manifest.json, so the snapshot store doesn't take it for a dataset
+        manifest_path = os.path.join(self.directory, "index.json")
+        if not os.path.exists(manifest_path):
+            return False
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        grid = manifest["grid"]
+        if (grid["rows"], grid["cols"]) != self.shape or grid["cell_degrees"] != self.CELL_DEGREES:
+            return False  # grid settings changed; needs a rebuild
+        self._factors = np.load(os.path.join(self.directory, manifest["file"]), mmap_mode="r")
+        self.manifest = manifest
+        return True
+
+    def load(self) -> bool:
+        with self._lock:
+            return self._load()
+
+    def refresh(self, table: Optional[SnapshotTable]) -> Dict[str, Any]:
+        """Load the saved index; rebuild it if the traffic snapshot has moved on"""
+        self.load()
+        if table is not None and (
+            self.manifest is None or self.manifest.get("source_version") != table.manifest.get("version")
+        ):
+            return self.build(table)
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        if self.manifest is None:
+            return {"loaded": False}
+        return {"loaded": True, **{k: v for k, v in self.manifest.items() if k != "file"}}
+
+
+_index: Optional[TrafficSpeedIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_traffic_index() -> TrafficSpeedIndex:
+    """Process-wide traffic speed index"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TrafficSpeedIndex()
+    return _index
@@ -0,0 +1,17 @@
+"""
+Shared test setup: the backend directory on sys.path and a scratch database.
+
+database.py reads DATABASE_URL at import time, so it is pointed at a fresh
+SQLite file here, before any test imports the app. Set TEST_DATABASE_URL to
+run against a scratch PostgreSQL database instead (rows are left behind).
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or (
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="food_rescue_tests_"), "test.db")
+)
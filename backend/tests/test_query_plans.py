@@ -0,0 +1,48 @@
+"""
+The hot queries are served by the indexes from the migration chain.
+
+Migrates the test database to head, seeds it, refreshes planner statistics
+and checks that EXPLAIN for each query names its index. The queries and
+seed are shared with benchmarks/check_query_plans.py.
+"""
+import pytest
+from sqlalchemy import text
+from benchmarks.check_query_plans import explain, hot_queries, seed, spatial_backend, spatial_queries
+
+SEED_ROWS = 20000
+
+# Spatial lookups depend on the database's spatial backend; they have their own test
+QUERIES = hot_queries("bbox")
+
+
+@pytest.fixture(scope="module")
+def connection():
+    from database import engine
+    from migrate import run_migrations
+
+    run_migrations(configure_logger=False)
+    seed(engine, SEED_ROWS)
+    with engine.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql("ANALYZE")
+        else:
+            connection.execute(text("ANALYZE"))
+            # A small seed would otherwise make sequential scans look cheaper
+            connection.execute(text("SET enable_seqscan = off"))
+        yield connection
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name, statement, index", QUERIES, ids=[name for name, _, _ in QUERIES])
+def test_hot_query_uses_index(connection, name, statement, index):
+    plan = explain(connection, statement)
+    assert index in plan, f"{name}: expected {index} in plan:\n{plan}"
+
+
+def test_spatial_queries_use_spatial_index(connection):
+    backend = spatial_backend(connection)
+    if backend == "bbox":
+        pytest.skip("no spatial index on this database (SQLite without R*Tree, or PostgreSQL without PostGIS)")
+    for name, statement, index in spatial_queries(backend):
+        plan = explain(connection, statement)
+        assert index in plan, f"{name}: expected {index} in plan:\n{plan}"
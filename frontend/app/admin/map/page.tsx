@@ -1,10 +1,11 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useCallback, useRef } from 'react'
 import axios from 'axios'
 import dynamic from 'next/dynamic'
 import 'leaflet/dist/leaflet.css'
 import L from 'leaflet'
+import { useLiveEvents, upsertBy, DONATION_EVENTS, ROUTE_EVENTS } from '@/lib/liveEvents'
 
 // Fix for default marker icons in Next.js
 delete (L.Icon.Default.prototype as any)._getIconUrl
@@ -30,42 +31,80 @@ export default function AdminMapPage() {
   const [loading, setLoading] = useState(true)
   const [selectedRoute, setSelectedRoute] = useState<number | null>(null)
 
-  useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
-        
-        const [donationsRes, routesRes] = await Promise.all([
-          axios.get(`${apiUrl}/donations`),
-          axios.get(`${apiUrl}/routes`)
-        ])
-
-        setDonations(donationsRes.data)
-        setRoutes(routesRes.data)
-
-        // Fetch route details for visualization
-        const detailsMap = new Map()
-        for (const route of routesRes.data) {
-          try {
-            const routeDetail = await axios.get(`${apiUrl}/routes/${route.route_id}/map`)
-            detailsMap.set(route.route_id, routeDetail.data)
-          } catch (e) {
-            console.error(`Error fetching route ${route.route_id}:`, e)
-          }
-        }
-        setRouteDetails(detailsMap)
-      } catch (error) {
-        console.error('Error fetching map data:', error)
-      } finally {
+  // Deltas that arrive while a snapshot is loading are held back and applied
+  // on top of it, so the (older) snapshot can't overwrite them
+  const loadsInFlight = useRef(0)
+  const latestLoad = useRef(0)
+  const heldDeltas = useRef<(() => void)[]>([])
+
+  const whenLoaded = (apply: () => void) => {
+    if (loadsInFlight.current) {
+      heldDeltas.current.push(apply)
+    } else {
+      apply()
+    }
+  }
+
+  const fetchData = useCallback(async () => {
+    const load = ++latestLoad.current
+    loadsInFlight.current += 1
+    try {
+      const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+      
+      // Donations (with matches) and routes with geometry from one cached snapshot
+      const response = await axios.get(`${apiUrl}/admin/snapshot`)
+      if (load !== latestLoad.current) {
+        return  // a newer load replaced this one
+      }
+
+      setDonations(response.data.donations)
+      setRoutes(response.data.routes)
+
+      const detailsMap = new Map()
+      for (const route of response.data.routes) {
+        detailsMap.set(route.route_id, route)
+      }
+      setRouteDetails(detailsMap)
+    } catch (error) {
+      console.error('Error fetching map data:', error)
+    } finally {
+      loadsInFlight.current -= 1
+      if (!loadsInFlight.current) {
+        const held = heldDeltas.current
+        heldDeltas.current = []
+        held.forEach((apply) => apply())
         setLoading(false)
       }
     }
-
-    fetchData()
-    const interval = setInterval(fetchData, 30000) // Refresh every 30 seconds
-    return () => clearInterval(interval)
   }, [])
 
+  // The map only needs the changed items pushed to it, never a full refetch
+  const refreshRoute = async (routeId: number) => {
+    try {
+      const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+      const response = await axios.get(`${apiUrl}/routes/${routeId}/map`)
+      whenLoaded(() => {
+        setRoutes((current) => upsertBy(current, response.data, 'route_id'))
+        setRouteDetails((current) => new Map(current).set(routeId, response.data))
+      })
+    } catch (error) {
+      console.error('Error fetching route map data:', error)
+    }
+  }
+
+  // The snapshot is loaded once the stream is subscribed (`ready`), so every
+  // change after it arrives as a delta
+  useLiveEvents('/events/stream?snapshot=false', {
+    ready: () => fetchData(),
+    resync: () => fetchData(),
+    ...Object.fromEntries(DONATION_EVENTS.map((type) => [type, (data: any) => whenLoaded(() => {
+      setDonations((current) => upsertBy(current, data.donation, 'donation_id'))
+    })])),
+    ...Object.fromEntries(ROUTE_EVENTS.map((type) => [type, (data: any) => whenLoaded(() => {
+      refreshRoute(data.route.route_id)
+    })])),
+  })
+
   const getRoutePolyline = (routeId: number) => {
     const detail = routeDetails.get(routeId)
     if (detail && detail.start && detail.end) {
@@ -1,8 +1,8 @@
 'use client'
 
-import { useState, useEffect } from 'react'
-import axios from 'axios'
+import { useState } from 'react'
 import Link from 'next/link'
+import { useLiveEvents, upsertBy, addImpact, DONATION_EVENTS, ROUTE_EVENTS } from '@/lib/liveEvents'
 
 interface ImpactData {
   lbs_rescued: number
@@ -32,31 +32,24 @@ export default function AdminPage() {
   const [routes, setRoutes] = useState<Route[]>([])
   const [loading, setLoading] = useState(true)
 
-  useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
-        
-        const [impactRes, donationsRes, routesRes] = await Promise.all([
-          axios.get(`${apiUrl}/impact`),
-          axios.get(`${apiUrl}/donations`),
-          axios.get(`${apiUrl}/routes`)
-        ])
-
-        setImpact(impactRes.data)
-        setDonations(donationsRes.data)
-        setRoutes(routesRes.data)
-      } catch (error) {
-        console.error('Error fetching admin data:', error)
-      } finally {
-        setLoading(false)
+  // One snapshot, then pushed deltas instead of polling every 30 seconds
+  useLiveEvents('/events/stream?limit=50', {
+    snapshot: (state) => {
+      setImpact(state.impact)
+      setDonations(state.donations)
+      setRoutes(state.routes)
+      setLoading(false)
+    },
+    ...Object.fromEntries(DONATION_EVENTS.map((type) => [type, (data: any) => {
+      setDonations((current) => upsertBy(current, data.donation, 'donation_id'))
+      if (data.impact_delta) {
+        setImpact((current) => current && addImpact(current, data.impact_delta))
       }
-    }
-
-    fetchData()
-    const interval = setInterval(fetchData, 30000) // Refresh every 30 seconds
-    return () => clearInterval(interval)
-  }, [])
+    }])),
+    ...Object.fromEntries(ROUTE_EVENTS.map((type) => [type, (data: any) => {
+      setRoutes((current) => upsertBy(current, data.route, 'route_id'))
+    }])),
+  })
 
   const pendingDonations = donations.filter(d => d.status === 'pending').length
   const activeRoutes = routes.filter(r => r.status === 'in_progress').length
@@ -1,8 +1,9 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useCallback } from 'react'
 import axios from 'axios'
 import { LineChart, Line, BarChart, Bar, PieChart, Pie, Cell, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts'
+import { useLiveEvents, addImpact, DONATION_EVENTS } from '@/lib/liveEvents'
 
 interface SustainabilityData {
   lbs_rescued: number
@@ -25,37 +26,68 @@ export default function SustainabilityPage() {
   const [loading, setLoading] = useState(true)
   const [historicalData, setHistoricalData] = useState<any[]>([])
 
-  useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
-        const response = await axios.get(`${apiUrl}/impact/realtime`)
-        setData(response.data)
-        
-        // Generate historical data for visualization
-        const historical = []
-        for (let i = 6; i >= 0; i--) {
-          const date = new Date()
-          date.setDate(date.getDate() - i)
-          historical.push({
-            date: date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
-            co2e: (response.data.co2e_avoided / 7) * (7 - i) + Math.random() * 100,
-            meals: (response.data.meals / 7) * (7 - i) + Math.random() * 50,
-            lbs: (response.data.lbs_rescued / 7) * (7 - i) + Math.random() * 20
-          })
-        }
-        setHistoricalData(historical)
-      } catch (error) {
-        console.error('Error fetching sustainability data:', error)
-      } finally {
-        setLoading(false)
+  const fetchData = useCallback(async () => {
+    try {
+      const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+      const response = await axios.get(`${apiUrl}/impact/realtime`)
+      setData(response.data)
+      
+      // Generate historical data for visualization
+      const historical = []
+      for (let i = 6; i >= 0; i--) {
+        const date = new Date()
+        date.setDate(date.getDate() - i)
+        historical.push({
+          date: date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
+          co2e: (response.data.co2e_avoided / 7) * (7 - i) + Math.random() * 100,
+          meals: (response.data.meals / 7) * (7 - i) + Math.random() * 50,
+          lbs: (response.data.lbs_rescued / 7) * (7 - i) + Math.random() * 20
+        })
       }
+      setHistoricalData(historical)
+    } catch (error) {
+      console.error('Error fetching sustainability data:', error)
+    } finally {
+      setLoading(false)
     }
+  }, [])
 
+  useEffect(() => {
     fetchData()
-    const interval = setInterval(fetchData, 30000) // Update every 30 seconds
-    return () => clearInterval(interval)
-  }, [])
+  }, [fetchData])
+
+  // Keep the KPIs current from pushed events instead of polling /impact/realtime
+  const onDonationEvent = (data: any) => {
+    const status = data.donation.status
+    setData((current) => {
+      if (!current) return current
+      let next = { ...current }
+      if (data.previous_status === 'pending' && status !== 'pending') {
+        next.pending_donations -= 1
+      }
+      if (data.impact_delta) {
+        next = addImpact(next, data.impact_delta)
+        next.sustainability_score = Math.min(100, (next.lbs_rescued / 1000) * 10)
+      }
+      return next
+    })
+  }
+  const isActive = (status?: string | null) => status === 'assigned' || status === 'in_progress'
+
+  useLiveEvents('/events/stream?snapshot=false', {
+    resync: () => fetchData(),
+    'donation.created': () => setData((current) => current && {
+      ...current,
+      pending_donations: current.pending_donations + 1,
+      total_donations: current.total_donations + 1,
+    }),
+    ...Object.fromEntries(DONATION_EVENTS.filter((type) => type !== 'donation.created').map((type) => [type, onDonationEvent])),
+    'route.created': () => setData((current) => current && { ...current, active_routes: current.active_routes + 1 }),
+    'route.status': (data) => {
+      const change = Number(isActive(data.route.status)) - Number(isActive(data.previous_status))
+      setData((current) => current && { ...current, active_routes: current.active_routes + change })
+    },
+  })
 
   if (loading) {
     return <div className="text-center py-12">Loading sustainability metrics...</div>
@@ -20,6 +20,27 @@ export default function DonorPage() {
   const [loading, setLoading] = useState(false)
   const [result, setResult] = useState<any>(null)
 
+  // Matching runs as a background job; poll it until the results are in
+  const pollMatches = async (statusUrl: string) => {
+    for (let attempt = 0; attempt < 60; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, 1000))
+      try {
+        const job = (await axios.get(statusUrl)).data
+        if (job.status === 'completed') {
+          const matches = job.result?.donations?.[0] || {}
+          setResult((current: any) => current && { ...current, ...matches, matching: false })
+          return
+        }
+        if (job.status === 'failed') {
+          break
+        }
+      } catch (error) {
+        console.error('Error checking donation matches:', error)
+      }
+    }
+    setResult((current: any) => current && { ...current, matching: false })
+  }
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault()
     setLoading(true)
@@ -36,7 +57,10 @@ export default function DonorPage() {
       }
 
       const response = await axios.post(`${apiUrl}/donation`, donationData)
-      setResult(response.data)
+      setResult({ ...response.data, matching: Boolean(response.data.status_url) })
+      if (response.data.status_url) {
+        pollMatches(`${apiUrl}${response.data.status_url}`)
+      }
     } catch (error: any) {
       console.error('Error creating donation:', error)
       setResult({ error: error.response?.data?.detail || 'Failed to create donation' })
@@ -173,6 +197,10 @@ export default function DonorPage() {
                   <h3 className="font-semibold text-green-800 mb-2">Donation Created Successfully!</h3>
                   <p className="text-green-700 mb-4">Donation ID: {result.donation_id}</p>
                   
+                  {result.matching && (
+                    <p className="text-green-700">Finding matching recipients...</p>
+                  )}
+
                   {result.match_scores && result.match_scores.length > 0 && (
                     <div>
                       <p className="font-semibold text-green-800 mb-2">Top Matched Recipients:</p>
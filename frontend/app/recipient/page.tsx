@@ -24,7 +24,7 @@ export default function RecipientPage() {
     const fetchDonations = async () => {
       try {
         const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
-        const response = await axios.get(`${apiUrl}/donations?status=pending`)
+        const response = await axios.get(`${apiUrl}/donations?status=pending&fields=donation_id,food_type,quantity_lbs,address,match_scores`)
         setDonations(response.data)
       } catch (error) {
         console.error('Error fetching donations:', error)
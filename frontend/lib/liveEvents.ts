@@ -0,0 +1,64 @@
+'use client'
+
+import { useEffect, useRef } from 'react'
+
+// Event types sent by GET /events/stream
+export const DONATION_EVENTS = [
+  'donation.created',
+  'donation.pending',
+  'donation.matched',
+  'donation.assigned',
+  'donation.in_transit',
+  'donation.completed',
+  'donation.expired',
+  // Category, coordinates and neighborhood filled in after creation
+  'donation.enriched',
+]
+export const ROUTE_EVENTS = ['route.created', 'route.status']
+
+export type LiveEventHandlers = Record<string, (data: any) => void>
+
+/**
+ * Subscribe to the backend's live update stream. `handlers` maps event
+ * types (`snapshot`, `ready`, `resync`, `donation.created`, ...) to
+ * callbacks that get the parsed event data. The browser reconnects on its
+ * own and resumes from the last event id it saw.
+ */
+export function useLiveEvents(path: string, handlers: LiveEventHandlers) {
+  const handlersRef = useRef(handlers)
+  handlersRef.current = handlers
+
+  useEffect(() => {
+    const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+    const source = new EventSource(`${apiUrl}${path}`)
+    for (const type of Object.keys(handlersRef.current)) {
+      source.addEventListener(type, (event) => {
+        handlersRef.current[type]?.(JSON.parse((event as MessageEvent).data))
+      })
+    }
+    source.onerror = () => console.error('Live update stream interrupted, reconnecting...')
+    return () => source.close()
+  }, [path])
+}
+
+/** Replace the item with the same `key` (merging fields), or add it to the front */
+export function upsertBy<T extends Record<string, any>>(items: T[], item: T, key: keyof T): T[] {
+  const index = items.findIndex((existing) => existing[key] === item[key])
+  if (index === -1) {
+    return [item, ...items]
+  }
+  const next = [...items]
+  next[index] = { ...items[index], ...item }
+  return next
+}
+
+/** Add an `impact_delta` from a donation.completed event to impact totals */
+export function addImpact<T extends Record<string, any>>(impact: T, delta: Record<string, number>): T {
+  const next: Record<string, any> = { ...impact }
+  for (const [metric, value] of Object.entries(delta)) {
+    if (typeof next[metric] === 'number') {
+      next[metric] += value
+    }
+  }
+  return next as T
+}